@@ -0,0 +1,5 @@
+"""
+성능 측정용 벤치마크 스크립트 모음.
+
+- 각 모듈은 `python -m benchmarks.<module>` 로 단독 실행한다.
+"""
@@ -0,0 +1,279 @@
+"""
+CPU kernel 마이크로 벤치마크.
+
+scoring / feature / rerank 함수만 떼어서 후보 수 × 프로필 크기 조합별로 잰다. (DB 조회 없음)
+
+- tokenize_keywords            abstract 1개 토큰화
+- compute_total_score          후보 1개 점수
+- _similarity_bonus            후보 1개 vs base 논문
+- build_candidate_features     후보 N개 → (N, D) feature matrix
+- BanditPolicy.predict_scores  (N, D) → (N,) (linear checkpoint)
+- RLBanditReranker.rerank_batch  CandidateBatch N개 → top 6 (pipeline 이 쓰는 rerank 경로)
+
+측정값:
+- ns/op: 반복 횟수를 자동으로 맞춘 뒤 (repeat 당 ≥ --min-time 초) repeat 중 최솟값
+- peak B/op: tracemalloc 으로 op 1번 실행 중 최대 추가 할당 바이트
+
+vocabulary 인코딩은 arxiv_id LRU 캐시가 찬 상태(서빙 steady state)에서 측정한다.
+
+실행:
+    python -m benchmarks.bench_kernels
+    python -m benchmarks.bench_kernels --candidates 10 100 1000 --profile-sizes 2 10 50
+    python -m benchmarks.bench_kernels --save benchmarks/results/kernels.json
+    python -m benchmarks.bench_kernels --baseline benchmarks/results/kernels.json --tolerance 0.15
+    python -m benchmarks.bench_kernels --filter compute_total_score
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+os.environ.setdefault("RL_MODEL_POLL_SEC", "0")
+
+from benchmarks.synthetic_corpus import Corpus, CorpusConfig, generate_corpus, make_loader
+from recommendation.data.data_loader import MongoDataLoader
+from recommendation.data.preprocess import tokenize_keywords
+from recommendation.models.data_models import CandidateBatch, Paper, UserProfile
+from recommendation.rl.bandit_policy import BanditPolicy, PolicyConfig, build_model, save_checkpoint, torch
+from recommendation.rl.feature_schema import DEFAULT_FEATURE_SCHEMA
+from recommendation.rl.state_builder import build_candidate_features
+from recommendation.rule_based.rule_based_recommender import RuleBasedRecommender
+from recommendation.rule_based.scoring import compute_total_score
+
+
+@dataclass
+class KernelResult:
+    ns_per_op: float
+    peak_bytes: int
+    loops: int
+
+
+@dataclass
+class Case:
+    kernel: str
+    n: int  # 후보 수 (per-item kernel 은 1회 호출 기준이라 후보 pool 크기)
+    profile: int  # 프로필 북마크 수
+    fn: Callable[[], Any]
+
+    @property
+    def key(self) -> str:
+        return f"{self.kernel}[n={self.n},profile={self.profile}]"
+
+
+# ------------------------------------------------------
+# 측정
+# ------------------------------------------------------
+def _autorange(fn: Callable[[], Any], min_time: float) -> int:
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - start >= min_time:
+            return loops
+        loops *= 2
+
+
+def time_op(fn: Callable[[], Any], repeat: int, min_time: float) -> Tuple[float, int]:
+    fn()  # warm-up (lazy 로딩 / 캐시)
+    loops = _autorange(fn, min_time)
+    best = float("inf")
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter_ns()
+            for _ in range(loops):
+                fn()
+            best = min(best, (time.perf_counter_ns() - start) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return best, loops
+
+
+def peak_alloc(fn: Callable[[], Any]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return max(peak - base, 0)
+
+
+def run_case(case: Case, repeat: int, min_time: float) -> KernelResult:
+    ns, loops = time_op(case.fn, repeat, min_time)
+    return KernelResult(ns_per_op=round(ns, 1), peak_bytes=peak_alloc(case.fn), loops=loops)
+
+
+# ------------------------------------------------------
+# 입력 준비
+# ------------------------------------------------------
+def _papers(corpus: Corpus) -> List[Paper]:
+    return [MongoDataLoader._doc_to_paper(dict(d)) for d in corpus.papers]
+
+
+def _profile(papers: List[Paper], corpus: Corpus, size: int, user_id: int = 1) -> UserProfile:
+    """
+    앞쪽 size 개 논문을 북마크한 user (검색 기록은 corpus 의 user_id 것 사용).
+    MongoDataLoader 와 같은 _compose_profile 로 만든다.
+    """
+    bookmarked = papers[-size:] if size else []
+    searches = [s["query"] for s in corpus.searches if s["users_id"] == user_id]
+    return MongoDataLoader._compose_profile(
+        user_id, [p.arxiv_id for p in bookmarked], bookmarked, searches
+    )
+
+
+def _candidate_batch(profile: UserProfile, candidates: List[Paper], now: datetime) -> CandidateBatch:
+    X, paper_ids, _ = build_candidate_features(profile, candidates, now=now)
+    return CandidateBatch(
+        paper_ids=paper_ids,
+        papers=candidates,
+        X=X.astype(np.float32),
+        rule_scores=X[:, -1].astype(np.float64),
+        feature_names=DEFAULT_FEATURE_SCHEMA.names,
+    ).top_k(len(candidates))
+
+
+def build_cases(
+    corpus: Corpus,
+    candidate_counts: List[int],
+    profile_sizes: List[int],
+    model_dir: Path,
+) -> Iterator[Case]:
+    from recommendation.service.reranker import BanditPolicyWrapper, RerankConfig, RLBanditReranker
+
+    papers = _papers(corpus)
+    now = corpus.config.now
+    loader = make_loader(Corpus(corpus.config, corpus.papers[:1], [], []))  # rerank 경로는 DB 를 쓰지 않음
+    rule = RuleBasedRecommender(loader)
+    base = papers[0]
+
+    policy = None
+    reranker = RLBanditReranker(loader)
+    if torch is not None:
+        path = save_checkpoint(build_model("linear", DEFAULT_FEATURE_SCHEMA.dim), model_dir / "bandit_model.pt", "linear")
+        policy = BanditPolicy(PolicyConfig(input_dim=DEFAULT_FEATURE_SCHEMA.dim, model_path=path))
+        reranker.policy = BanditPolicyWrapper(RerankConfig(model_path=path, registry_dir=model_dir / "registry", poll_interval=0))
+
+    abstract = papers[1].abstract or ""
+    yield Case("tokenize_keywords", 1, 0, lambda: tokenize_keywords(abstract))
+
+    for psize in profile_sizes:
+        profile = _profile(papers, corpus, psize)
+        p = papers[1]
+        yield Case("compute_total_score", 1, psize, lambda p=p, profile=profile: compute_total_score(p, profile, now=now))
+    yield Case("_similarity_bonus", 1, 0, lambda: rule._similarity_bonus(papers[1], base))
+
+    for n in candidate_counts:
+        candidates = papers[1:n + 1]
+        for psize in profile_sizes:
+            profile = _profile(papers, corpus, psize)
+            yield Case(
+                "build_candidate_features", n, psize,
+                lambda c=candidates, pr=profile: build_candidate_features(pr, c, now=now),
+            )
+        profile = _profile(papers, corpus, profile_sizes[len(profile_sizes) // 2])
+        batch = _candidate_batch(profile, candidates, now)
+        if policy is not None:
+            X = batch.X
+            yield Case("BanditPolicy.predict_scores", n, 0, lambda X=X: policy.predict_scores(X))
+        yield Case(
+            "RLBanditReranker.rerank_batch", n, 0,
+            lambda b=batch: reranker.rerank_batch(1, b, top_k=6),
+        )
+
+
+# ------------------------------------------------------
+# baseline 비교
+# ------------------------------------------------------
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    regressions = []
+    for key, base in baseline.get("kernels", {}).items():
+        cur = current["kernels"].get(key)
+        if cur is None:
+            continue
+        ratio = cur["ns_per_op"] / base["ns_per_op"] if base["ns_per_op"] else 1.0
+        if ratio > 1 + tolerance:
+            regressions.append(f"{key}: {base['ns_per_op']:.0f} → {cur['ns_per_op']:.0f} ns/op ({ratio:.2f}x)")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="scoring / feature / rerank kernel 마이크로 벤치마크")
+    parser.add_argument("--candidates", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--profile-sizes", type=int, nargs="+", default=[2, 10, 50])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="repeat 1회 최소 시간 (초)")
+    parser.add_argument("--filter", default=None, help="kernel 이름에 포함된 문자열")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    n_papers = max(args.candidates) + max(args.profile_sizes) + 2
+    config = CorpusConfig(papers=n_papers, users=1, embedding_dim=0, seed=args.seed)
+    corpus = generate_corpus(config)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    print(f"{'kernel':<52} | {'ns/op':>12} | {'peak B/op':>10} | {'loops':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        import logging
+
+        logging.disable(logging.WARNING)
+        for case in build_cases(corpus, args.candidates, args.profile_sizes, Path(tmp)):
+            if args.filter and args.filter not in case.kernel:
+                continue
+            r = run_case(case, args.repeat, args.min_time)
+            results[case.key] = asdict(r)
+            print(f"{case.key:<52} | {r.ns_per_op:12,.0f} | {r.peak_bytes:10,d} | {r.loops:7d}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "torch": getattr(torch, "__version__", None),
+            "repeat": args.repeat,
+            "min_time": args.min_time,
+        },
+        "kernels": results,
+    }
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"saved → {args.save}")
+
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print(f"❌ baseline 대비 회귀 (tolerance={args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print(f"✅ baseline 대비 회귀 없음 (tolerance={args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+end-to-end 부하 테스트.
+
+synthetic corpus 를 mongomock (또는 로컬 mongod) 에 넣고, server.app 을 in-process ASGI 로 띄워
+endpoint 별로 동시 요청을 보내 처리량과 latency 분위수를 잰다. (운영 DB / SSH 터널 불필요)
+
+- endpoint: rule (/recommendations), rl (/recommendations/rl), similar, interaction, batch
+- 결과: endpoint 별 req/s, p50 / p95 / p99 / mean (ms), 에러 수
+- --save 로 JSON baseline 저장, --baseline 으로 비교 (p95 / 처리량이 tolerance 이상 나빠지면 exit 1)
+
+실행:
+    python -m benchmarks.bench_load --papers 5000 --users 200 --requests 200 --concurrency 8
+    python -m benchmarks.bench_load --save benchmarks/results/load.json
+    python -m benchmarks.bench_load --baseline benchmarks/results/load.json --tolerance 0.25
+    python -m benchmarks.bench_load --mongo-uri mongodb://localhost:27017   # mongomock 대신 로컬 mongod
+
+필요 패키지 (개발용): httpx, mongomock (--mongo-uri 사용 시 불필요)
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+os.environ.setdefault("RL_MODEL_POLL_SEC", "0")
+
+from benchmarks.synthetic_corpus import Corpus, CorpusConfig, generate_corpus, make_loader
+from recommendation.data.data_loader import MongoDataLoader
+from recommendation.rule_based.rule_based_recommender import RuleBasedRecommender
+
+try:
+    import httpx
+except ImportError:
+    httpx = None  # pip install httpx
+
+ENDPOINTS = ("rule", "rl", "similar", "interaction", "batch")
+
+RequestFactory = Callable[[random.Random], Tuple[str, str, Optional[Dict[str, Any]]]]
+
+
+@dataclass
+class EndpointResult:
+    requests: int
+    errors: int
+    wall_sec: float
+    throughput_rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+
+
+# ------------------------------------------------------
+# 서버 준비
+# ------------------------------------------------------
+def install_loader(loader: MongoDataLoader, model_dir: Optional[Path]) -> None:
+    """
+    모듈 싱글톤이 SSH 터널 대신 benchmark loader 를 쓰도록 교체.
+    model_dir 가 있으면 그 안의 linear checkpoint 로 RL rerank 까지 실행.
+    """
+    import recommendation.interface.api_interface as api_interface
+    import recommendation.interface.recommend as recommend_module
+    from recommendation.service import pipeline
+    from recommendation.service.reranker import BanditPolicyWrapper, RerankConfig, RLBanditReranker
+
+    api_interface._loader_singleton = loader
+    recommend_module._recommender = RuleBasedRecommender(loader)
+    pipeline._loader = loader
+    pipeline._rule_rec = RuleBasedRecommender(loader)
+
+    reranker = RLBanditReranker(loader)
+    if model_dir is not None:
+        reranker.policy = BanditPolicyWrapper(RerankConfig(
+            model_path=model_dir / "bandit_model.pt",
+            registry_dir=model_dir / "registry",
+            poll_interval=0,
+        ))
+    pipeline._rl_reranker = reranker
+
+
+def write_model(model_dir: Path, seed: int) -> Optional[Path]:
+    try:
+        import torch
+    except ImportError:
+        return None  # torch 없으면 rule-based fallback 경로로 측정
+    from recommendation.rl.bandit_policy import build_model, save_checkpoint
+    from recommendation.rl.feature_schema import DEFAULT_FEATURE_SCHEMA
+
+    torch.manual_seed(seed)
+    return save_checkpoint(
+        build_model("linear", DEFAULT_FEATURE_SCHEMA.dim), model_dir / "bandit_model.pt", "linear"
+    )
+
+
+def request_factories(corpus: Corpus, limit: int, candidate_k: int, batch_users: int) -> Dict[str, RequestFactory]:
+    users = corpus.user_ids
+    papers = corpus.paper_ids
+
+    return {
+        "rule": lambda rng: ("GET", f"/recommendations?user_id={rng.choice(users)}&limit={limit}", None),
+        "rl": lambda rng: (
+            "GET", f"/recommendations/rl?user_id={rng.choice(users)}&limit={limit}&candidate_k={candidate_k}", None,
+        ),
+        "similar": lambda rng: ("GET", f"/recommendations/similar/{rng.choice(papers)}?limit={limit}", None),
+        "interaction": lambda rng: ("POST", "/recommendations/interactions", {
+            "user_id": rng.choice(users),
+            "paper_id": rng.choice(papers),
+            "action_type": rng.choice(["click", "bookmark"]),
+            "position": rng.randint(0, limit - 1),
+            "dwell_time": round(rng.uniform(0.5, 30.0), 1),
+        }),
+        "batch": lambda rng: ("POST", "/recommendations/batch", {
+            "user_ids": rng.sample(users, min(batch_users, len(users))),
+            "limit": limit,
+            "candidate_k": candidate_k,
+        }),
+    }
+
+
+# ------------------------------------------------------
+# 부하 생성
+# ------------------------------------------------------
+async def _drive(app, factory: RequestFactory, n_requests: int, concurrency: int, seed: int) -> Tuple[List[float], int, float]:
+    rng = random.Random(seed)
+    planned = [factory(rng) for _ in range(n_requests)]
+    latencies: List[float] = []
+    errors = 0
+    next_idx = 0
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker() -> None:
+            nonlocal next_idx, errors
+            while next_idx < len(planned):
+                method, url, body = planned[next_idx]
+                next_idx += 1
+                start = time.perf_counter()
+                try:
+                    resp = await client.request(method, url, json=body)
+                    ok = resp.status_code < 400 and b'"error"' not in resp.content[-256:]
+                except Exception:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                if not ok:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+    return latencies, errors, wall
+
+
+def run_endpoint(app, factory: RequestFactory, n_requests: int, concurrency: int, warmup: int, seed: int) -> EndpointResult:
+    if warmup:
+        asyncio.run(_drive(app, factory, warmup, 1, seed + 1))
+    latencies, errors, wall = asyncio.run(_drive(app, factory, n_requests, concurrency, seed))
+    ms = np.asarray(latencies) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return EndpointResult(
+        requests=len(latencies),
+        errors=errors,
+        wall_sec=round(wall, 4),
+        throughput_rps=round(len(latencies) / wall, 2),
+        p50_ms=round(float(p50), 3),
+        p95_ms=round(float(p95), 3),
+        p99_ms=round(float(p99), 3),
+        mean_ms=round(float(ms.mean()), 3),
+    )
+
+
+# ------------------------------------------------------
+# baseline 비교
+# ------------------------------------------------------
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    p95 가 (1 + tolerance) 배 이상 늘거나, 처리량이 (1 - tolerance) 배 미만이거나, 에러가 늘면 회귀.
+    """
+    regressions = []
+    for name, base in baseline.get("endpoints", {}).items():
+        cur = current["endpoints"].get(name)
+        if cur is None:
+            continue
+        if cur["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']:.1f}ms → {cur['p95_ms']:.1f}ms")
+        if cur["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['throughput_rps']:.1f} → {cur['throughput_rps']:.1f} req/s")
+        if cur["errors"] > base["errors"]:
+            regressions.append(f"{name}: errors {base['errors']} → {cur['errors']}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="추천 서버 end-to-end 부하 테스트")
+    parser.add_argument("--papers", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--embedding-dim", type=int, default=64)
+    parser.add_argument("--mongo-uri", default=None, help="없으면 mongomock")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--requests", type=int, default=200, help="endpoint 당 요청 수")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=6)
+    parser.add_argument("--candidate-k", type=int, default=100)
+    parser.add_argument("--batch-users", type=int, default=16)
+    parser.add_argument("--no-rl-model", action="store_true", help="RL checkpoint 없이 (rule-based fallback)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", type=Path, default=None, help="결과 JSON 저장 경로")
+    parser.add_argument("--baseline", type=Path, default=None, help="비교할 baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if httpx is None:
+        raise SystemExit("httpx 가 필요합니다: pip install httpx")
+    names = [e for e in args.endpoints.split(",") if e]
+    unknown = set(names) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f"알 수 없는 endpoint: {sorted(unknown)} (가능: {list(ENDPOINTS)})")
+
+    logging.disable(logging.WARNING)  # 요청 로그가 측정에 섞이지 않도록
+    config = CorpusConfig(
+        papers=args.papers, users=args.users, embedding_dim=args.embedding_dim, seed=args.seed
+    )
+    t0 = time.perf_counter()
+    corpus = generate_corpus(config)
+    loader = make_loader(corpus, args.mongo_uri)
+    print(f"corpus: papers={args.papers}, users={args.users}, bookmarks={len(corpus.bookmarks)}, "
+          f"searches={len(corpus.searches)} ({time.perf_counter() - t0:.1f}s, backend={args.mongo_uri or 'mongomock'})")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_dir = None
+        if not args.no_rl_model and write_model(Path(tmp), args.seed) is not None:
+            model_dir = Path(tmp)
+        install_loader(loader, model_dir)
+
+        from server import app
+
+        factories = request_factories(corpus, args.limit, args.candidate_k, args.batch_users)
+        results: Dict[str, Dict[str, Any]] = {}
+        print(f"{'endpoint':>12} | {'req/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'errors':>6}")
+        for i, name in enumerate(names):
+            r = run_endpoint(app, factories[name], args.requests, args.concurrency, args.warmup, args.seed + i)
+            results[name] = asdict(r)
+            print(f"{name:>12} | {r.throughput_rps:8.1f} | {r.p50_ms:8.2f} | {r.p95_ms:8.2f} | {r.p99_ms:8.2f} | {r.errors:6d}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": "mongod" if args.mongo_uri else "mongomock",
+            "rl_model": model_dir is not None,
+            "corpus": asdict(config) | {"now": config.now.isoformat()},
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "limit": args.limit,
+            "candidate_k": args.candidate_k,
+        },
+        "endpoints": results,
+    }
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"saved → {args.save}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ baseline 대비 회귀 (tolerance={args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print(f"✅ baseline 대비 회귀 없음 (tolerance={args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Paper 모델 메모리 벤치마크.
+
+MongoDB 문서를 흉내낸 dict 를 하나씩 만들어 Paper 로 변환하고 (변환 후 dict 는 버림)
+캐시처럼 N 개를 들고 있을 때 tracemalloc 기준 논문당 바이트를 비교한다.
+
+- legacy: 예전 레이아웃 (일반 dataclass, list categories/keywords, list[float] embedding)
+- current: recommendation.models.data_models.Paper (__slots__, intern tuple, float32 embedding)
+
+실행:
+    python -m benchmarks.bench_model_memory --papers 100000 --embedding-dim 128
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from recommendation.data.data_loader import MongoDataLoader
+
+_CATEGORIES = ["cs.LG", "cs.AI", "cs.CL", "cs.CV", "stat.ML", "math.OC", "cs.IR", "cs.RO"]
+_KEYWORDS = [f"term{i}" for i in range(500)]
+
+
+@dataclass
+class _LegacyPaper:
+    mongo_id: str
+    arxiv_id: Optional[str] = None
+    title: Optional[str] = None
+    abstract: Optional[str] = None
+    authors: Optional[str] = None
+    categories: List[str] = field(default_factory=list)
+    keywords: List[str] = field(default_factory=list)
+    update_date: Optional[datetime] = None
+    bookmark_count: int = 0
+    view_count: int = 0
+    difficulty_level: Optional[str] = None
+    summary: Optional[Dict[str, Any]] = None
+    embedding_vector: Optional[List[float]] = None
+
+
+def _legacy_doc_to_paper(doc: Dict[str, Any]) -> _LegacyPaper:
+    return _LegacyPaper(
+        mongo_id=str(doc["_id"]),
+        arxiv_id=doc.get("_id"),
+        title=doc.get("title"),
+        abstract=doc.get("abstract"),
+        authors=doc.get("authors"),
+        categories=list(doc.get("categories") or []),
+        keywords=list(doc.get("keywords") or []),
+        update_date=MongoDataLoader._parse_datetime(doc.get("update_date")),
+        bookmark_count=int(doc.get("bookmark_count") or 0),
+        view_count=int(doc.get("view_count") or 0),
+        difficulty_level=doc.get("difficulty_level"),
+        summary=doc.get("summary"),
+        embedding_vector=doc.get("embedding_vector"),
+    )
+
+
+def _iter_docs(n: int, embedding_dim: int, seed: int) -> Iterator[Dict[str, Any]]:
+    """
+    BSON decode 처럼 문서마다 새 문자열 객체를 만든다. (intern 효과를 공정하게 보기 위함)
+    """
+    rng = random.Random(seed)
+    base = datetime(2024, 1, 1)
+    for i in range(n):
+        yield {
+            "_id": f"{2400 + i // 100000:04d}.{i % 100000:05d}",
+            "title": f"paper title {i}",
+            "abstract": f"abstract {i} " * 8,
+            "authors": f"author {i % 977}",
+            "categories": ["".join(c) for c in rng.sample(_CATEGORIES, rng.randint(1, 3))],
+            "keywords": ["".join(k) for k in rng.sample(_KEYWORDS, rng.randint(2, 6))],
+            "update_date": base - timedelta(days=i % 3000),
+            "bookmark_count": rng.randint(0, 50),
+            "view_count": rng.randint(0, 5000),
+            "embedding_vector": [rng.random() for _ in range(embedding_dim)] if embedding_dim else None,
+        }
+
+
+def measure(convert: Callable[[Dict[str, Any]], Any], n: int, embedding_dim: int, seed: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    papers = [convert(doc) for doc in _iter_docs(n, embedding_dim, seed)]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(papers) == n
+    del papers
+    return (after - before) / n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Paper 모델 메모리 벤치마크")
+    parser.add_argument("--papers", type=int, default=100_000)
+    parser.add_argument("--embedding-dim", type=int, default=128)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"papers={args.papers}, embedding_dim={args.embedding_dim}")
+    legacy = measure(_legacy_doc_to_paper, args.papers, args.embedding_dim, args.seed)
+    current = measure(MongoDataLoader._doc_to_paper, args.papers, args.embedding_dim, args.seed)
+
+    print(f"{'layout':>10} | {'bytes/paper':>12} | {'total MB':>9}")
+    for name, per in (("legacy", legacy), ("current", current)):
+        print(f"{name:>10} | {per:12.0f} | {per * args.papers / 1e6:9.1f}")
+    print(f"reduction: {(1 - current / legacy) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
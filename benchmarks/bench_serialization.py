@@ -0,0 +1,131 @@
+"""
+추천 응답 직렬화 비용 벤치마크.
+
+to_frontend_dict() 결과 리스트 → 응답 bytes 까지 한 응답당 걸리는 시간을 비교한다.
+
+- legacy: transform_paper(pydantic) → RecommendationResponse → jsonable_encoder → json.dumps
+  (FastAPI response_model 경로와 같은 변환 횟수)
+- fast: recommendation.interface.serialization.dumps_response (dict → orjson bytes)
+- fast+fields: fields=paper_id,title,total_score (abstract / summary 생략)
+
+실행:
+    python -m benchmarks.bench_serialization --limits 6 50 500 --repeat 200
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+
+from recommendation.interface.serialization import dumps_response, iter_ndjson, orjson, parse_fields
+from server import PaperRecommendation, RecommendationResponse
+
+_CATEGORIES = ["cs.LG", "cs.AI", "cs.CL", "cs.CV", "stat.ML", "math.OC", "cs.IR", "cs.RO"]
+_SLIM_FIELDS = "paper_id,title,total_score"
+
+
+def _results(n: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"2401.{i:05d}",
+            "title": f"paper title {i}",
+            "authors": f"author {i % 97}, author {i % 31}",
+            "abstract": f"abstract sentence {i}. " * 60,
+            "categories": rng.sample(_CATEGORIES, 2),
+            "summary": {"overview": f"summary {i} " * 40, "key_points": [f"point {j}" for j in range(4)]},
+            "externalUrl": f"https://arxiv.org/abs/2401.{i:05d}",
+            "score": rng.random(),
+            "features": {
+                "keyword": rng.random(),
+                "category": rng.random(),
+                "popularity": rng.random(),
+                "recency": rng.random(),
+                "rule_score": rng.random(),
+                "rl_score": rng.random(),
+                "model_version": 3.0,
+            },
+        }
+        for i in range(n)
+    ]
+
+
+def _meta() -> Dict[str, Any]:
+    return {
+        "user_id": 42,
+        "session_id": "00000000-0000-0000-0000-000000000000",
+        "recommendation_type": "rl_based",
+        "timestamp": datetime(2025, 1, 1).isoformat(),
+    }
+
+
+def transform_paper(raw_paper: Dict[str, Any]) -> PaperRecommendation:
+    """기존 server 경로: frontend dict → pydantic 모델 (비교 기준으로만 남김)"""
+    return PaperRecommendation(
+        paper_id=raw_paper.get("id", ""),
+        title=raw_paper.get("title"),
+        authors=raw_paper.get("authors"),
+        abstract=raw_paper.get("abstract"),
+        categories=raw_paper.get("categories", []),
+        summary=raw_paper.get("summary"),
+        external_url=raw_paper.get("externalUrl"),
+        total_score=raw_paper.get("score", 0.0),
+        breakdown=raw_paper.get("features", {}),
+    )
+
+
+def legacy(results: List[Dict[str, Any]]) -> bytes:
+    recommendations = [transform_paper(p) for p in results]
+    response = RecommendationResponse(
+        **_meta(), recommendations=recommendations, total_count=len(recommendations)
+    )
+    return json.dumps(jsonable_encoder(response), ensure_ascii=False).encode("utf-8")
+
+
+def fast(results: List[Dict[str, Any]]) -> bytes:
+    return dumps_response(_meta(), results)
+
+
+def fast_fields(results: List[Dict[str, Any]]) -> bytes:
+    return dumps_response(_meta(), results, parse_fields(_SLIM_FIELDS))
+
+
+def ndjson(results: List[Dict[str, Any]]) -> bytes:
+    return b"".join(iter_ndjson(_meta(), results))
+
+
+def measure(fn: Callable[[List[Dict[str, Any]]], bytes], results: List[Dict[str, Any]], repeat: int):
+    fn(results)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = fn(results)
+    elapsed = time.perf_counter() - start
+    return elapsed / repeat * 1e6, len(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="추천 응답 직렬화 벤치마크")
+    parser.add_argument("--limits", type=int, nargs="+", default=[6, 50, 500])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"orjson={'yes' if orjson is not None else 'no (json fallback)'}, repeat={args.repeat}")
+    print(f"{'limit':>6} | {'path':>12} | {'µs/resp':>10} | {'bytes':>9} | {'speedup':>7}")
+    paths = (("legacy", legacy), ("fast", fast), ("fast+fields", fast_fields), ("ndjson", ndjson))
+    for limit in args.limits:
+        results = _results(limit, args.seed)
+        base = None
+        for name, fn in paths:
+            us, size = measure(fn, results, args.repeat)
+            base = base or us
+            print(f"{limit:>6} | {name:>12} | {us:10.1f} | {size:9d} | {base / us:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
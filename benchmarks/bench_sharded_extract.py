@@ -0,0 +1,170 @@
+"""
+sharded feature 추출 스케일링 벤치마크.
+
+실제 MongoDB 없이, 결정적으로 생성한 in-memory 데이터로
+extract_features_sharded 를 worker 수별로 돌려 소요 시간과 speedup 을 출력한다.
+모든 실행의 merge 결과가 byte 단위로 같은지도 함께 확인한다.
+
+실행:
+    python -m benchmarks.bench_sharded_extract --users 400 --rows-per-user 50
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+from recommendation.models.data_models import Paper, UserProfile
+from recommendation.rl.dataset.sharded import extract_features_sharded, merge_shards
+
+_WORDS = [f"term{i}" for i in range(2000)]
+_CATEGORIES = ["cs.LG", "cs.AI", "cs.CL", "cs.CV", "stat.ML", "math.OC", "cs.IR", "cs.RO"]
+
+
+class _Cursor:
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self._docs = docs
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self._docs.sort(key=lambda d: d[field], reverse=direction < 0)
+        return self
+
+    def __iter__(self):
+        return iter(self._docs)
+
+
+class _Collection:
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self._docs = docs
+
+    def find(self, flt=None, projection=None):
+        user_ids = set((flt or {}).get("user_id", {}).get("$in", []))
+        return _Cursor([d for d in self._docs if d["user_id"] in user_ids])
+
+    def distinct(self, field, flt=None):
+        return sorted({d[field] for d in self._docs})
+
+
+class SyntheticLoader:
+    """
+    MongoDataLoader 가 sharded 추출에서 쓰는 메서드만 흉내내는 in-memory loader.
+    seed 가 같으면 모든 프로세스에서 같은 데이터를 만든다.
+    """
+
+    def __init__(self, seed: int, num_users: int, num_papers: int, rows_per_user: int):
+        rng = random.Random(seed)
+        base = datetime(2024, 1, 1)
+
+        self.papers: Dict[str, Paper] = {}
+        for i in range(num_papers):
+            pid = f"{2400 + i // 10000}.{i % 10000:05d}"
+            self.papers[pid] = Paper(
+                mongo_id=pid,
+                arxiv_id=pid,
+                title=" ".join(rng.choices(_WORDS, k=10)),
+                abstract=" ".join(rng.choices(_WORDS, k=150)),
+                categories=rng.sample(_CATEGORIES, k=rng.randint(1, 3)),
+                keywords=rng.sample(_WORDS, k=5),
+                update_date=base - timedelta(days=rng.randint(0, 1500)),
+                bookmark_count=rng.randint(0, 200),
+                view_count=rng.randint(0, 5000),
+            )
+        paper_ids = list(self.papers)
+
+        self.profiles: Dict[int, UserProfile] = {}
+        docs = []
+        for u in range(1, num_users + 1):
+            bookmarked = rng.sample(paper_ids, k=10)
+            queries = [" ".join(rng.choices(_WORDS, k=3)) for _ in range(5)]
+            self.profiles[u] = UserProfile(
+                user_id=u,
+                interests_categories=sorted({c for p in bookmarked for c in self.papers[p].categories}),
+                interests_keywords=sorted({k for p in bookmarked for k in self.papers[p].keywords}),
+                bookmarked_paper_ids=bookmarked,
+                search_queries=queries,
+            )
+            for j, pid in enumerate(rng.sample(paper_ids, k=rows_per_user)):
+                docs.append({
+                    "_id": f"{u}-{j}",
+                    "user_id": u,
+                    "paper_id": pid,
+                    "was_clicked": rng.random() < 0.1,
+                })
+
+        self.db = {"paper_recommendations": _Collection(docs)}
+
+    def build_user_profile(self, user_id: int) -> UserProfile:
+        return self.profiles[user_id]
+
+    def get_papers_by_arxiv_ids(self, arxiv_ids: Iterable[str]) -> Dict[str, Paper]:
+        return {pid: self.papers[pid] for pid in arxiv_ids if pid in self.papers}
+
+
+def _digest(dir_path: Path) -> str:
+    h = hashlib.sha1()
+    for name in ("X.npy", "y.npy", "user_ids.npy", "paper_ids.npy"):
+        h.update((dir_path / name).read_bytes())
+    return h.hexdigest()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=400)
+    parser.add_argument("--papers", type=int, default=5000)
+    parser.add_argument("--rows-per-user", type=int, default=50)
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--workers", type=str, default=None,
+                        help="쉼표로 구분한 worker 수 목록 (기본: 1,2,4,... ≤ CPU 수)")
+    args = parser.parse_args()
+
+    if args.workers:
+        worker_counts = [int(w) for w in args.workers.split(",")]
+    else:
+        cpu = os.cpu_count() or 1
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= cpu:
+            worker_counts.append(worker_counts[-1] * 2)
+
+    factory = partial(SyntheticLoader, 42, args.users, args.papers, args.rows_per_user)
+    user_ids = list(range(1, args.users + 1))
+    now = datetime(2025, 1, 1)
+
+    print(f"users={args.users}, rows={args.users * args.rows_per_user}, shards={args.shards}")
+    print(f"{'workers':>8} {'seconds':>10} {'rows/s':>10} {'speedup':>8}  digest")
+
+    baseline = None
+    digests = set()
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            shard_root = Path(tmp) / "shards"
+            t0 = time.perf_counter()
+            extract_features_sharded(
+                shard_root,
+                num_workers=workers,
+                num_shards=args.shards,
+                now=now,
+                loader_factory=factory,
+                user_ids=user_ids,
+            )
+            merged = merge_shards(shard_root, Path(tmp) / "merged")
+            elapsed = time.perf_counter() - t0
+            digest = _digest(Path(tmp) / "merged")
+
+        baseline = baseline or elapsed
+        digests.add(digest)
+        rows = merged.X.shape[0]
+        print(f"{workers:>8} {elapsed:>10.2f} {rows / elapsed:>10.0f} {baseline / elapsed:>8.2f}  {digest[:12]}")
+
+    print("deterministic:", "yes" if len(digests) == 1 else "NO (결과가 worker 수에 따라 다름)")
+
+
+if __name__ == "__main__":
+    main()
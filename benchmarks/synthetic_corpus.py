@@ -0,0 +1,145 @@
+"""
+벤치마크용 synthetic corpus.
+
+운영 DB / SSH 터널 없이 MongoDB 스키마와 같은 모양의 데이터를 결정적으로 만든다.
+
+- papers: arXiv 형식 _id, title / abstract / keywords (Zipf 분포 단어), categories 1~3개,
+  update_date (최근 N일에 분포), bookmark_count / view_count, embedding_vector
+- bookmarks / search_history: user 마다 0~max 개
+
+load_corpus(db, corpus) 로 mongomock 또는 로컬 mongod 의 database 에 넣고,
+make_loader(backend) 로 MongoDataLoader 를 만든다.
+
+    from benchmarks.synthetic_corpus import CorpusConfig, generate_corpus, make_loader
+    corpus = generate_corpus(CorpusConfig(papers=5000, users=200))
+    loader = make_loader(corpus)                       # mongomock
+    loader = make_loader(corpus, "mongodb://localhost:27017")  # 로컬 mongod
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from recommendation.data.data_loader import MongoDataLoader
+
+CATEGORIES = [
+    "cs.LG", "cs.AI", "cs.CL", "cs.CV", "cs.IR", "cs.RO", "cs.NE", "cs.CR",
+    "cs.DS", "cs.DC", "cs.SE", "cs.HC", "stat.ML", "math.OC", "eess.SP", "q-bio.NC",
+]
+
+BENCH_DB_NAME = "bench_arxiv"
+
+
+@dataclass
+class CorpusConfig:
+    papers: int = 5000
+    users: int = 200
+    vocab_size: int = 3000
+    embedding_dim: int = 64
+    max_bookmarks: int = 12
+    max_searches: int = 6
+    days: int = 365  # update_date 분포 범위
+    seed: int = 0
+    now: datetime = field(default_factory=lambda: datetime(2025, 1, 1))
+
+
+@dataclass
+class Corpus:
+    config: CorpusConfig
+    papers: List[Dict[str, Any]]
+    bookmarks: List[Dict[str, Any]]
+    searches: List[Dict[str, Any]]
+
+    @property
+    def paper_ids(self) -> List[str]:
+        return [p["_id"] for p in self.papers]
+
+    @property
+    def user_ids(self) -> List[int]:
+        return list(range(1, self.config.users + 1))
+
+
+def _zipf_words(rng: random.Random, vocab: List[str], weights: List[float], k: int) -> List[str]:
+    return rng.choices(vocab, weights=weights, k=k)
+
+
+def generate_corpus(config: Optional[CorpusConfig] = None) -> Corpus:
+    config = config or CorpusConfig()
+    rng = random.Random(config.seed)
+    np_rng = np.random.default_rng(config.seed)
+
+    vocab = [f"term{i}" for i in range(config.vocab_size)]
+    weights = [1.0 / (i + 1) for i in range(config.vocab_size)]
+    cat_weights = [1.0 / (i + 1) ** 0.7 for i in range(len(CATEGORIES))]
+
+    papers = []
+    for i in range(config.papers):
+        n_cat = rng.randint(1, 3)
+        cats = list(dict.fromkeys(rng.choices(CATEGORIES, weights=cat_weights, k=n_cat)))
+        emb = np_rng.standard_normal(config.embedding_dim).astype(np.float32) if config.embedding_dim else None
+        papers.append({
+            "_id": f"{2400 + i // 100000:04d}.{i % 100000:05d}",
+            "title": " ".join(_zipf_words(rng, vocab, weights, rng.randint(5, 12))),
+            "abstract": " ".join(_zipf_words(rng, vocab, weights, rng.randint(80, 160))),
+            "authors": ", ".join(f"author{rng.randint(0, 2000)}" for _ in range(rng.randint(1, 5))),
+            "categories": cats,
+            "keywords": list(dict.fromkeys(_zipf_words(rng, vocab, weights, rng.randint(3, 8)))),
+            "update_date": config.now - timedelta(days=rng.random() * config.days),
+            "bookmark_count": int(np_rng.zipf(2.0)) - 1,
+            "view_count": int(np_rng.zipf(1.5)) % 100_000,
+            "embedding_vector": emb.tolist() if emb is not None else None,
+        })
+
+    paper_ids = [p["_id"] for p in papers]
+    bookmarks: List[Dict[str, Any]] = []
+    searches: List[Dict[str, Any]] = []
+    for uid in range(1, config.users + 1):
+        for pid in rng.sample(paper_ids, rng.randint(0, min(config.max_bookmarks, len(paper_ids)))):
+            bookmarks.append({"users_id": uid, "paper_id": pid})
+        for k in range(rng.randint(0, config.max_searches)):
+            searches.append({
+                "users_id": uid,
+                "query": " ".join(_zipf_words(rng, vocab, weights, rng.randint(1, 4))),
+                "searched_at": config.now - timedelta(minutes=k * 37 + rng.randint(0, 30)),
+            })
+
+    return Corpus(config=config, papers=papers, bookmarks=bookmarks, searches=searches)
+
+
+def load_corpus(db, corpus: Corpus) -> None:
+    """
+    papers / bookmarks / search_history 를 비우고 corpus 로 채운다. (insert_many 가 dict 를 바꾸지 않도록 복사)
+    """
+    for name, docs in (
+        ("papers", corpus.papers),
+        ("bookmarks", corpus.bookmarks),
+        ("search_history", corpus.searches),
+    ):
+        db[name].drop()
+        if docs:
+            db[name].insert_many([dict(d) for d in docs])
+    for name in ("recommendation_events", "recommendation_interactions", "precomputed_recommendations"):
+        db[name].drop()
+
+
+def make_loader(corpus: Corpus, mongo_uri: Optional[str] = None, db_name: str = BENCH_DB_NAME) -> MongoDataLoader:
+    """
+    mongo_uri 가 없으면 mongomock (pip install mongomock), 있으면 해당 mongod 의 db_name 에 적재.
+    """
+    if mongo_uri:
+        from pymongo import MongoClient
+
+        client = MongoClient(mongo_uri)
+    else:
+        try:
+            import mongomock
+        except ImportError as e:
+            raise SystemExit("mongomock 이 필요합니다: pip install mongomock (또는 --mongo-uri 로 로컬 mongod 사용)") from e
+        client = mongomock.MongoClient()
+
+    load_corpus(client[db_name], corpus)
+    return MongoDataLoader(client=client, db_name=db_name)
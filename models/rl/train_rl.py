@@ -6,6 +6,14 @@ from pymongo import MongoClient
 from datetime import datetime
 import os
 import json
+import sys
+
+# 프로젝트 루트에서 `python models/rl/train_rl.py` 로 실행해도 recommendation 패키지를 찾도록
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from recommendation.rl.bandit_policy import DEFAULT_MODEL_PATH, build_model, save_checkpoint
+from recommendation.rl.feature_schema import DEFAULT_FEATURE_SCHEMA
+from recommendation.rl.state_builder import feature_row_from_logged
 
 # --------------------------
 #  MongoDB 설정
@@ -14,76 +22,128 @@ MONGO_URI = "mongodb://localhost:27017"
 DB_NAME = "recommendation_db"
 
 # --------------------------
-# Bandit Policy 모델 정의
+# Bandit Policy 모델 (bandit_policy.MODEL_ZOO 의 architecture tag)
 # --------------------------
-class BanditPolicy(nn.Module):
-    def __init__(self, input_dim=5, hidden_dim=32):
-        super().__init__()
-        self.net = nn.Sequential(
-            nn.Linear(input_dim, hidden_dim),
-            nn.ReLU(),
-            nn.Linear(hidden_dim, 1),     # score output
-        )
-
-    def forward(self, x):
-        return self.net(x)
+ARCH = "mlp"
 
 
 # --------------------------
-# MongoDB에서 로그 가져오기 (JOIN 포함)
+# MongoDB에서 로그 가져오기 (streaming JOIN)
 # --------------------------
-def load_logs_from_mongo():
+def _event_item_lookup(event):
+    """
+    event 한 건의 노출 목록을 {paper_id: features} dict 로 변환.
+    - 예전 로그: results[].id / results[].features
+    - 현재 로그(log_recommendation_event): items[].paper_id / items[].features
+    """
+    lookup = {}
+    for item in event.get("results") or []:
+        lookup[item.get("id")] = item.get("features") or {}
+    for item in event.get("items") or []:
+        lookup[item.get("paper_id")] = item.get("features") or {}
+    return lookup
+
+
+def iter_log_samples(db, chunk_size=1000):
+    """
+    interactions 를 recommendation_id 순으로 읽으면서 chunk 마다
+    필요한 event 만 $in + projection 으로 가져와 JOIN 한다.
+    → 전체 로그를 메모리에 올리지 않으므로 로그가 쌓여도 메모리 사용량이 일정.
+
+    필요한 index (recommendation.data.indexes.REQUIRED_INDEXES, `python -m recommendation.data.indexes --create`):
+    - recommendation_interactions (recommendation_id, paper_id): recommendation_id 정렬을 index 순서로 읽음
+      (index 가 없어도 allow_disk_use 로 정렬은 되지만 전체 collection 을 디스크 정렬함)
+    - recommendation_events 는 _id (= recommendation_id) 로 조회하므로 기본 _id index 사용
+
+    yield: [(features, reward), ...] (chunk 단위)
+    """
+    cursor = (
+        db.recommendation_interactions.find(
+            {"recommendation_id": {"$ne": None}},
+            {"_id": 0, "recommendation_id": 1, "paper_id": 1, "reward": 1},
+            allow_disk_use=True,
+        )
+        .sort("recommendation_id", 1)
+        .batch_size(chunk_size)
+    )
+
+    def join(batch):
+        rec_ids = list({inter["recommendation_id"] for inter in batch})
+        # log_recommendation_event 는 recommendation_id 를 _id 로 저장 → _id index 로 조회
+        events = db.recommendation_events.find(
+            {"_id": {"$in": rec_ids}},
+            {
+                "recommendation_id": 1,
+                "results.id": 1,
+                "results.features": 1,
+                "items.paper_id": 1,
+                "items.features": 1,
+            },
+        )
+        lookups = {e.get("recommendation_id") or e["_id"]: _event_item_lookup(e) for e in events}
+
+        samples = []
+        for inter in batch:
+            lookup = lookups.get(inter["recommendation_id"])
+            reward = inter.get("reward")
+            if lookup is None or reward is None:
+                continue
+            # 추천된 목록 중 클릭된 논문 찾기 (dict 조회)
+            features = lookup.get(inter.get("paper_id"))
+            if features is not None:
+                samples.append((features, reward))  # rule_score 포함
+        return samples
+
+    batch = []
+    for inter in cursor:
+        batch.append(inter)
+        if len(batch) >= chunk_size:
+            yield join(batch)
+            batch = []
+    if batch:
+        yield join(batch)
+
+
+def load_logs_from_mongo(chunk_size=1000):
+    """
+    chunk 마다 바로 tensor 로 변환해서 원본 로그 dict 는 들고 있지 않는다.
+    return: (X, y) 또는 샘플이 없으면 None
+    """
     client = MongoClient(MONGO_URI)
     db = client[DB_NAME]
 
-    events = list(db.recommendation_events.find({}))
-    interactions = list(db.recommendation_interactions.find({}))
-
-    event_map = {e["recommendation_id"]: e for e in events}
-
-    samples = []
-
-    for inter in interactions:
-        rec_id = inter["recommendation_id"]
-        if rec_id not in event_map:
+    X_parts, y_parts = [], []
+    for samples in iter_log_samples(db, chunk_size=chunk_size):
+        if not samples:
             continue
+        X_chunk, y_chunk = convert_to_tensor(samples)
+        X_parts.append(X_chunk)
+        y_parts.append(y_chunk)
 
-        clicked_paper = inter["paper_id"]
-        reward = inter["reward"]
-
-        event = event_map[rec_id]
-
-        # 추천된 목록 중 클릭된 논문 찾기
-        for item in event["results"]:
-            if item["id"] == clicked_paper:
-                features = item["features"]  # rule_score 포함
-                samples.append((features, reward))
-                break
-
-    print(f"Loaded logs: {len(samples)} samples")
-    return samples
+    n = sum(x.shape[0] for x in X_parts)
+    print(f"Loaded logs: {n} samples")
+    if n == 0:
+        return None
+    return torch.cat(X_parts), torch.cat(y_parts)
 
 
 # --------------------------
 # feature → tensor 변환
 # --------------------------
 def convert_to_tensor(samples):
+    """
+    서버(state_builder)와 같은 DEFAULT_FEATURE_SCHEMA 순서로 변환.
+    (rule_total_score 는 저장된 구성요소로 다시 합산)
+    """
     X = []
     y = []
 
     for feat, reward in samples:
-        vector = [
-            feat.get("recency", 0),
-            feat.get("popularity", 0),
-            feat.get("category", 0),
-            feat.get("keyword", 0),
-            feat.get("rule_score", 0),
-        ]
-        X.append(vector)
+        X.append(feature_row_from_logged(feat))
         y.append(reward)
 
     X = torch.tensor(X, dtype=torch.float32)
-    y = torch.tensor(y, dtype=torch.float32).unsqueeze(1)
+    y = torch.tensor(y, dtype=torch.float32)
 
     return X, y
 
@@ -92,7 +152,7 @@ def convert_to_tensor(samples):
 # 모델 학습
 # --------------------------
 def train_model(X, y, epochs=100, lr=1e-3):
-    model = BanditPolicy(input_dim=5)
+    model = build_model(ARCH, DEFAULT_FEATURE_SCHEMA.dim)
     optimizer = optim.Adam(model.parameters(), lr=lr)
     loss_fn = nn.MSELoss()
 
@@ -113,10 +173,8 @@ def train_model(X, y, epochs=100, lr=1e-3):
 # 모델 저장
 # --------------------------
 def save_model(model):
-    os.makedirs("models/rl", exist_ok=True)
-    save_path = "models/rl/bandit_policy_latest.pt"
-    torch.save(model.state_dict(), save_path)
-    print(f"Model saved at: {save_path}")
+    save_path = save_checkpoint(model, DEFAULT_MODEL_PATH, arch=ARCH, schema=DEFAULT_FEATURE_SCHEMA)
+    print(f"Model saved at: {save_path} (arch={ARCH}, schema=v{DEFAULT_FEATURE_SCHEMA.version})")
 
 
 # --------------------------
@@ -125,12 +183,12 @@ def save_model(model):
 if __name__ == "__main__":
     print("🚀 RL Training Start")
 
-    samples = load_logs_from_mongo()
-    if len(samples) == 0:
+    data = load_logs_from_mongo()
+    if data is None:
         print("No training samples available. Stop.")
         exit()
 
-    X, y = convert_to_tensor(samples)
+    X, y = data
     model = train_model(X, y, epochs=80)
     save_model(model)
 
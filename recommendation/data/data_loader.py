@@ -7,11 +7,20 @@ from uuid import uuid4
 
 from bson import ObjectId
 from dotenv import load_dotenv
-from pymongo import MongoClient, DESCENDING
+from pymongo import MongoClient, DESCENDING, ReplaceOne
 from sshtunnel import SSHTunnelForwarder
 
+from .. import metrics
 from ..models.data_models import Paper, UserProfile
+from .postgres_loader import (
+    PostgresUserInterestLoader,
+    fetch_user_category_codes_async,
+    get_interest_loader,
+    resolve_category_codes,
+)
 from .preprocess import tokenize_keywords
+from .recent_window import get_recent_window
+from .static_features import get_static_feature_table
 
 
 # -----------------------------------------
@@ -73,7 +82,12 @@ class MongoDataLoader:
     MongoDB 기반 UserProfile + Paper 로딩 + 로그 기록 클래스
     """
 
-    def __init__(self, client: Optional[MongoClient] = None, db_name: str = None):
+    def __init__(
+        self,
+        client: Optional[MongoClient] = None,
+        db_name: str = None,
+        interest_loader: Optional[PostgresUserInterestLoader] = None,
+    ):
         # -----------------------------
         # MongoDB 연결
         # -----------------------------
@@ -94,8 +108,13 @@ class MongoDataLoader:
                 socketTimeoutMS=30000,
             )
 
+            # 운영 연결이면 Postgres 명시 관심 카테고리도 사용 (client 를 직접 넘긴 경우는 interest_loader 인자로만)
+            if interest_loader is None:
+                interest_loader = get_interest_loader()
+
         self.client = client
         self.db = self.client[db_name or MONGODB_DB_NAME]
+        self.interest_loader = interest_loader
 
         # 컬렉션
         self.col_papers = self.db["papers"]
@@ -105,6 +124,13 @@ class MongoDataLoader:
         # + 추천 로그 컬렉션
         self.col_reco_events = self.db["recommendation_events"]
         self.col_reco_interactions = self.db["recommendation_interactions"]
+        # 사전 계산된 추천 feed (_id = user_id)
+        self.col_precomputed = self.db["precomputed_recommendations"]
+
+        # user 와 무관한 최신 논문 후보는 DB 당 하나인 공용 window 에서 (첫 조회 때 로딩 + 백그라운드 갱신)
+        self.recent_window = get_recent_window(self)
+        # user 와 무관한 popularity / recency feature 테이블 (+ popularity 순 후보), DB 당 하나
+        self.static_features = get_static_feature_table(self)
 
     # ------------------------------------------------------
     # Paper Document → Paper dataclass 변환
@@ -128,8 +154,8 @@ class MongoDataLoader:
             title=doc.get("title"),
             abstract=doc.get("abstract"),
             authors=doc.get("authors"),
-            categories=list(doc.get("categories") or []),
-            keywords=list(doc.get("keywords") or []),
+            categories=doc.get("categories") or (),
+            keywords=doc.get("keywords") or (),
             update_date=MongoDataLoader._parse_datetime(doc.get("update_date")),
             bookmark_count=int(doc.get("bookmark_count") or 0),
             view_count=int(doc.get("view_count") or 0),
@@ -146,10 +172,26 @@ class MongoDataLoader:
         doc = self.col_papers.find_one({"_id": arxiv_id})
         return self._doc_to_paper(doc) if doc else None
 
-    def get_recent_papers(self, limit: int = 200):
+    def get_papers_by_arxiv_ids(self, arxiv_ids: Iterable[str]) -> Dict[str, Paper]:
+        # 여러 논문을 $in 쿼리 한 번으로 조회 (arxiv_id → Paper)
+        ids = list(dict.fromkeys(arxiv_ids))
+        if not ids:
+            return {}
+        cursor = self.col_papers.find({"_id": {"$in": ids}})
+        return {d["_id"]: self._doc_to_paper(d) for d in cursor}
+
+    def get_recent_papers(self, limit: int = 200) -> List[Paper]:
+        # recent_window 에서 반환 (인코딩까지 끝난 공유 Paper, 읽기 전용)
+        return self.recent_window.papers(limit)
+
+    def query_recent_papers(self, limit: int = 200) -> List[Paper]:
         cursor = self.col_papers.find().sort("update_date", DESCENDING).limit(limit)
         return [self._doc_to_paper(d) for d in cursor]
 
+    def get_popular_papers(self, limit: int = 200) -> List[Paper]:
+        # popularity 순 후보 (static_features 갱신 때 같이 만들어지는 공유 Paper, 읽기 전용)
+        return self.static_features.popular_papers(limit)
+
     def get_papers_by_categories(self, categories: Iterable[str], limit=300):
         cursor = (
             self.col_papers.find({"categories": {"$in": list(categories)}})
@@ -158,6 +200,34 @@ class MongoDataLoader:
         )
         return [self._doc_to_paper(d) for d in cursor]
 
+    def get_papers_by_category_many(
+        self, categories: Iterable[str], limit: int = 300
+    ) -> Dict[str, List[Paper]]:
+        """
+        category 별 최신 limit 개씩 (여러 user 가 후보군을 공유할 때 사용).
+        user 의 관심 category 목록에 대한 get_papers_by_categories 결과는
+        여기서 받은 category 별 목록을 합쳐 최신순 limit 개를 자르면 같다.
+
+        $in 쿼리 한 번을 최신순으로 읽으면서 category 별로 나누고, 모든 category 가 limit 개를 채우면 멈춘다.
+        """
+        result: Dict[str, List[Paper]] = {c: [] for c in categories}
+        if not result or limit <= 0:
+            return result
+        open_cats = set(result)
+        cursor = self.col_papers.find({"categories": {"$in": list(result)}}).sort("update_date", DESCENDING)
+        for doc in cursor:
+            hits = [c for c in doc.get("categories") or () if c in open_cats]
+            if not hits:
+                continue
+            paper = self._doc_to_paper(doc)
+            for c in dict.fromkeys(hits):
+                result[c].append(paper)
+                if len(result[c]) >= limit:
+                    open_cats.discard(c)
+            if not open_cats:
+                break
+        return result
+
     # ------------------------------------------------------
     # USER DATA 조회
     # ------------------------------------------------------
@@ -178,16 +248,90 @@ class MongoDataLoader:
         )
         return [d.get("query") for d in cursor if d.get("query")]
 
+    def get_bookmarked_paper_ids_many(self, user_ids: Sequence[int]) -> Dict[int, List[str]]:
+        # 여러 user 의 북마크를 $in 쿼리 한 번으로 조회
+        result: Dict[int, List[str]] = {uid: [] for uid in user_ids}
+        cursor = self.col_bookmarks.find(
+            {"users_id": {"$in": list(result)}}, {"_id": 0, "users_id": 1, "paper_id": 1}
+        )
+        for d in cursor:
+            pid = d.get("paper_id")
+            if isinstance(pid, str) and d.get("users_id") in result:
+                result[d["users_id"]].append(pid)
+        return result
+
+    def get_search_queries_many(
+        self, user_ids: Sequence[int], limit: int = 20
+    ) -> Dict[int, List[str]]:
+        # 여러 user 의 검색 기록을 최신순으로 한 번에 읽고 user 별 limit 개만 남김
+        result: Dict[int, List[str]] = {uid: [] for uid in user_ids}
+        cursor = (
+            self.col_search_history.find(
+                {"users_id": {"$in": list(result)}},
+                {"_id": 0, "users_id": 1, "query": 1, "searched_at": 1},
+            )
+            .sort("searched_at", DESCENDING)
+        )
+        for d in cursor:
+            queries = result.get(d.get("users_id"))
+            if queries is None or len(queries) >= limit:
+                continue
+            if d.get("query"):
+                queries.append(d["query"])
+        return result
+
     # ------------------------------------------------------
     # USER PROFILE 구성
     # ------------------------------------------------------
+    @metrics.timed("build_user_profile")
     def build_user_profile(self, user_id: int) -> UserProfile:
+        # Postgres 명시 관심 카테고리는 아래 Mongo 쿼리와 병렬로 조회
+        explicit = fetch_user_category_codes_async(self.interest_loader, [user_id])
+
         # 북마크 기반
         bookmarked_ids = self.get_user_bookmarked_paper_ids(user_id)
         bookmarked_papers = [self.get_paper_by_arxiv_id(pid) for pid in bookmarked_ids]
         bookmarked_papers = [p for p in bookmarked_papers if p]
+        search_queries = self.get_user_search_queries(user_id)
+
+        explicit_codes = resolve_category_codes(explicit)
+        return self._compose_profile(
+            user_id, bookmarked_ids, bookmarked_papers, search_queries,
+            explicit_codes.get(user_id) if explicit_codes is not None else None,
+        )
+
+    def build_user_profiles_many(self, user_ids: Sequence[int]) -> Dict[int, UserProfile]:
+        """
+        여러 user 의 프로필을 bulk 쿼리 3번(북마크, 북마크 논문, 검색 기록)으로 구성.
+        (+ Postgres 명시 관심 카테고리 bulk 쿼리 1번, Mongo 쿼리와 병렬)
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        explicit = fetch_user_category_codes_async(self.interest_loader, user_ids)
+        bookmarks = self.get_bookmarked_paper_ids_many(user_ids)
+        papers = self.get_papers_by_arxiv_ids(pid for ids in bookmarks.values() for pid in ids)
+        searches = self.get_search_queries_many(user_ids)
+        explicit_codes = resolve_category_codes(explicit)
+
+        profiles: Dict[int, UserProfile] = {}
+        for uid in user_ids:
+            ids = bookmarks[uid]
+            profiles[uid] = self._compose_profile(
+                uid, ids, [papers[pid] for pid in ids if pid in papers], searches[uid],
+                explicit_codes.get(uid) if explicit_codes is not None else None,
+            )
+        return profiles
 
-        categories: List[str] = []
+    @staticmethod
+    def _compose_profile(
+        user_id: int,
+        bookmarked_ids: List[str],
+        bookmarked_papers: List[Paper],
+        search_queries: List[str],
+        explicit_categories: Optional[List[str]] = None,
+    ) -> UserProfile:
+        # 명시 관심 카테고리도 후보 생성에 쓰이도록 interests_categories 에 포함
+        # (vocabulary.encode_profile 이 explicit 을 뺀 나머지를 북마크 카테고리로 본다)
+        categories: List[str] = list(explicit_categories or ())
         keywords: List[str] = []
 
         for p in bookmarked_papers:
@@ -195,7 +339,6 @@ class MongoDataLoader:
             keywords.extend(p.keywords)
 
         # 검색 기반 키워드
-        search_queries = self.get_user_search_queries(user_id)
         for q in search_queries:
             keywords.extend(tokenize_keywords(q))
 
@@ -205,12 +348,13 @@ class MongoDataLoader:
             interests_keywords=sorted(set(keywords)),
             bookmarked_paper_ids=bookmarked_ids,
             search_queries=search_queries,
-            explicit_categories=None,
+            explicit_categories=explicit_categories or None,
         )
 
     # ------------------------------------------------------
     # Candidate 생성
     # ------------------------------------------------------
+    @metrics.timed("get_candidate_papers_for_user")
     def get_candidate_papers_for_user(
         self, profile: UserProfile, limit_per_source: int = 200
     ):
@@ -235,20 +379,79 @@ class MongoDataLoader:
 
         return list(candidates.values())
 
+    # ------------------------------------------------------
+    # 사전 계산 feed (precomputed_recommendations)
+    # ------------------------------------------------------
+    def get_active_user_ids(self, since: datetime) -> List[int]:
+        """
+        since 이후 추천 노출 / 검색 / 상호작용 기록이 있는 user.
+        """
+        users = set(self.col_reco_events.distinct("user_id", {"created_at": {"$gte": since}}))
+        users.update(self.col_reco_interactions.distinct("user_id", {"created_at": {"$gte": since}}))
+        users.update(self.col_search_history.distinct("users_id", {"searched_at": {"$gte": since}}))
+        return sorted(int(u) for u in users if u is not None)
+
+    def get_precomputed_feed(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return self.col_precomputed.find_one({"_id": user_id})
+
+    def upsert_precomputed_feeds(self, docs: Sequence[Dict[str, Any]]) -> int:
+        # docs 의 _id(user_id) 기준으로 통째로 교체 (bulk_write 한 번)
+        if not docs:
+            return 0
+        self.col_precomputed.bulk_write(
+            [ReplaceOne({"_id": d["_id"]}, d, upsert=True) for d in docs], ordered=False
+        )
+        return len(docs)
+
     # ------------------------------------------------------
     # 추천 노출 로그 저장
     # ------------------------------------------------------
+    @metrics.timed("log_recommendation_event")
     def log_recommendation_event(
         self,
         user_id: int,
         results: Sequence[Dict[str, Any]],
         mode: str,
         request_meta: Optional[Dict[str, Any]] = None,
+        model_version: Optional[str] = None,
     ) -> str:
         """
         추천 결과 노출 시 1회 호출.
         - results: get_user_recommendations* 가 반환하는 results 리스트 형태 그대로 사용
+        - model_version: 점수를 낸 RL 모델 버전 (예: "v0003", rule-based 는 None)
         """
+        doc = self._make_event_doc(user_id, results, mode, request_meta, model_version)
+        self.col_reco_events.insert_one(doc)
+        return doc["_id"]
+
+    def log_recommendation_events_many(self, events: Sequence[Dict[str, Any]]) -> List[str]:
+        """
+        여러 user 의 노출 로그를 insert_many 한 번으로 저장 (batch 추천용).
+        - events: [{"user_id", "results", "mode", "request_meta"?, "model_version"?}, ...]
+        return: events 와 같은 순서의 recommendation_id 목록
+        """
+        docs = [
+            self._make_event_doc(
+                e["user_id"],
+                e["results"],
+                e["mode"],
+                e.get("request_meta"),
+                e.get("model_version"),
+            )
+            for e in events
+        ]
+        if docs:
+            self.col_reco_events.insert_many(docs, ordered=False)
+        return [d["_id"] for d in docs]
+
+    @staticmethod
+    def _make_event_doc(
+        user_id: int,
+        results: Sequence[Dict[str, Any]],
+        mode: str,
+        request_meta: Optional[Dict[str, Any]] = None,
+        model_version: Optional[str] = None,
+    ) -> Dict[str, Any]:
         recommendation_id = str(uuid4())
         now = datetime.utcnow()
 
@@ -263,17 +466,57 @@ class MongoDataLoader:
                 }
             )
 
-        doc = {
+        return {
             "_id": recommendation_id,
             "recommendation_id": recommendation_id,
             "user_id": user_id,
             "mode": mode,  # "rule_based" / "rule_based+rl"
+            "model_version": model_version,
             "items": items,
             "request_meta": request_meta or {},
             "created_at": now,
         }
-        self.col_reco_events.insert_one(doc)
-        return recommendation_id
+
+    def get_events_created_between(
+        self, since: datetime, until: datetime, limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """
+        since < created_at <= until 인 노출 로그 (created_at 오름차순, user_id / items 만).
+        """
+        cursor = self.col_reco_events.find(
+            {"created_at": {"$gt": since, "$lte": until}},
+            {"user_id": 1, "items.paper_id": 1, "items.features": 1, "created_at": 1},
+        ).sort("created_at", 1).limit(limit)
+        return list(cursor)
+
+    def get_interacted_paper_ids_many(self, recommendation_ids: Sequence[str]) -> Dict[str, set]:
+        """
+        recommendation_id → 상호작용 (클릭 / 북마크 / 닫기 등) 이 기록된 paper_id 집합.
+        """
+        out: Dict[str, set] = {}
+        if not recommendation_ids:
+            return out
+        cursor = self.col_reco_interactions.find(
+            {"recommendation_id": {"$in": list(recommendation_ids)}},
+            {"_id": 0, "recommendation_id": 1, "paper_id": 1},
+        )
+        for doc in cursor:
+            out.setdefault(doc["recommendation_id"], set()).add(doc.get("paper_id"))
+        return out
+
+    def get_logged_item_features(
+        self, recommendation_id: str, paper_id: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        노출 로그에서 (recommendation_id, paper_id) item 의 features 만 조회.
+        """
+        doc = self.col_reco_events.find_one(
+            {"_id": recommendation_id},
+            {"items": {"$elemMatch": {"paper_id": paper_id}}},
+        )
+        if not doc or not doc.get("items"):
+            return None
+        return doc["items"][0].get("features") or {}
 
     # ------------------------------------------------------
     # 클릭/북마크 등 상호작용 로그 저장
@@ -288,9 +531,11 @@ class MongoDataLoader:
         dwell_time: Optional[float] = None,
         reward: Optional[float] = None,
         meta: Optional[Dict[str, Any]] = None,
+        reward_version: Optional[str] = None,
     ) -> str:
         
         #사용자의 클릭/북마크/닫기 등 상호작용을 기록.
+        #reward_version: reward 를 계산한 RewardConfig.tag (relabel 여부 판단용)
         
         interaction_id = str(uuid4())
         now = datetime.utcnow()
@@ -305,6 +550,7 @@ class MongoDataLoader:
             "position": position,
             "dwell_time": dwell_time,
             "reward": reward,
+            "reward_version": reward_version,
             "meta": meta or {},
             "created_at": now,
         }
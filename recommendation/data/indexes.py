@@ -0,0 +1,337 @@
+"""
+indexes.py
+
+MongoDataLoader / dataset builder 가 보내는 쿼리에 필요한 index 선언, 생성, explain 점검.
+
+- REQUIRED_INDEXES: 컬렉션별 compound index (key 순서 = equality → sort)
+- ensure_indexes(db): 없는 index 만 생성 (key pattern 기준 비교, 이름이 달라도 같은 key 면 있는 것으로 봄)
+- explain_queries(db): loader 쿼리와 같은 모양으로 explain() → winning plan 에
+  COLLSCAN (전체 스캔) 이나 SORT (메모리 정렬) stage 가 있으면 경고
+- check_indexes(db, mode): 서버 시작 시 호출 (RL_INDEX_CHECK=off|warn|create, 기본 warn)
+
+CLI (로컬 mongod 로도 확인 가능):
+    python -m recommendation.data.indexes                      # 운영 DB (SSH 터널), 점검만
+    python -m recommendation.data.indexes --create             # 없는 index 생성 후 점검
+    python -m recommendation.data.indexes --mongo-uri mongodb://localhost:27017 --db arxiv --create
+"""
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from pymongo import ASCENDING, DESCENDING
+
+logger = logging.getLogger(__name__)
+
+INDEX_CHECK_MODE = os.getenv("RL_INDEX_CHECK", "warn").lower()
+
+# 방향은 1 / -1 이지만 기존 index 에는 "text", "hashed", "2dsphere" 같은 문자열 key 도 있음
+IndexKeys = Tuple[Tuple[str, Union[int, str]], ...]
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    collection: str
+    keys: IndexKeys
+    used_by: str  # 어떤 쿼리 때문에 필요한지
+
+    @property
+    def name(self) -> str:
+        return "_".join(f"{k}_{d}" for k, d in self.keys)
+
+
+REQUIRED_INDEXES: Tuple[IndexSpec, ...] = (
+    IndexSpec("papers", (("categories", ASCENDING), ("update_date", DESCENDING)), "get_papers_by_categories"),
+    IndexSpec("papers", (("update_date", DESCENDING),), "query_recent_papers (recent_window)"),
+    IndexSpec("papers", (("bookmark_count", DESCENDING),), "StaticFeatureTable.refresh_popular"),
+    IndexSpec("papers", (("view_count", DESCENDING),), "StaticFeatureTable.refresh_popular"),
+    IndexSpec("bookmarks", (("users_id", ASCENDING),), "get_user_bookmarked_paper_ids"),
+    IndexSpec("search_history", (("users_id", ASCENDING), ("searched_at", DESCENDING)), "get_user_search_queries"),
+    IndexSpec("search_history", (("searched_at", DESCENDING),), "get_active_user_ids"),
+    IndexSpec(
+        "paper_recommendations",
+        (("recommendation_type", ASCENDING), ("user_id", ASCENDING), ("paper_id", ASCENDING), ("_id", ASCENDING)),
+        "_iter_paper_recommendation_docs_for_users",
+    ),
+    IndexSpec(
+        "recommendation_events",
+        (("created_at", ASCENDING),),
+        "iter_logged_exposures / get_active_user_ids / get_events_created_between",
+    ),
+    IndexSpec(
+        "recommendation_interactions",
+        (("recommendation_id", ASCENDING), ("paper_id", ASCENDING)),
+        "_build_interaction_index / train_rl.iter_log_samples / get_interacted_paper_ids_many",
+    ),
+    IndexSpec("recommendation_interactions", (("created_at", ASCENDING),), "get_active_user_ids"),
+)
+
+
+@dataclass(frozen=True)
+class QueryProbe:
+    """
+    loader 쿼리와 같은 filter / sort 모양으로 explain 할 대상. (값은 plan 선택에 영향 없는 예시값)
+    build(collection) 은 cursor 를 돌려주거나, cursor 가 없는 distinct 같은 쿼리는
+    explain command 에 넣을 dict 를 돌려준다.
+    """
+    name: str
+    collection: str
+    build: Callable[[Any], Any]
+
+
+_USERS = [1, 2, 3]
+_SINCE = datetime(2025, 1, 1)
+
+
+def _distinct(col, key: str, query: Dict[str, Any]) -> Dict[str, Any]:
+    return {"distinct": col.name, "key": key, "query": query}
+
+
+LOADER_QUERIES: Tuple[QueryProbe, ...] = (
+    QueryProbe(
+        "get_papers_by_categories", "papers",
+        lambda col: col.find({"categories": {"$in": ["cs.LG", "cs.AI"]}}).sort("update_date", DESCENDING).limit(300),
+    ),
+    QueryProbe(
+        "query_recent_papers", "papers",
+        lambda col: col.find().sort("update_date", DESCENDING).limit(200),
+    ),
+    QueryProbe(
+        "refresh_popular (bookmark_count)", "papers",
+        lambda col: col.find().sort("bookmark_count", DESCENDING).limit(200),
+    ),
+    QueryProbe(
+        "refresh_popular (view_count)", "papers",
+        lambda col: col.find().sort("view_count", DESCENDING).limit(200),
+    ),
+    QueryProbe(
+        "get_user_bookmarked_paper_ids", "bookmarks",
+        lambda col: col.find({"users_id": 1}),
+    ),
+    QueryProbe(
+        "get_bookmarked_paper_ids_many", "bookmarks",
+        lambda col: col.find({"users_id": {"$in": _USERS}}, {"_id": 0, "users_id": 1, "paper_id": 1}),
+    ),
+    QueryProbe(
+        "get_user_search_queries", "search_history",
+        lambda col: col.find({"users_id": 1}).sort("searched_at", DESCENDING).limit(20),
+    ),
+    QueryProbe(
+        "get_search_queries_many", "search_history",
+        lambda col: col.find({"users_id": {"$in": _USERS}}).sort("searched_at", DESCENDING),
+    ),
+    QueryProbe(
+        "get_active_user_ids (search_history)", "search_history",
+        lambda col: _distinct(col, "users_id", {"searched_at": {"$gte": _SINCE}}),
+    ),
+    QueryProbe(
+        "get_active_user_ids (events)", "recommendation_events",
+        lambda col: _distinct(col, "user_id", {"created_at": {"$gte": _SINCE}}),
+    ),
+    QueryProbe(
+        "get_active_user_ids (interactions)", "recommendation_interactions",
+        lambda col: _distinct(col, "user_id", {"created_at": {"$gte": _SINCE}}),
+    ),
+    QueryProbe(
+        "_iter_paper_recommendation_docs_for_users", "paper_recommendations",
+        lambda col: col.find(
+            {"recommendation_type": "rule_based", "user_id": {"$in": _USERS}},
+            {"user_id": 1, "paper_id": 1, "was_clicked": 1},
+        ).sort([("user_id", 1), ("paper_id", 1), ("_id", 1)]),
+    ),
+    QueryProbe(
+        "iter_logged_exposures", "recommendation_events",
+        lambda col: col.find({}, {"recommendation_id": 1, "user_id": 1, "items": 1}).sort("created_at", 1),
+    ),
+    QueryProbe(
+        "_build_interaction_index", "recommendation_interactions",
+        lambda col: col.find({"recommendation_id": {"$ne": None}}, {"recommendation_id": 1, "paper_id": 1}),
+    ),
+    # train_rl 은 interactions 를 recommendation_id 순으로 읽고, events 는 _id 로 조회 (기본 index 라 probe 불필요)
+    QueryProbe(
+        "train_rl.iter_log_samples", "recommendation_interactions",
+        lambda col: col.find(
+            {"recommendation_id": {"$ne": None}},
+            {"_id": 0, "recommendation_id": 1, "paper_id": 1, "reward": 1},
+        ).sort("recommendation_id", 1),
+    ),
+)
+
+
+@dataclass
+class QueryReport:
+    name: str
+    collection: str
+    stages: List[str] = field(default_factory=list)
+    index_names: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def collscan(self) -> bool:
+        return "COLLSCAN" in self.stages
+
+    @property
+    def in_memory_sort(self) -> bool:
+        # SORT_MERGE (index 결과 병합) 는 제외, SORT 만 메모리 정렬
+        return "SORT" in self.stages
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.collscan and not self.in_memory_sort
+
+
+# ------------------------------------------------------
+# index 생성
+# ------------------------------------------------------
+def _existing_keys(col) -> Set[IndexKeys]:
+    # 방향 값을 그대로 비교 (1.0 == 1 이라 float 로 저장된 index 도 같은 key 로 봄)
+    return {
+        tuple((k, d) for k, d in info["key"])
+        for info in col.index_information().values()
+    }
+
+
+def missing_indexes(db, specs: Sequence[IndexSpec] = REQUIRED_INDEXES) -> List[IndexSpec]:
+    existing: Dict[str, Set[IndexKeys]] = {}
+    out = []
+    for spec in specs:
+        if spec.collection not in existing:
+            existing[spec.collection] = _existing_keys(db[spec.collection])
+        if spec.keys not in existing[spec.collection]:
+            out.append(spec)
+    return out
+
+
+def ensure_indexes(db, specs: Sequence[IndexSpec] = REQUIRED_INDEXES) -> List[IndexSpec]:
+    """
+    없는 index 만 생성하고 생성한 목록을 반환. (이미 있으면 아무것도 하지 않음)
+    """
+    created = []
+    for spec in missing_indexes(db, specs):
+        db[spec.collection].create_index(list(spec.keys), name=spec.name)
+        logger.info("[Index] ✅ 생성: %s.%s (%s)", spec.collection, spec.name, spec.used_by)
+        created.append(spec)
+    return created
+
+
+# ------------------------------------------------------
+# explain 점검
+# ------------------------------------------------------
+def _walk_plan(plan: Any, stages: List[str], index_names: List[str]) -> None:
+    if isinstance(plan, dict):
+        stage = plan.get("stage")
+        if stage:
+            stages.append(stage)
+            if plan.get("indexName"):
+                index_names.append(plan["indexName"])
+        for key in ("inputStage", "queryPlan", "winningPlan"):
+            if key in plan:
+                _walk_plan(plan[key], stages, index_names)
+        for child in plan.get("inputStages") or []:
+            _walk_plan(child, stages, index_names)
+    elif isinstance(plan, list):
+        for child in plan:
+            _walk_plan(child, stages, index_names)
+
+
+def explain_query(db, probe: QueryProbe) -> QueryReport:
+    report = QueryReport(name=probe.name, collection=probe.collection)
+    col = db[probe.collection]
+    try:
+        target = probe.build(col)
+        if hasattr(target, "explain"):
+            explained = target.explain()
+        else:
+            explained = db.command("explain", target, verbosity="queryPlanner")
+    except Exception as e:  # mongomock 등 explain 미지원
+        report.error = f"explain 실패: {e!r}"
+        return report
+    winning = (explained.get("queryPlanner") or {}).get("winningPlan") or {}
+    _walk_plan(winning, report.stages, report.index_names)
+    return report
+
+
+def explain_queries(db, probes: Iterable[QueryProbe] = LOADER_QUERIES) -> List[QueryReport]:
+    return [explain_query(db, p) for p in probes]
+
+
+def log_reports(reports: Iterable[QueryReport]) -> int:
+    """
+    문제가 있는 쿼리 수를 반환하고 경고 로그를 남긴다.
+    """
+    reports = list(reports)
+    if reports and all(r.error for r in reports):
+        # explain 자체를 지원하지 않는 backend (mongomock 등) → 한 줄만
+        logger.warning("[Index] ⚠️ explain 점검 불가: %s", reports[0].error)
+        return len(reports)
+    bad = 0
+    for r in reports:
+        if r.error:
+            logger.warning("[Index] ⚠️ %s: %s", r.name, r.error)
+            bad += 1
+        elif r.collscan:
+            logger.warning("[Index] ⚠️ %s: COLLSCAN (%s 전체 스캔, plan=%s)", r.name, r.collection, " → ".join(r.stages))
+            bad += 1
+        elif r.in_memory_sort:
+            logger.warning("[Index] ⚠️ %s: 메모리 SORT (plan=%s)", r.name, " → ".join(r.stages))
+            bad += 1
+        else:
+            logger.debug("[Index] %s: OK (index=%s)", r.name, ",".join(r.index_names))
+    return bad
+
+
+def check_indexes(db, mode: str = INDEX_CHECK_MODE) -> int:
+    """
+    서버 시작 시 호출. mode: off (아무것도 안 함) / warn (explain 점검만) / create (없는 index 생성 후 점검)
+    return: 문제가 있는 쿼리 수
+    """
+    if mode == "off":
+        return 0
+    if mode == "create":
+        ensure_indexes(db)
+    else:
+        for spec in missing_indexes(db):
+            logger.warning("[Index] ⚠️ index 없음: %s.%s (%s)", spec.collection, spec.name, spec.used_by)
+    bad = log_reports(explain_queries(db))
+    if bad == 0:
+        logger.info("[Index] ✅ loader 쿼리 %d개 모두 index 사용", len(LOADER_QUERIES))
+    return bad
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="MongoDB index 생성 / explain 점검")
+    parser.add_argument("--create", action="store_true", help="없는 index 생성")
+    parser.add_argument("--mongo-uri", default=None, help="없으면 MongoDataLoader 기본 연결 (SSH 터널)")
+    parser.add_argument("--db", default=None)
+    args = parser.parse_args()
+
+    if args.mongo_uri:
+        from pymongo import MongoClient
+
+        database = MongoClient(args.mongo_uri)[args.db or "arxiv"]
+    else:
+        from .data_loader import MongoDataLoader
+
+        database = MongoDataLoader(db_name=args.db).db
+
+    if args.create:
+        created = ensure_indexes(database)
+        print(f"created {len(created)} index(es)")
+    else:
+        for spec in missing_indexes(database):
+            print(f"missing: {spec.collection}.{spec.name} ({spec.used_by})")
+
+    reports = explain_queries(database)
+    print(f"{'query':<42} | {'collection':<28} | {'plan':<40} | status")
+    for r in reports:
+        status = r.error or ("COLLSCAN" if r.collscan else "SORT" if r.in_memory_sort else "ok")
+        print(f"{r.name:<42} | {r.collection:<28} | {' → '.join(r.stages):<40} | {status}")
+    sys.exit(1 if any(not r.ok for r in reports) else 0)
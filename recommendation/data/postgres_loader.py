@@ -1,10 +1,37 @@
+"""
+postgres_loader.py
+
+PostgreSQL 의 사용자 명시 관심 카테고리 (user_interests + categories.code) 로더.
+
+- psycopg2 ThreadedConnectionPool (첫 조회 때 생성, 스레드 간 공유)
+- get_user_category_codes_many(user_ids): ANY(%s) 쿼리 한 번으로 여러 user 조회
+- user 별 결과 TTL 캐시 (관심 카테고리는 자주 바뀌지 않음, 빈 결과도 캐시)
+- 연결이 끊긴 경우 (DB 재시작 등) 해당 연결을 버리고 새 연결로 한 번 재시도
+
+MongoDataLoader.build_user_profile 은 이 조회를 Mongo 쿼리와 병렬로 보내서
+UserProfile.explicit_categories 를 채운다 (fetch_user_category_codes_async).
+"""
 from __future__ import annotations
 
+import logging
 import os
-from typing import List
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
-import psycopg2
-from psycopg2.extras import RealDictCursor
+try:
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+    from psycopg2.pool import ThreadedConnectionPool
+except ImportError:  # psycopg2 미설치 → explicit_categories 없이 동작
+    psycopg2 = None
+    RealDictCursor = None
+    ThreadedConnectionPool = None
+
+logger = logging.getLogger(__name__)
 
 
 PG_HOST = os.getenv("PG_HOST", "35.94.93.225")
@@ -13,6 +40,71 @@ PG_DBNAME = os.getenv("PG_DBNAME", "rsrs")
 PG_USER = os.getenv("PG_USER", "rsrs-root")
 PG_PASSWORD = os.getenv("PG_PASSWORD", "e2XNR0qnZ7kKygC3Sl5zQ2BF2FkHcCr110CaCqulOOlPs")
 
+# 0 이면 Postgres 관심 카테고리 조회 비활성화 (explicit_categories = None)
+PG_INTERESTS_ENABLED = os.getenv("RL_PG_INTERESTS", "1") != "0"
+PG_POOL_MIN = int(os.getenv("RL_PG_POOL_MIN", "1"))
+PG_POOL_MAX = int(os.getenv("RL_PG_POOL_MAX", "8"))
+PG_CONNECT_TIMEOUT = int(os.getenv("RL_PG_CONNECT_TIMEOUT", "3"))
+PG_CACHE_TTL_SEC = float(os.getenv("RL_PG_CACHE_TTL_SEC", "300"))
+PG_CACHE_SIZE = int(os.getenv("RL_PG_CACHE_SIZE", "100000"))
+# build_user_profile 이 Postgres 결과를 기다리는 최대 시간 (초). 넘으면 explicit_categories 없이 진행
+PG_FETCH_TIMEOUT_SEC = float(os.getenv("RL_PG_FETCH_TIMEOUT_SEC", "0.5"))
+# 조회 실패 후 이 시간 (초) 동안은 Postgres 를 건너뜀 (요청마다 connect timeout 을 기다리지 않도록)
+PG_RETRY_AFTER_SEC = float(os.getenv("RL_PG_RETRY_AFTER_SEC", "30"))
+
+_RECONNECT_ERRORS: Tuple[type, ...] = (
+    (psycopg2.OperationalError, psycopg2.InterfaceError) if psycopg2 is not None else ()
+)
+
+_QUERY_MANY = """
+SELECT ui.user_id, c.code
+FROM user_interests ui
+JOIN categories c ON ui.category_id = c.id
+WHERE ui.user_id = ANY(%s)
+"""
+
+
+class _TTLCache:
+    """
+    user_id → 카테고리 코드 목록. 만료 시각이 지나면 없는 것으로 본다 (LRU 로 크기 제한).
+    """
+
+    def __init__(self, ttl_sec: float, maxsize: int):
+        self.ttl_sec = ttl_sec
+        self.maxsize = maxsize
+        self._items: "OrderedDict[int, Tuple[float, List[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: int) -> Optional[List[str]]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            return None
+        return value
+
+    def put_many(self, values: Dict[int, List[str]]) -> None:
+        if self.ttl_sec <= 0:
+            return
+        expires = time.monotonic() + self.ttl_sec
+        with self._lock:
+            for key, value in values.items():
+                self._items[key] = (expires, value)
+                self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, key: Optional[int] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._items.clear()
+            else:
+                self._items.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
 
 class PostgresUserInterestLoader:
     """
@@ -20,17 +112,119 @@ class PostgresUserInterestLoader:
 
     - user_interests(user_id, category_id)
     - categories(id, code, ...)
+
+    pool 을 직접 넘기면 (getconn / putconn / closeall) 그대로 사용하고, 없으면 첫 조회 때 생성.
     """
 
-    def __init__(self):
-        self._conn = psycopg2.connect(
-            host=PG_HOST,
-            port=PG_PORT,
-            dbname=PG_DBNAME,
-            user=PG_USER,
-            password=PG_PASSWORD,
-            cursor_factory=RealDictCursor,
-        )
+    def __init__(
+        self,
+        pool=None,
+        minconn: int = PG_POOL_MIN,
+        maxconn: int = PG_POOL_MAX,
+        cache_ttl_sec: float = PG_CACHE_TTL_SEC,
+        cache_size: int = PG_CACHE_SIZE,
+    ):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.cache = _TTLCache(cache_ttl_sec, cache_size)
+        self._pool = pool
+        self._pool_lock = threading.Lock()
+        self._down_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    # ------------------------------------------------------
+    # 연결
+    # ------------------------------------------------------
+    def _get_pool(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    if ThreadedConnectionPool is None:
+                        raise RuntimeError("psycopg2 가 설치되어 있지 않습니다.")
+                    self._pool = ThreadedConnectionPool(
+                        self.minconn,
+                        self.maxconn,
+                        host=PG_HOST,
+                        port=PG_PORT,
+                        dbname=PG_DBNAME,
+                        user=PG_USER,
+                        password=PG_PASSWORD,
+                        connect_timeout=PG_CONNECT_TIMEOUT,
+                        cursor_factory=RealDictCursor,
+                    )
+                    logger.info("[Postgres] ✅ connection pool 생성 (%s:%s, max=%d)", PG_HOST, PG_PORT, self.maxconn)
+        return self._pool
+
+    @contextmanager
+    def _connection(self) -> Iterator[object]:
+        pool = self._get_pool()
+        conn = pool.getconn()
+        close = False
+        try:
+            yield conn
+        except _RECONNECT_ERRORS:
+            # 끊긴 연결은 pool 에 돌려놓지 않고 닫는다
+            close = True
+            raise
+        finally:
+            try:
+                if not close:
+                    conn.rollback()  # 읽기 전용 → 트랜잭션만 정리
+            except Exception as e:
+                # rollback 이 안 되는 연결도 버린다 (이미 받은 결과는 그대로 사용)
+                logger.warning("[Postgres] ⚠️ rollback 실패, 연결 폐기: %s", e)
+                close = True
+            finally:
+                pool.putconn(conn, close=close)
+
+    def _fetch(self, user_ids: List[int]) -> List[Dict[str, object]]:
+        for attempt in (1, 2):
+            try:
+                with self._connection() as conn:
+                    with conn.cursor() as cur:
+                        cur.execute(_QUERY_MANY, (user_ids,))
+                        return cur.fetchall()
+            except _RECONNECT_ERRORS as e:
+                if attempt == 2:
+                    raise
+                logger.warning("[Postgres] ⚠️ 연결 끊김, 새 연결로 재시도: %s", e)
+        return []
+
+    # ------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------
+    def get_user_category_codes_many(self, user_ids: Iterable[int]) -> Dict[int, List[str]]:
+        """
+        user_id → categories.code 목록 (정렬, 중복 제거). 캐시에 없는 user 만 쿼리 한 번으로 조회.
+        """
+        user_ids = list(dict.fromkeys(int(u) for u in user_ids))
+        result: Dict[int, List[str]] = {}
+        missing: List[int] = []
+        for uid in user_ids:
+            cached = self.cache.get(uid)
+            if cached is None:
+                missing.append(uid)
+            else:
+                result[uid] = cached
+
+        if missing:
+            try:
+                rows = self._fetch(missing)
+            except Exception:
+                self._down_until = time.monotonic() + PG_RETRY_AFTER_SEC
+                raise
+            codes: Dict[int, set] = {uid: set() for uid in missing}
+            for row in rows:
+                code = row.get("code")
+                if code and row.get("user_id") in codes:
+                    codes[row["user_id"]].add(code)
+            fetched = {uid: sorted(c) for uid, c in codes.items()}
+            self.cache.put_many(fetched)
+            result.update(fetched)
+        return result
 
     def get_user_category_codes(self, user_id: int) -> List[str]:
         """
@@ -38,26 +232,83 @@ class PostgresUserInterestLoader:
 
         예: ["cs.LG", "stat.ML", "physics", ...]
         """
-        query = """
-        SELECT c.code
-        FROM user_interests ui
-        JOIN categories c ON ui.category_id = c.id
-        WHERE ui.user_id = %s
-        """
-        with self._conn.cursor() as cur:
-            cur.execute(query, (user_id,))
-            rows = cur.fetchall()
-
-        codes = []
-        for row in rows:
-            code = row.get("code")
-            if code:
-                codes.append(code)
-        # 중복 제거
-        return sorted(set(codes))
+        return self.get_user_category_codes_many([user_id])[int(user_id)]
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        # 관심 카테고리 변경 시 (None 이면 전체)
+        self.cache.invalidate(user_id)
 
     def close(self):
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
         try:
-            self._conn.close()
+            pool.closeall()
         except Exception:
-            pass
\ No newline at end of file
+            pass
+
+
+# ------------------------------------------------------
+# 싱글톤 + Mongo 쿼리와 병렬 조회
+# ------------------------------------------------------
+_interest_loader: Optional[PostgresUserInterestLoader] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_singleton_lock = threading.Lock()
+
+
+def get_interest_loader() -> Optional[PostgresUserInterestLoader]:
+    """
+    프로세스 공용 loader. psycopg2 미설치 / RL_PG_INTERESTS=0 이면 None.
+    """
+    global _interest_loader
+    if not PG_INTERESTS_ENABLED or psycopg2 is None:
+        return None
+    if _interest_loader is None:
+        with _singleton_lock:
+            if _interest_loader is None:
+                _interest_loader = PostgresUserInterestLoader()
+    return _interest_loader
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _singleton_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=PG_POOL_MAX, thread_name_prefix="rl-pg-interests")
+    return _executor
+
+
+def fetch_user_category_codes_async(
+    loader: Optional[PostgresUserInterestLoader], user_ids: List[int]
+) -> Optional["Future[Dict[int, List[str]]]"]:
+    """
+    캐시에 모두 있으면 바로 완료된 Future, 아니면 executor 에서 조회.
+    loader 가 없거나 최근 실패로 쉬는 중이면 None.
+    """
+    if loader is None or not loader.available:
+        return None
+    cached = {}
+    for uid in user_ids:
+        codes = loader.cache.get(uid)
+        if codes is None:
+            return _get_executor().submit(loader.get_user_category_codes_many, user_ids)
+        cached[uid] = codes
+    done: "Future[Dict[int, List[str]]]" = Future()
+    done.set_result(cached)
+    return done
+
+
+def resolve_category_codes(
+    future: Optional["Future[Dict[int, List[str]]]"], timeout: float = PG_FETCH_TIMEOUT_SEC
+) -> Optional[Dict[int, List[str]]]:
+    """
+    병렬 조회 결과. 실패 / timeout 이면 None (explicit_categories 없이 진행).
+    """
+    if future is None:
+        return None
+    try:
+        return future.result(timeout=timeout)
+    except Exception as e:
+        logger.warning("[Postgres] ⚠️ 관심 카테고리 조회 실패 (explicit_categories 없이 진행): %r", e)
+        return None
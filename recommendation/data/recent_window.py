@@ -0,0 +1,203 @@
+"""
+recent_window.py
+
+모든 user 가 공유하는 "최신 논문" 후보 window.
+
+get_recent_papers(limit) 는 user 와 무관한 같은 쿼리 (find().sort(update_date desc).limit) 라서,
+요청마다 DB 에서 읽는 대신 프로세스에 하나만 들고 백그라운드 스레드가 주기적으로 교체한다.
+
+- window 안의 Paper 는 이미 decode 되어 있고 vocabulary 인코딩 (category bitmask / token ID) 도 채워져 있음
+  → 후보 생성 / scoring 에서 이 부분의 요청당 비용 없음
+- 교체는 snapshot 참조만 바꾸므로 요청 경로는 lock 을 잡지 않는다
+- 새 논문 적재 작업 등에서 notify() 를 부르면 주기를 기다리지 않고 바로 갱신
+- window 보다 큰 limit 요청이나 RL_RECENT_WINDOW_SEC=0 이면 기존처럼 DB 직접 조회
+
+주의: window 의 Paper 인스턴스는 요청 간에 공유되므로 읽기 전용으로 다룬다.
+
+MongoDataLoader 는 get_recent_window(loader) 로 DB 당 하나인 window 를 받는다.
+(서버는 loader 를 여러 개 만들지만 window / 갱신 스레드는 DB 마다 하나)
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Hashable, List, Optional, Tuple
+
+from pymongo import MongoClient
+
+from ..models.data_models import Paper
+from .vocabulary import Vocabulary, get_vocabulary
+
+if TYPE_CHECKING:
+    from .data_loader import MongoDataLoader
+
+logger = logging.getLogger(__name__)
+
+RECENT_WINDOW_SIZE = int(os.getenv("RL_RECENT_WINDOW_SIZE", "200"))
+# 갱신 주기 (초). 0 이하이면 window 비활성화 (매 요청 DB 조회)
+RECENT_WINDOW_SEC = float(os.getenv("RL_RECENT_WINDOW_SEC", "5"))
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    papers: Tuple[Paper, ...]  # update_date 내림차순 (DB 쿼리 결과 순서 그대로)
+    index: Dict[str, int]  # arxiv_id → 위치
+    loaded_at: float  # time.monotonic()
+
+
+class RecentPapersWindow:
+    """
+    window = RecentPapersWindow(loader)
+    window.papers(200)  # 첫 호출 시 동기 로딩 + 갱신 스레드 시작, 이후는 메모리에서 바로 반환
+    """
+
+    def __init__(
+        self,
+        loader: "MongoDataLoader",
+        size: int = RECENT_WINDOW_SIZE,
+        refresh_interval: float = RECENT_WINDOW_SEC,
+        vocab: Optional[Vocabulary] = None,
+    ):
+        self.loader = loader
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self._vocab = vocab
+        self._snapshot: Optional[_Snapshot] = None
+        self._load_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.refresh_interval > 0 and self.size > 0
+
+    def __len__(self) -> int:
+        snapshot = self._snapshot
+        return len(snapshot.papers) if snapshot is not None else 0
+
+    # ------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------
+    def papers(self, limit: Optional[int] = None) -> List[Paper]:
+        """
+        최신순 상위 limit 개. window 보다 큰 limit 이나 비활성화 상태면 DB 직접 조회.
+        """
+        limit = self.size if limit is None else limit
+        if not self.enabled or limit > self.size:
+            return self.loader.query_recent_papers(limit)
+
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._initial_load()
+        return list(snapshot.papers[:limit])
+
+    def get(self, arxiv_id: str) -> Optional[Paper]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        idx = snapshot.index.get(arxiv_id)
+        return snapshot.papers[idx] if idx is not None else None
+
+    def age(self) -> Optional[float]:
+        snapshot = self._snapshot
+        return time.monotonic() - snapshot.loaded_at if snapshot is not None else None
+
+    # ------------------------------------------------------
+    # 갱신
+    # ------------------------------------------------------
+    def _initial_load(self) -> _Snapshot:
+        with self._load_lock:
+            if self._snapshot is None:
+                self.refresh()
+            self.start()
+        return self._snapshot
+
+    def refresh(self) -> bool:
+        """
+        DB 에서 window 를 다시 읽고 인코딩까지 끝낸 뒤 snapshot 교체.
+        return: 구성 (arxiv_id 순서) 이 바뀌었는지
+        """
+        vocab = self._vocab or get_vocabulary()
+        papers = tuple(p for p in self.loader.query_recent_papers(self.size) if p.arxiv_id)
+        for p in papers:
+            vocab.encode_paper(p)
+
+        previous = self._snapshot
+        self._snapshot = _Snapshot(
+            papers=papers,
+            index={p.arxiv_id: i for i, p in enumerate(papers)},
+            loaded_at=time.monotonic(),
+        )
+        changed = previous is None or [p.arxiv_id for p in previous.papers] != [p.arxiv_id for p in papers]
+        if changed:
+            logger.debug("[RecentWindow] window 갱신: %d papers", len(papers))
+        return changed
+
+    def notify(self) -> None:
+        """
+        새 논문이 들어왔을 때 호출 → 갱신 스레드가 주기를 기다리지 않고 바로 refresh.
+        """
+        if self._worker is None:
+            self._snapshot = None  # 스레드가 아직 없으면 다음 조회 때 동기 로딩
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if not self.enabled or self._worker is not None:
+            return
+        self._stopped.clear()
+        self._worker = threading.Thread(target=self._refresh_loop, name="rl-recent-window", daemon=True)
+        self._worker.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        worker, self._worker = self._worker, None
+        if worker is not None and worker is not threading.current_thread():
+            worker.join(timeout=self.refresh_interval + 1)
+
+    def _refresh_loop(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.refresh_interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                return
+            try:
+                self.refresh()
+            except Exception as e:
+                # DB 일시 장애 → 이전 window 유지
+                logger.warning("[RecentWindow] ⚠️ window 갱신 실패 (이전 window 유지): %s", e)
+
+
+# ------------------------------------------------------
+# DB 당 하나 (프로세스 공용)
+# ------------------------------------------------------
+_windows: Dict[Hashable, RecentPapersWindow] = {}
+_windows_lock = threading.Lock()
+
+
+def database_key(db: Any) -> Hashable:
+    """
+    loader 마다 MongoClient 를 새로 만들어도 같은 서버 / 같은 DB 면 같은 key.
+    (pymongo 는 연결 전에도 topology 에 seed 주소가 있음, mongomock 등은 client 객체 단위)
+    """
+    if isinstance(db.client, MongoClient):
+        return tuple(sorted(db.client.topology_description.server_descriptions())), db.name
+    return id(db.client), db.name
+
+
+def get_recent_window(loader: "MongoDataLoader") -> RecentPapersWindow:
+    """
+    loader.db 의 공용 window. 처음 요청한 loader 로 만들고 이후 같은 DB 의 loader 는 그 window 를 공유.
+    """
+    key = database_key(loader.db)
+    window = _windows.get(key)
+    if window is None:
+        with _windows_lock:
+            window = _windows.get(key)
+            if window is None:
+                window = _windows[key] = RecentPapersWindow(loader)
+    return window
@@ -0,0 +1,315 @@
+"""
+static_features.py
+
+user 와 무관한 논문별 feature (popularity / recency) 테이블.
+
+popularity 는 북마크 / 조회 수, recency 는 update_date 로만 정해져서 요청마다 후보별로 다시 계산할 필요가 없다.
+- popularity: min((log1p(bookmark) + log1p(view)) / 2 / 10, 1) 을 행마다 한 번만 계산해 저장
+- recency: update_date 만 (UTC 마이크로초 정수로) 저장하고, 0.5 ** (days / 730) 감쇠는
+  gather(papers, now) 에서 기준 시각 now 로 그때그때 계산 (days 는 (now - update_date).days 와 같은 내림,
+  감쇠값은 일 단위 lookup 표에서 gather)
+- 행은 처음 본 논문이 gather 될 때 Paper 의 값으로 추가되고,
+  백그라운드 스레드가 RL_STATIC_FEATURE_SEC 마다 북마크 / 조회 수 / update_date 를 DB 에서 다시 읽어 갱신
+- 갱신 때 북마크 수 / 조회 수 상위 논문도 함께 읽어 popularity 순 후보 (popular_papers) 를 만든다
+
+scoring 은 후보 목록에 대해 gather 를 한 번 호출해서 두 열을 numpy 배열로 받는다.
+MongoDataLoader 는 get_static_feature_table(loader) 로 DB 당 하나인 테이블을 공유한다.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pymongo import DESCENDING
+
+from ..models.data_models import Paper
+from .recent_window import database_key
+from .vocabulary import get_vocabulary
+
+if TYPE_CHECKING:
+    from .data_loader import MongoDataLoader
+
+logger = logging.getLogger(__name__)
+
+# 갱신 주기 (초). 0 이하이면 백그라운드 갱신 없음 (행은 처음 본 값 그대로)
+STATIC_FEATURE_SEC = float(os.getenv("RL_STATIC_FEATURE_SEC", "600"))
+STATIC_FEATURE_MAX_ROWS = int(os.getenv("RL_STATIC_FEATURE_MAX_ROWS", "200000"))
+POPULAR_K = int(os.getenv("RL_POPULAR_K", "200"))
+
+RECENCY_HALF_LIFE_DAYS = 730.0  # half-life ~2 years
+POPULARITY_SCALE = 10.0
+
+_EPOCH = datetime(1970, 1, 1)
+_US_PER_DAY = 86_400_000_000
+_NO_DATE = np.iinfo(np.int64).min
+_REFRESH_CHUNK = 5_000
+_PROJECTION = {"bookmark_count": 1, "view_count": 1, "update_date": 1}
+
+
+# ------------------------------------------------------
+# 식 (scoring._popularity_score / _recency_score 도 이 함수를 사용)
+# ------------------------------------------------------
+def raw_popularity(bookmark_count: int, view_count: int) -> float:
+    b = max(bookmark_count, 0)
+    v = max(view_count, 0)
+    return (math.log1p(b) + math.log1p(v)) / 2.0
+
+
+def popularity_feature(bookmark_count: int, view_count: int) -> float:
+    return min(raw_popularity(bookmark_count, view_count) / POPULARITY_SCALE, 1.0)
+
+
+def recency_feature(update_date: Optional[datetime], now: datetime) -> float:
+    if not update_date:
+        return 0.0
+    days = (now - update_date).days
+    return 0.5 ** (days / RECENCY_HALF_LIFE_DAYS)
+
+
+def _to_us(dt: Optional[datetime]) -> int:
+    if not dt:
+        return _NO_DATE
+    return (dt - _EPOCH) // timedelta(microseconds=1)
+
+
+_decay_by_day = np.zeros(0, dtype=np.float64)
+_decay_lock = threading.Lock()
+
+
+def _decay_table(max_days: int) -> np.ndarray:
+    """
+    days → 0.5 ** (days / 730) 표 (0 ~ max_days). 필요한 만큼만 늘린다.
+    값은 recency_feature 와 같은 파이썬 ** 로 계산해서 (np.power 와 1 ulp 차이 방지) 점수가 그대로 일치.
+    """
+    global _decay_by_day
+    table = _decay_by_day
+    if table.size > max_days:
+        return table
+    with _decay_lock:
+        table = _decay_by_day
+        if table.size <= max_days:
+            size = max(max_days + 1, table.size * 2, 4096)
+            grown = np.empty(size, dtype=np.float64)
+            grown[:table.size] = table
+            grown[table.size:] = [0.5 ** (d / RECENCY_HALF_LIFE_DAYS) for d in range(table.size, size)]
+            _decay_by_day = table = grown
+    return table
+
+
+def recency_column(update_us: np.ndarray, now: datetime) -> np.ndarray:
+    """
+    update_date (마이크로초) 배열 → 기준 시각 now 의 recency. 날짜 없음은 0.
+    """
+    out = np.zeros(update_us.shape, dtype=np.float64)
+    has_date = update_us != _NO_DATE
+    if not has_date.any():
+        return out
+    days = (_to_us(now) - update_us[has_date]) // _US_PER_DAY
+    future = days < 0  # now 보다 뒤 날짜 (드묾) 는 그대로 계산
+    if future.any():
+        values = np.empty(days.size, dtype=np.float64)
+        values[future] = [0.5 ** (d / RECENCY_HALF_LIFE_DAYS) for d in days[future].tolist()]
+        past = ~future
+        values[past] = _decay_table(int(days[past].max(initial=0)))[days[past]]
+        out[has_date] = values
+    else:
+        out[has_date] = _decay_table(int(days.max()))[days]
+    return out
+
+
+class StaticFeatureTable:
+    """
+    table = StaticFeatureTable(loader)
+    popularity, recency = table.gather(candidates, now)   # 각 (N,) float64
+
+    행 추가는 lock 을 잡고, 이미 있는 행의 조회는 lock 없이 dict 조회만 한다.
+    행 수가 max_rows 를 넘으면 테이블을 비우고 다시 채운다 (캐시처럼 동작).
+    """
+
+    def __init__(
+        self,
+        loader: "MongoDataLoader",
+        refresh_interval: float = STATIC_FEATURE_SEC,
+        max_rows: int = STATIC_FEATURE_MAX_ROWS,
+        popular_k: int = POPULAR_K,
+    ):
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self.max_rows = max_rows
+        self.popular_k = popular_k
+
+        # (arxiv_id → 행, popularity, update_date 마이크로초). 배열 재할당 / 초기화는 tuple 째로 교체
+        self._state: Tuple[Dict[str, int], np.ndarray, np.ndarray] = self._empty_state()
+        self._popular: Optional[Tuple[Paper, ...]] = None
+
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._state[0])
+
+    @staticmethod
+    def _empty_state(size: int = 1024) -> Tuple[Dict[str, int], np.ndarray, np.ndarray]:
+        return {}, np.zeros(size, dtype=np.float64), np.full(size, _NO_DATE, dtype=np.int64)
+
+    # ------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------
+    def gather(self, papers: Sequence[Paper], now: datetime) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        후보 목록의 (popularity, recency) 열을 한 번에. 처음 보는 논문은 Paper 값으로 행 추가.
+        """
+        keys = [p.arxiv_id or p.mongo_id for p in papers]
+        index, popularity, update_us = self._state
+        rows = [index.get(k) for k in keys]
+        if None in rows:
+            with self._lock:
+                self._add_missing(papers, keys)
+                index, popularity, update_us = self._state
+            rows = [index[k] for k in keys]
+            if self._worker is None:
+                self.start()
+        rows = np.fromiter(rows, dtype=np.int64, count=len(rows))
+        return popularity[rows], recency_column(update_us[rows], now)
+
+    def popular_papers(self, limit: Optional[int] = None) -> List[Paper]:
+        """
+        popularity 내림차순 후보 (북마크 수 상위 ∪ 조회 수 상위 중에서 정렬, 근사).
+        """
+        popular = self._popular
+        if popular is None:
+            popular = self.refresh_popular()
+        return list(popular[:limit or self.popular_k])
+
+    # ------------------------------------------------------
+    # 행 추가 (self._lock 안에서 호출)
+    # ------------------------------------------------------
+    def _add_missing(self, papers: Sequence[Paper], keys: List[str]) -> None:
+        index, popularity, update_us = self._state
+        missing = [i for i, k in enumerate(keys) if k not in index]
+        if not missing:
+            return
+        if len(index) + len(missing) > self.max_rows:
+            logger.debug("[StaticFeatures] max_rows(%d) 초과 → 테이블 초기화", self.max_rows)
+            index, popularity, update_us = self._empty_state()
+            missing = range(len(keys))
+
+        size = popularity.size
+        while len(index) + len(missing) > size:
+            size *= 2
+        if size != popularity.size:
+            grown = self._empty_state(size)
+            grown[1][:len(index)] = popularity[:len(index)]
+            grown[2][:len(index)] = update_us[:len(index)]
+            index, popularity, update_us = dict(index), grown[1], grown[2]
+
+        for i in missing:
+            key = keys[i]
+            if key in index:
+                continue
+            p = papers[i]
+            row = len(index)
+            popularity[row] = popularity_feature(p.bookmark_count, p.view_count)
+            update_us[row] = _to_us(p.update_date)
+            index[key] = row  # 값을 다 쓴 뒤 공개
+        self._state = (index, popularity, update_us)
+
+    # ------------------------------------------------------
+    # 갱신
+    # ------------------------------------------------------
+    def refresh(self) -> int:
+        """
+        테이블에 있는 논문의 북마크 / 조회 수 / update_date 를 DB 에서 다시 읽어 덮어쓴다.
+        return: 갱신한 행 수
+        """
+        index, popularity, update_us = self._state
+        ids = list(index)
+        parse_date = self.loader._parse_datetime
+        updated = 0
+        for start in range(0, len(ids), _REFRESH_CHUNK):
+            chunk = ids[start:start + _REFRESH_CHUNK]
+            for doc in self.loader.col_papers.find({"_id": {"$in": chunk}}, _PROJECTION):
+                row = index.get(doc["_id"])
+                if row is None:
+                    continue
+                with self._lock:
+                    if self._state[0] is not index:  # 그 사이 배열 교체 / 초기화됨 → 다음 주기에
+                        return updated
+                    popularity[row] = popularity_feature(
+                        int(doc.get("bookmark_count") or 0), int(doc.get("view_count") or 0)
+                    )
+                    update_us[row] = _to_us(parse_date(doc.get("update_date")))
+                updated += 1
+        self.refresh_popular()
+        return updated
+
+    def refresh_popular(self) -> Tuple[Paper, ...]:
+        """
+        북마크 수 상위 / 조회 수 상위 popular_k 개씩 읽어 popularity 순으로 정렬한 후보 snapshot 교체.
+        """
+        papers: Dict[str, Paper] = {}
+        for field in ("bookmark_count", "view_count"):
+            cursor = self.loader.col_papers.find().sort(field, DESCENDING).limit(self.popular_k)
+            for doc in cursor:
+                papers.setdefault(doc["_id"], self.loader._doc_to_paper(doc))
+
+        vocab = get_vocabulary()
+        ranked = sorted(
+            papers.values(),
+            key=lambda p: raw_popularity(p.bookmark_count, p.view_count),
+            reverse=True,
+        )[:self.popular_k]
+        for p in ranked:
+            vocab.encode_paper(p)
+        self._popular = tuple(ranked)
+        return self._popular
+
+    def start(self) -> None:
+        if self.refresh_interval <= 0 or self._worker is not None:
+            return
+        self._stopped.clear()
+        self._worker = threading.Thread(target=self._refresh_loop, name="rl-static-features", daemon=True)
+        self._worker.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        worker, self._worker = self._worker, None
+        if worker is not None and worker is not threading.current_thread():
+            worker.join(timeout=1)
+
+    def _refresh_loop(self) -> None:
+        while not self._stopped.wait(self.refresh_interval):
+            try:
+                started = time.perf_counter()
+                n = self.refresh()
+                logger.debug("[StaticFeatures] %d rows 갱신 (%.2fs)", n, time.perf_counter() - started)
+            except Exception as e:
+                logger.warning("[StaticFeatures] ⚠️ 갱신 실패 (이전 값 유지): %s", e)
+
+
+# ------------------------------------------------------
+# DB 당 하나 (프로세스 공용)
+# ------------------------------------------------------
+_tables: Dict[Hashable, StaticFeatureTable] = {}
+_tables_lock = threading.Lock()
+
+
+def get_static_feature_table(loader: "MongoDataLoader") -> StaticFeatureTable:
+    """
+    loader.db 의 공용 테이블. 같은 DB 의 loader 들은 행 / popular 후보 / 갱신 스레드를 공유한다.
+    """
+    key = database_key(loader.db)
+    table = _tables.get(key)
+    if table is None:
+        with _tables_lock:
+            table = _tables.get(key)
+            if table is None:
+                table = _tables[key] = StaticFeatureTable(loader)
+    return table
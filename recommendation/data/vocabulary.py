@@ -0,0 +1,373 @@
+"""
+vocabulary.py
+
+category / keyword 문자열 → dense 정수 ID 사전.
+
+- category: ID 를 bit 위치로 사용 → 논문 / 프로필의 category 집합은 int bitmask,
+  겹치는 개수는 (a & b).bit_count() (popcount)
+- keyword: 정렬된 unique int32 배열 → 겹치는 개수는 np.intersect1d
+- corpus 로 미리 만들어 models/features/vocabulary.json 에 저장해두고 (git 에는 넣지 않음),
+  서버에서는 논문에서 처음 보는 문자열이 나오면 그 자리에서 ID 를 추가 (append-only, ID 는 바뀌지 않음)
+  - 런타임 추가는 corpus 로 만든 사전 크기 (base_keywords, 파일에 함께 저장) + RL_VOCAB_MAX_GROWTH 개까지만.
+    재시작해도 한도가 다시 늘어나지 않으며, 넘으면 새 토큰은 ID 없이 버리고 dropped_keywords 로 센다.
+  - 프로필 (북마크 keyword / 검색어) 토큰은 조회만 하고 추가하지 않는다.
+    사전에 없는 토큰은 어떤 논문과도 겹칠 수 없으므로 개수 (분모) 만 센다.
+
+논문의 token ID (keywords + title + abstract 토큰) 는 Paper 인스턴스와
+arxiv_id 기준 LRU 캐시에 저장해서, 같은 논문의 abstract 를 요청마다 다시 토큰화하지 않는다.
+(캐시 항목은 title / abstract / keywords / categories 의 hash 와 함께 저장 → 논문이 수정되면 다시 토큰화)
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..models.data_models import Paper, UserProfile
+from .preprocess import tokenize_keywords
+
+logger = logging.getLogger(__name__)
+
+VOCAB_FORMAT_VERSION = 1
+DEFAULT_VOCAB_PATH = Path(os.getenv("RL_VOCAB_PATH", "models/features/vocabulary.json"))
+# corpus 로 만든 사전 (base_keywords) 이후 런타임에 추가할 수 있는 keyword 수
+VOCAB_MAX_GROWTH = int(os.getenv("RL_VOCAB_MAX_GROWTH", "200000"))
+
+_EMPTY_IDS = np.zeros(0, dtype=np.int32)
+
+
+class _StringIndex:
+    """
+    문자열 ↔ ID 양방향 사전 (append-only).
+    조회는 lock 없이 dict 로, 추가만 lock 을 잡는다.
+    """
+
+    def __init__(self, items: Iterable[str] = ()):
+        self._ids: Dict[str, int] = {}
+        self._items: List[str] = []
+        self._lock = threading.Lock()
+        for item in items:
+            self.add(item)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, item: str) -> Optional[int]:
+        return self._ids.get(item)
+
+    def add(self, item: str, max_size: Optional[int] = None) -> Optional[int]:
+        # max_size 에 도달했으면 추가하지 않고 None
+        idx = self._ids.get(item)
+        if idx is not None:
+            return idx
+        with self._lock:
+            idx = self._ids.get(item)
+            if idx is None:
+                if max_size is not None and len(self._items) >= max_size:
+                    return None
+                idx = len(self._items)
+                self._items.append(item)
+                self._ids[item] = idx
+        return idx
+
+    def items(self) -> List[str]:
+        return list(self._items)
+
+
+@dataclass
+class PaperTokens:
+    category_bits: int
+    keyword_ids: np.ndarray  # paper.keywords 원문 그대로 (유사도 보너스용)
+    token_ids: np.ndarray  # 소문자 keywords + title / abstract 토큰 (keyword score 용)
+
+
+@dataclass
+class EncodedProfile:
+    explicit_bits: int
+    bookmark_cat_bits: int
+    bookmark_kw_ids: np.ndarray  # 사전에 있는 토큰만
+    search_kw_ids: np.ndarray
+    bookmark_kw_count: int  # 사전에 없는 토큰 포함 unique 토큰 수 (overlap 비율의 분모)
+    search_kw_count: int
+    vocab_size: int = 0  # 인코딩 당시 keyword 사전 크기 (사전이 자라면 다시 조회)
+
+    @property
+    def complete(self) -> bool:
+        return (
+            self.bookmark_kw_ids.size == self.bookmark_kw_count
+            and self.search_kw_ids.size == self.search_kw_count
+        )
+
+
+class Vocabulary:
+    def __init__(
+        self,
+        categories: Iterable[str] = (),
+        keywords: Iterable[str] = (),
+        paper_cache_size: int = 50_000,
+        max_growth: int = VOCAB_MAX_GROWTH,
+        base_keywords: Optional[int] = None,
+    ):
+        """
+        base_keywords: 런타임 추가분을 뺀 사전 크기 (저장된 파일에서 로드할 때 전달, 없으면 현재 크기)
+        """
+        self.categories = _StringIndex(categories)
+        self.keywords = _StringIndex(keywords)
+        self.paper_cache_size = paper_cache_size
+        self._saved_size = (len(self.categories), len(self.keywords))
+        self.base_keywords = len(self.keywords) if base_keywords is None else min(base_keywords, len(self.keywords))
+        self.max_keywords = self.base_keywords + max_growth
+        self.dropped_keywords = 0
+        self._next_drop_warning = 1
+        # key → (내용 hash, 토큰)
+        self._paper_cache: "OrderedDict[str, Tuple[int, PaperTokens]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    # ------------------------------------------------------
+    # 인코딩
+    # ------------------------------------------------------
+    def category_bits(self, categories: Iterable[str]) -> int:
+        bits = 0
+        for c in categories:
+            bits |= 1 << self.categories.add(c)
+        return bits
+
+    def keyword_ids(self, keywords: Iterable[str]) -> np.ndarray:
+        """
+        논문 토큰 → ID (처음 보는 토큰은 max_keywords 까지 추가).
+        """
+        ids = [self.keywords.add(k, self.max_keywords) for k in keywords]
+        if None in ids:
+            self._record_dropped(ids.count(None))
+        ids = set(ids)
+        ids.discard(None)
+        return _sorted_ids(ids)
+
+    def _record_dropped(self, n: int) -> None:
+        # 버린 토큰 수를 세고 1, 10, 100, ... 개를 넘을 때마다 경고 (로그 폭주 방지)
+        self.dropped_keywords += n
+        if self.dropped_keywords >= self._next_drop_warning:
+            while self._next_drop_warning <= self.dropped_keywords:
+                self._next_drop_warning *= 10
+            logger.warning(
+                "[Vocabulary] ⚠️ keyword 사전이 최대 크기(%d = base %d + RL_VOCAB_MAX_GROWTH)에 도달 "
+                "→ 새 토큰 누적 %d개를 ID 없이 버림 (사전을 corpus 로 다시 만들어야 함)",
+                self.max_keywords, self.base_keywords, self.dropped_keywords,
+            )
+
+    def lookup_keyword_ids(self, keywords: Iterable[str]) -> np.ndarray:
+        """
+        사전에 있는 토큰의 ID 만 (추가하지 않음).
+        """
+        get = self.keywords.get
+        ids = {get(k) for k in keywords}
+        ids.discard(None)
+        return _sorted_ids(ids)
+
+    @property
+    def changed(self) -> bool:
+        # 로드 / 마지막 저장 이후 추가된 ID 가 있는지
+        return (len(self.categories), len(self.keywords)) != self._saved_size
+
+    def _tokenize_paper(self, paper: Paper) -> PaperTokens:
+        tokens = {k.lower() for k in paper.keywords}
+        if paper.title:
+            tokens.update(tokenize_keywords(paper.title))
+        if paper.abstract:
+            tokens.update(tokenize_keywords(paper.abstract))
+        return PaperTokens(
+            category_bits=self.category_bits(paper.categories),
+            keyword_ids=self.keyword_ids(paper.keywords),
+            token_ids=self.keyword_ids(tokens),
+        )
+
+    def encode_paper(self, paper: Paper) -> PaperTokens:
+        """
+        Paper 인스턴스에 이미 인코딩 결과가 있으면 그대로, 없으면 arxiv_id 캐시 → 토큰화 순서로 찾는다.
+        """
+        if paper.category_bits is not None:
+            return PaperTokens(paper.category_bits, paper.keyword_ids, paper.token_ids)
+
+        key = paper.arxiv_id or paper.mongo_id
+        encoded = None
+        if key:
+            content = _paper_content_hash(paper)
+            with self._cache_lock:
+                hit = self._paper_cache.get(key)
+                if hit is not None and hit[0] == content:
+                    encoded = hit[1]
+                    self._paper_cache.move_to_end(key)
+        if encoded is None:
+            encoded = self._tokenize_paper(paper)
+            if key:
+                with self._cache_lock:
+                    self._paper_cache[key] = (content, encoded)
+                    self._paper_cache.move_to_end(key)
+                    if len(self._paper_cache) > self.paper_cache_size:
+                        self._paper_cache.popitem(last=False)
+
+        paper.category_bits = encoded.category_bits
+        paper.keyword_ids = encoded.keyword_ids
+        paper.token_ids = encoded.token_ids
+        return encoded
+
+    def encode_profile(self, profile: UserProfile) -> EncodedProfile:
+        """
+        프로필은 요청마다 새로 만들어지므로 인스턴스에만 저장한다.
+        (인코딩 이후 프로필 필드를 바꾸면 profile.encoded = None 으로 초기화해야 함)
+
+        keyword 는 조회만 한다. 사전에 없던 토큰이 있었고 그 뒤 사전이 자랐으면
+        (나중에 인코딩된 후보 논문이 그 토큰을 추가했을 수 있음) 다시 조회한다.
+        """
+        cached = profile.encoded
+        if cached is not None and (cached.complete or cached.vocab_size == len(self.keywords)):
+            return cached
+
+        search_kw = set()
+        for q in profile.search_queries:
+            search_kw.update(tokenize_keywords(q))
+        bookmark_kw = set(profile.interests_keywords) - search_kw
+
+        explicit = set(profile.explicit_categories or [])
+        all_cats = set(profile.interests_categories)
+        bookmark_cats = all_cats - explicit if explicit else all_cats
+
+        vocab_size = len(self.keywords)
+        encoded = EncodedProfile(
+            explicit_bits=self.category_bits(explicit),
+            bookmark_cat_bits=self.category_bits(bookmark_cats),
+            bookmark_kw_ids=self.lookup_keyword_ids(bookmark_kw),
+            search_kw_ids=self.lookup_keyword_ids(search_kw),
+            bookmark_kw_count=len(bookmark_kw),
+            search_kw_count=len(search_kw),
+            vocab_size=vocab_size,
+        )
+        profile.encoded = encoded
+        return encoded
+
+    # ------------------------------------------------------
+    # 저장 / 로드
+    # ------------------------------------------------------
+    def save(self, path: Path = DEFAULT_VOCAB_PATH) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        categories, keywords = self.categories.items(), self.keywords.items()
+        tmp.write_text(json.dumps(
+            {
+                "format_version": VOCAB_FORMAT_VERSION,
+                "categories": categories,
+                "keywords": keywords,
+                "base_keywords": self.base_keywords,
+            },
+            ensure_ascii=False,
+        ))
+        os.replace(tmp, path)
+        self._saved_size = (len(categories), len(keywords))
+        return path
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_VOCAB_PATH) -> "Vocabulary":
+        data = json.loads(Path(path).read_text())
+        version = data.get("format_version")
+        if version != VOCAB_FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 vocabulary 포맷 버전입니다: {version}")
+        # base_keywords 가 없는 예전 파일은 저장된 크기 전체를 base 로 본다
+        return cls(categories=data["categories"], keywords=data["keywords"], base_keywords=data.get("base_keywords"))
+
+    def __repr__(self) -> str:
+        return (
+            f"Vocabulary(categories={len(self.categories)}, keywords={len(self.keywords)}, "
+            f"base_keywords={self.base_keywords}, dropped_keywords={self.dropped_keywords})"
+        )
+
+
+def _paper_content_hash(paper: Paper) -> int:
+    # 토큰화에 쓰는 필드만 (update_date 대신 내용 자체를 비교 → update_date 없이 수정된 문서도 다시 토큰화)
+    return hash((paper.title, paper.abstract, tuple(paper.keywords), tuple(paper.categories)))
+
+
+def _sorted_ids(ids: set) -> np.ndarray:
+    if not ids:
+        return _EMPTY_IDS
+    return np.fromiter(sorted(ids), dtype=np.int32, count=len(ids))
+
+
+def overlap_count(a: np.ndarray, b: np.ndarray) -> int:
+    # 둘 다 정렬된 unique 배열
+    if a.size == 0 or b.size == 0:
+        return 0
+    return int(np.intersect1d(a, b, assume_unique=True).size)
+
+
+def build_vocabulary_from_corpus(loader, batch_size: int = 5000) -> Vocabulary:
+    """
+    papers 컬렉션 전체를 훑어 category / keyword 사전을 만든다.
+    (자주 쓰는 category 가 낮은 bit 를 쓰도록 등장 빈도 순으로 ID 부여)
+    """
+    cat_counts: Dict[str, int] = {}
+    kw_counts: Dict[str, int] = {}
+    cursor = loader.col_papers.find(
+        {}, {"_id": 1, "categories": 1, "keywords": 1, "title": 1, "abstract": 1}
+    ).batch_size(batch_size)
+    for doc in cursor:
+        for c in doc.get("categories") or []:
+            cat_counts[c] = cat_counts.get(c, 0) + 1
+        tokens = set(doc.get("keywords") or [])
+        tokens.update(k.lower() for k in doc.get("keywords") or [])
+        tokens.update(tokenize_keywords(doc.get("title") or ""))
+        tokens.update(tokenize_keywords(doc.get("abstract") or ""))
+        for t in tokens:
+            kw_counts[t] = kw_counts.get(t, 0) + 1
+
+    def by_freq(counts: Dict[str, int]) -> List[str]:
+        return [k for k, _ in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))]
+
+    return Vocabulary(categories=by_freq(cat_counts), keywords=by_freq(kw_counts))
+
+
+# ------------------------------------------------------
+# 프로세스 전역 싱글톤
+# ------------------------------------------------------
+_vocabulary: Optional[Vocabulary] = None
+_vocab_lock = threading.Lock()
+
+
+def get_vocabulary() -> Vocabulary:
+    """
+    저장된 vocabulary 가 있으면 로드, 없으면 빈 사전으로 시작해서 런타임에 확장.
+    """
+    global _vocabulary
+    if _vocabulary is None:
+        with _vocab_lock:
+            if _vocabulary is None:
+                vocab = None
+                if DEFAULT_VOCAB_PATH.exists():
+                    try:
+                        vocab = Vocabulary.load(DEFAULT_VOCAB_PATH)
+                        logger.info(f"[Vocabulary] 로드: {vocab}")
+                    except Exception as e:
+                        logger.warning(f"[Vocabulary] ⚠️ 로드 실패 → 빈 사전으로 시작: {e}")
+                _vocabulary = vocab or Vocabulary()
+    return _vocabulary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .data_loader import MongoDataLoader
+
+    parser = argparse.ArgumentParser(description="papers 컬렉션으로 category / keyword vocabulary 생성")
+    parser.add_argument("--out", type=Path, default=DEFAULT_VOCAB_PATH)
+    args = parser.parse_args()
+
+    vocab = build_vocabulary_from_corpus(MongoDataLoader())
+    vocab.save(args.out)
+    print(f"Saved {vocab} → {args.out}")
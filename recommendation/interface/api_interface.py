@@ -1,11 +1,20 @@
 from __future__ import annotations
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Sequence
 
 from ..data.data_loader import MongoDataLoader
+from ..data.indexes import INDEX_CHECK_MODE, check_indexes
+from .. import request_log
 from ..models.data_models import RecommendationResult
 from .recommend import recommend_user, recommend_user_hybrid, recommend_similar_papers
-from ..rl.reward import compute_reward
+from ..rl.reward import compute_reward, get_reward_config
+from ..rl.hierarchical_bandit import get_hierarchical_bandit
+from ..rl.online_bandit import UnclickedExposureFeeder, get_online_bandit
+from ..rl.registry import version_from_results as _model_version_of
+from ..rl.state_builder import feature_row_from_logged
+from ..service.batch import DEFAULT_BLOCK_SIZE, iter_user_blocks
+from ..service.feed_materializer import lookup_precomputed_feed
+from ..service.pipeline import get_rl_reranker
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +29,31 @@ def _get_loader() -> MongoDataLoader:
     return _loader_singleton
 
 
+def check_loader_indexes(mode: str = INDEX_CHECK_MODE) -> int:
+    """
+    서버 시작 시 loader 쿼리의 index 사용 여부 점검 (RL_INDEX_CHECK=create 면 없는 index 생성).
+    return: COLLSCAN / 메모리 SORT 로 떨어지는 쿼리 수
+    """
+    return check_indexes(_get_loader().db, mode=mode)
+
+
+def start_unclicked_exposure_feeder() -> Optional[UnclickedExposureFeeder]:
+    """
+    online bandit 이 켜져 있으면 상호작용 없이 지나간 노출을 reward 0 으로 update 하는 백그라운드 작업 시작.
+    (상호작용이 온 item 은 log_recommendation_interaction 에서 바로 update)
+    """
+    online = get_online_bandit()
+    if online is None:
+        return None
+    hier = get_hierarchical_bandit()
+    if hier is not None:
+        update_fn = hier.update
+    else:
+        update_fn = lambda user_id, x, reward: online.update(x, reward)
+    feeder = UnclickedExposureFeeder(_get_loader(), update_fn)
+    feeder.start()
+    return feeder
+
 
 # ------------------------------------------------------
 # 룰베이스 추천 API + 노출 로그 기록
@@ -29,28 +63,46 @@ def get_user_recommendations(
     limit: int = 10,
     log_exposure: bool = True,
     request_meta: Optional[Dict[str, Any]] = None,
+    use_precomputed: bool = True,
 ) -> Dict[str, Any]:
     
     #룰 베이스 추천 (기본 추천 API)
-    recs = recommend_user(user_id, top_k=limit)
-    results = recs
-
     loader = _get_loader()
+
+    # 사전 계산된 feed 가 있고 신선하면 _id 조회 한 번으로 응답, 없거나 stale 이면 live 계산
+    feed = lookup_precomputed_feed(loader, user_id, limit, mode="rule_based") if use_precomputed else None
+    if feed is not None:
+        results = feed["results"]
+        mode = feed["mode"]
+        model_version = feed["model_version"]
+        request_meta = {**(request_meta or {}), "feed_source": "precomputed"}
+    else:
+        results = recommend_user(user_id, top_k=limit)
+        mode = "rule_based"
+        model_version = None
+
     recommendation_id: Optional[str] = None
 
     if log_exposure:
         recommendation_id = loader.log_recommendation_event(
             user_id=user_id,
             results=results,
-            mode="rule_based",
+            mode=mode,
             request_meta=request_meta,
+            model_version=model_version,
         )
+    request_log.bind(
+        recommendation_id=recommendation_id,
+        mode=mode,
+        model_version=model_version,
+        feed_source="precomputed" if feed is not None else "live",
+    )
 
     return {
         "user_id": user_id,
         "count": len(results),
         "results": results,
-        "mode": "rule_based",
+        "mode": mode,
         "recommendation_id": recommendation_id,
     }
 
@@ -95,13 +147,16 @@ def get_user_recommendations_rl(
     loader = _get_loader()
     recommendation_id: Optional[str] = None
 
+    model_version = _model_version_of(results)
     if log_exposure:
         recommendation_id = loader.log_recommendation_event(
             user_id=user_id,
             results=results,
             mode="rule_based+rl",
             request_meta=request_meta,
+            model_version=model_version,
         )
+    request_log.bind(recommendation_id=recommendation_id, mode="rule_based+rl", model_version=model_version)
 
     return {
         "user_id": user_id,
@@ -112,6 +167,62 @@ def get_user_recommendations_rl(
     }
 
 
+# ------------------------------------------------------
+# ③ 여러 user 추천을 한 번에 (batch) + 노출 로그 bulk 기록
+# ------------------------------------------------------
+def iter_user_recommendations_batch(
+    user_ids: Sequence[int],
+    limit: int = 6,
+    candidate_k: int = 100,
+    use_rl: bool = True,
+    log_exposure: bool = True,
+    request_meta: Optional[Dict[str, Any]] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """
+    user 마다 get_user_recommendations(_rl) 와 같은 형태의 dict 를 하나씩 yield.
+    user block 단위로 계산하고, 노출 로그도 block 단위 insert_many 로 기록한다.
+    """
+    loader = _get_loader()
+    mode = "rule_based+rl" if use_rl else "rule_based"
+
+    for block in iter_user_blocks(
+        user_ids,
+        top_k=limit,
+        candidate_k=candidate_k,
+        use_rl=use_rl,
+        block_size=block_size,
+        loader=loader,
+        # 요청마다 새로 만들면 checkpoint 재로딩 + reloader 스레드가 쌓이므로 pipeline 의 공용 reranker
+        reranker=get_rl_reranker() if use_rl else None,
+    ):
+        payloads = [
+            (uid, [r.to_frontend_dict() for r in recs]) for uid, recs in block
+        ]
+
+        rec_ids: List[Optional[str]] = [None] * len(payloads)
+        if log_exposure:
+            rec_ids = loader.log_recommendation_events_many([
+                {
+                    "user_id": uid,
+                    "results": results,
+                    "mode": mode,
+                    "request_meta": request_meta,
+                    "model_version": _model_version_of(results),
+                }
+                for uid, results in payloads
+            ])
+
+        for (uid, results), rec_id in zip(payloads, rec_ids):
+            yield {
+                "user_id": uid,
+                "count": len(results),
+                "results": results,
+                "mode": mode,
+                "recommendation_id": rec_id,
+            }
+
+
 # ------------------------------------------------------
 # 클릭 / 북마크 등의 상호작용 로그 API→ 프론트에서 별도 엔드포인트로 호출
 # ------------------------------------------------------
@@ -140,10 +251,10 @@ def log_recommendation_interaction(
                 meta=req.meta,
             )
     """
-    logger.info("=" * 60)
-    logger.info("[RL Interaction] 📥 상호작용 로그 수신")
-    logger.info(f"[RL Interaction] 👤 user_id={user_id}, 📄 paper_id={paper_id}")
-    logger.info(f"[RL Interaction] 🎯 action_type={action_type}, position={position}, dwell_time={dwell_time}")
+    logger.debug(
+        "[RL Interaction] 📥 상호작용 로그 수신: user_id=%s, paper_id=%s, action_type=%s, position=%s, dwell_time=%s",
+        user_id, paper_id, action_type, position, dwell_time,
+    )
     
     loader = _get_loader()
 
@@ -153,19 +264,27 @@ def log_recommendation_interaction(
         "dwell_time": dwell_time,
         "meta": meta or {},
     }
-    reward = compute_reward(interaction_payload)
+    reward_config = get_reward_config()
+    reward = compute_reward(interaction_payload, reward_config)
+    request_log.bind(
+        user_id=user_id,
+        paper_id=paper_id,
+        action_type=action_type,
+        recommendation_id=recommendation_id,
+        reward=reward,
+    )
     
-    # reward 계산 상세 로그
-    logger.info(f"[RL Interaction] 💰 Reward 계산 완료: {reward:.2f}")
-    if action_type == "click":
-        logger.info(f"[RL Interaction]   └─ click: +1.0")
-    elif action_type == "bookmark":
-        logger.info(f"[RL Interaction]   └─ bookmark: +3.0")
-    if dwell_time is not None:
-        if dwell_time >= 3.0:
-            logger.info(f"[RL Interaction]   └─ dwell_time >= 3초: +0.3")
-        elif dwell_time <= 1.0:
-            logger.info(f"[RL Interaction]   └─ dwell_time <= 1초 (이탈): -0.2")
+    # reward 계산 상세 로그 (샘플링된 요청만)
+    if request_log.detail_enabled():
+        logger.info("[RL Interaction] 💰 Reward 계산 완료: %.2f (action_type=%s, dwell_time=%s)", reward, action_type, dwell_time)
+        if action_type in reward_config.action_rewards:
+            logger.info("[RL Interaction]   └─ %s: %+.1f", action_type, reward_config.action_rewards[action_type])
+        if dwell_time is not None:
+            if dwell_time >= reward_config.dwell_threshold:
+                logger.info("[RL Interaction]   └─ dwell_time >= %g초: %+.1f", reward_config.dwell_threshold, reward_config.dwell_reward)
+            elif dwell_time <= reward_config.bounce_threshold:
+                logger.info("[RL Interaction]   └─ dwell_time <= %g초 (이탈): %+.1f", reward_config.bounce_threshold, reward_config.bounce_penalty)
+        logger.info("[RL Interaction]   └─ reward config: %s", reward_config.tag)
 
     interaction_id = loader.log_interaction(
         user_id=user_id,
@@ -176,11 +295,26 @@ def log_recommendation_interaction(
         dwell_time=dwell_time,
         reward=reward,
         meta=meta,
+        reward_version=reward_config.tag,
     )
 
-    logger.info(f"[RL Interaction] ✅ MongoDB 저장 완료: interaction_id={interaction_id}")
-    logger.info(f"[RL Interaction] 🎁 최종 reward: {reward}")
-    logger.info("=" * 60)
+    logger.debug("[RL Interaction] ✅ MongoDB 저장 완료: interaction_id=%s", interaction_id)
+    request_log.bind(interaction_id=interaction_id)
+
+    # online bandit 이 켜져 있으면 노출 당시 feature 로 바로 업데이트
+    #  (hierarchical 이 켜져 있으면 global prior + user delta 를 함께 갱신)
+    #  같은 노출의 나머지 item 은 start_unclicked_exposure_feeder 가 지연 후 reward 0 으로 update
+    online = get_online_bandit()
+    if online is not None and recommendation_id:
+        feats = loader.get_logged_item_features(recommendation_id, paper_id)
+        if feats is not None:
+            hier = get_hierarchical_bandit()
+            if hier is not None:
+                hier.update(user_id, feature_row_from_logged(feats), reward)
+            else:
+                online.update(feature_row_from_logged(feats), reward)
+            logger.debug("[RL Interaction] 🔁 Online bandit 업데이트: n_updates=%d", online.n_updates)
+            request_log.bind(online_update=True)
 
     return {
         "ok": True,
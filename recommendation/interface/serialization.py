@@ -0,0 +1,104 @@
+"""
+serialization.py
+
+추천 결과 → 응답 bytes 직렬화.
+
+기존 경로: to_frontend_dict → transform_paper(pydantic PaperRecommendation) → response_model 검증 → json
+(비교용으로 benchmarks/bench_serialization.py 에만 남아 있음)
+여기서는 frontend dict 를 백엔드 규격 key 로 한 번만 옮긴 뒤 orjson 으로 바로 bytes 를 만든다.
+입력을 RecommendationResult 가 아니라 frontend dict 로 받는 이유: 사전 계산 feed (precomputed_feeds) 가
+to_frontend_dict 결과를 그대로 저장하므로 live / precomputed 응답이 같은 직렬화 경로를 탄다.
+
+- fields: 응답에 넣을 논문 필드 (예: {"paper_id", "title", "total_score"}) → abstract / summary 생략 가능
+- NDJSON: 첫 줄은 응답 메타, 이후 논문 한 편당 한 줄 (limit 이 클 때 스트리밍용)
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # orjson 미설치 환경에서는 표준 json 으로 fallback
+
+
+# 백엔드 규격 필드 → frontend dict key (server.PaperRecommendation 과 같은 순서)
+PAPER_FIELDS: Dict[str, str] = {
+    "paper_id": "id",
+    "title": "title",
+    "authors": "authors",
+    "abstract": "abstract",
+    "categories": "categories",
+    "summary": "summary",
+    "external_url": "externalUrl",
+    "total_score": "score",
+    "breakdown": "features",
+}
+_DEFAULTS: Dict[str, Any] = {"paper_id": "", "categories": [], "total_score": 0.0, "breakdown": {}}
+REQUIRED_FIELDS = frozenset({"paper_id"})
+
+
+def parse_fields(fields: Optional[str]) -> Optional[FrozenSet[str]]:
+    """
+    "paper_id,title,total_score" → frozenset. None / 빈 문자열이면 전체 필드.
+    알 수 없는 필드가 있으면 ValueError.
+    """
+    if not fields:
+        return None
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - PAPER_FIELDS.keys()
+    if unknown:
+        raise ValueError(f"알 수 없는 필드: {sorted(unknown)} (가능: {list(PAPER_FIELDS)})")
+    return frozenset(requested | REQUIRED_FIELDS)
+
+
+def paper_payload(raw: Dict[str, Any], fields: Optional[FrozenSet[str]] = None) -> Dict[str, Any]:
+    """
+    to_frontend_dict() 결과 → 백엔드 규격 dict (bench_serialization.transform_paper 와 같은 값).
+    """
+    out: Dict[str, Any] = {}
+    for name, key in PAPER_FIELDS.items():
+        if fields is not None and name not in fields:
+            continue
+        value = raw.get(key)
+        if value is None:
+            value = _DEFAULTS.get(name)
+        out[name] = value
+    return out
+
+
+def response_payload(
+    meta: Dict[str, Any],
+    results: Iterable[Dict[str, Any]],
+    fields: Optional[FrozenSet[str]] = None,
+) -> Dict[str, Any]:
+    recommendations = [paper_payload(r, fields) for r in results]
+    return {**meta, "recommendations": recommendations, "total_count": len(recommendations)}
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8")
+
+
+def dumps_response(
+    meta: Dict[str, Any],
+    results: List[Dict[str, Any]],
+    fields: Optional[FrozenSet[str]] = None,
+) -> bytes:
+    return dumps(response_payload(meta, results, fields))
+
+
+def iter_ndjson(
+    meta: Dict[str, Any],
+    results: List[Dict[str, Any]],
+    fields: Optional[FrozenSet[str]] = None,
+) -> Iterator[bytes]:
+    """
+    첫 줄: {**meta, "total_count": N}, 이후 논문 한 편당 한 줄.
+    """
+    yield dumps({**meta, "total_count": len(results)}) + b"\n"
+    for r in results:
+        yield dumps(paper_payload(r, fields)) + b"\n"
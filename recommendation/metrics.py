@@ -0,0 +1,283 @@
+"""
+metrics.py
+
+요청 단계별 latency 계측 (span timer + histogram) 과 Prometheus text 포맷 export.
+
+사용:
+    with metrics.span("build_user_profile"):
+        ...
+
+    @metrics.timed("log_recommendation_event")
+    def log_recommendation_event(...): ...
+
+    with metrics.request_scope("/recommendations/rl"):   # server middleware 에서
+        ...                                              # 안쪽 span 에 endpoint label 이 붙음
+
+histogram:
+- rl_request_duration_seconds{endpoint}        요청 전체
+- rl_stage_duration_seconds{stage, endpoint}   단계별 (endpoint 밖에서 실행되면 endpoint="-")
+
+RL_METRICS=0 이면 span() 은 미리 만들어둔 no-op 객체를 돌려주고 timed() 는 원래 함수를 바로 호출한다.
+(시간 측정 / lock 없음)
+"""
+from __future__ import annotations
+
+import contextvars
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+# Prometheus client 기본값과 같은 latency bucket (초)
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0,
+)
+
+REQUEST_METRIC = "rl_request_duration_seconds"
+STAGE_METRIC = "rl_stage_duration_seconds"
+_HELP = {
+    REQUEST_METRIC: "추천 API 요청 처리 시간",
+    STAGE_METRIC: "추천 파이프라인 단계별 처리 시간",
+}
+
+_endpoint: contextvars.ContextVar[str] = contextvars.ContextVar("rl_metrics_endpoint", default="-")
+# 현재 요청의 단계별 누적 시간 (request_scope 안에서만 dict, 요청 로그에 그대로 실림)
+_stages: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("rl_metrics_stages", default=None)
+
+F = TypeVar("F", bound=Callable)
+
+
+class Histogram:
+    """
+    누적 bucket histogram (thread-safe). observe 는 bisect 1번 + lock 안에서 덧셈 3번.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 마지막 칸은 +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """
+        return: (le 별 누적 개수 (+Inf 포함), 합, 개수)
+        """
+        with self._lock:
+            counts, total, n = list(self.counts), self.sum, self.count
+        cumulative = []
+        acc = 0
+        for c in counts:
+            acc += c
+            cumulative.append(acc)
+        return cumulative, total, n
+
+
+class MetricsRegistry:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+        self._stage_cache: Dict[Tuple[str, str], Histogram] = {}  # (stage, endpoint) → histogram
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, **labels: str) -> Histogram:
+        key = (name, tuple(sorted(labels.items())))
+        h = self._histograms.get(key)
+        if h is None:
+            with self._lock:
+                h = self._histograms.get(key)
+                if h is None:
+                    h = self._histograms[key] = Histogram(self.buckets)
+        return h
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        endpoint = _endpoint.get()
+        h = self._stage_cache.get((stage, endpoint))
+        if h is None:
+            h = self._stage_cache[(stage, endpoint)] = self.histogram(STAGE_METRIC, stage=stage, endpoint=endpoint)
+        h.observe(seconds)
+        stages = _stages.get()
+        if stages is not None:
+            stages[stage] = stages.get(stage, 0.0) + seconds
+
+    def observe_request(self, endpoint: str, seconds: float) -> None:
+        self.histogram(REQUEST_METRIC, endpoint=endpoint).observe(seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._stage_cache.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        디버깅 / 벤치마크용: "name{labels}" → {"count", "sum", "mean"}
+        """
+        out = {}
+        for (name, labels), h in list(self._histograms.items()):
+            _, total, n = h.snapshot()
+            key = f"{name}{{{_format_labels(labels)}}}"
+            out[key] = {"count": n, "sum": total, "mean": total / n if n else 0.0}
+        return out
+
+    def render(self) -> str:
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        lines: List[str] = []
+        by_name: Dict[str, List[Tuple[Tuple[Tuple[str, str], ...], Histogram]]] = {}
+        for (name, labels), h in sorted(self._histograms.items(), key=lambda kv: kv[0]):
+            by_name.setdefault(name, []).append((labels, h))
+
+        for name, series in by_name.items():
+            lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, h in series:
+                cumulative, total, n = h.snapshot()
+                for le, c in zip(self.buckets + (float("inf"),), cumulative):
+                    le_str = "+Inf" if le == float("inf") else repr(le)
+                    bucket_labels = _format_labels(labels + (("le", le_str),))
+                    lines.append(f"{name}_bucket{{{bucket_labels}}} {c}")
+                label_str = _format_labels(labels)
+                lines.append(f"{name}_sum{{{label_str}}} {total}")
+                lines.append(f"{name}_count{{{label_str}}} {n}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+
+
+# ------------------------------------------------------
+# 프로세스 전역 registry + on/off
+# ------------------------------------------------------
+_registry = MetricsRegistry()
+_enabled = os.getenv("RL_METRICS", "1").lower() not in ("0", "false", "no")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(enabled: bool) -> None:
+    global _enabled
+    _enabled = bool(enabled)
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        _registry.observe_stage(self.stage, time.perf_counter() - self.start)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(stage: str):
+    """
+    with span("predict_scores"): ...  (예외가 나도 걸린 시간은 기록)
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span(stage)
+
+
+def timed(stage: str) -> Callable[[F], F]:
+    """
+    함수 전체를 span 으로 감싸는 decorator.
+    """
+    def decorator(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _registry.observe_stage(stage, time.perf_counter() - start)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+
+class request_scope:
+    """
+    요청 하나를 감싸서 전체 시간을 기록하고, 안쪽 span 들에 endpoint label 을 붙인다.
+    (contextvar 라 동시 요청 / threadpool 실행에서도 섞이지 않음)
+    """
+
+    __slots__ = ("endpoint", "start", "_token", "_stages_token")
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+
+    def __enter__(self) -> "request_scope":
+        if _enabled:
+            self._token = _endpoint.set(self.endpoint)
+            self._stages_token = _stages.set({})
+        else:
+            self._token = None
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._token is None:
+            return
+        _endpoint.reset(self._token)
+        _stages.reset(self._stages_token)
+        _registry.observe_request(self.endpoint, time.perf_counter() - self.start)
+
+
+def current_endpoint() -> Optional[str]:
+    endpoint = _endpoint.get()
+    return None if endpoint == "-" else endpoint
+
+
+def current_stages() -> Dict[str, float]:
+    """
+    현재 요청에서 지금까지 기록된 단계별 시간 (초). request_scope 밖이면 빈 dict.
+    """
+    return dict(_stages.get() or {})
+
+
+def render() -> str:
+    return _registry.render()
+
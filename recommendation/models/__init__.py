@@ -1,3 +1,3 @@
-from .data_models import Paper, UserProfile, RecommendationResult
+from .data_models import Paper, UserProfile, RecommendationResult, CandidateBatch
 
-__all__ = ["Paper", "UserProfile", "RecommendationResult"]
\ No newline at end of file
+__all__ = ["Paper", "UserProfile", "RecommendationResult", "CandidateBatch"]
\ No newline at end of file
@@ -1,28 +1,58 @@
 from __future__ import annotations
 
+import sys
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
+import numpy as np
 
-@dataclass
+
+def intern_tuple(values: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """
+    category / keyword 목록을 intern 된 문자열 tuple 로 변환.
+    (논문 수십만 개가 같은 "cs.LG" 문자열 객체 하나를 공유)
+    """
+    if not values:
+        return ()
+    return tuple(sys.intern(v) if type(v) is str else v for v in values)
+
+
+def as_float32_vector(values: Any) -> Optional[np.ndarray]:
+    if values is None:
+        return None
+    vec = np.asarray(values, dtype=np.float32)
+    return vec if vec.size else None
+
+
+# __slots__ dataclass: 인스턴스별 __dict__ 가 없어 캐시에 많이 들고 있어도 메모리가 작다.
+@dataclass(slots=True)
 class Paper:
     mongo_id: str
     arxiv_id: Optional[str] = None
     title: Optional[str] = None
     abstract: Optional[str] = None
     authors: Optional[str] = None
-    categories: List[str] = field(default_factory=list)
-    keywords: List[str] = field(default_factory=list)
+    categories: Tuple[str, ...] = ()
+    keywords: Tuple[str, ...] = ()
     update_date: Optional[datetime] = None
     bookmark_count: int = 0
     view_count: int = 0
     difficulty_level: Optional[str] = None
     summary: Optional[Dict[str, Any]] = None
-    embedding_vector: Optional[List[float]] = None
+    embedding_vector: Optional[np.ndarray] = None  # float32 (dim,)
+    # data.vocabulary 가 처음 scoring 할 때 채우는 정수 인코딩 (category bitmask / keyword ID 배열)
+    category_bits: Optional[int] = field(default=None, repr=False, compare=False)
+    keyword_ids: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+    token_ids: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.categories = intern_tuple(self.categories)
+        self.keywords = intern_tuple(self.keywords)
+        self.embedding_vector = as_float32_vector(self.embedding_vector)
 
 
-@dataclass
+@dataclass(slots=True)
 class UserProfile:
     user_id: int
     interests_keywords: List[str] = field(default_factory=list)
@@ -30,10 +60,11 @@ class UserProfile:
     bookmarked_paper_ids: List[str] = field(default_factory=list)
     search_queries: List[str] = field(default_factory=list)
     explicit_categories: Optional[List[str]] = None
+    # data.vocabulary.EncodedProfile (처음 scoring 할 때 채워짐)
+    encoded: Optional[Any] = field(default=None, repr=False, compare=False)
 
 
-
-@dataclass
+@dataclass(slots=True)
 class RecommendationResult:
     paper: Paper
     score: float
@@ -46,10 +77,72 @@ class RecommendationResult:
             "title": self.paper.title,
             "authors": self.paper.authors,
             "abstract": self.paper.abstract,
-            "categories": self.paper.categories,
+            "categories": list(self.paper.categories),
             # summary 구조는 프로젝트 사양에 맞게 조정 가능
             "summary": self.paper.summary,
             "externalUrl": f"https://arxiv.org/abs/{paper_id}" if self.paper.arxiv_id else None,
             "score": self.score,
             "features": self.features,
-        }
\ No newline at end of file
+        }
+
+
+@dataclass(slots=True)
+class CandidateBatch:
+    """
+    rule-based 단계가 만든 후보군을 struct-of-arrays 로 들고 다니는 컨테이너.
+
+    - X: (N, D) float32 feature matrix (열 순서는 feature_names)
+    - rule_scores: (N,) rule-based 최종 점수 (base 논문 유사도 보너스 포함)
+    - similarity_bonus: base 논문 기반 추천일 때만 (N,)
+
+    reranker 는 X 를 그대로 사용하고, RecommendationResult 는 최종 top_k 에 대해서만 만든다.
+    """
+    paper_ids: List[str]
+    papers: List[Paper]
+    X: np.ndarray
+    rule_scores: np.ndarray
+    feature_names: Tuple[str, ...]
+    similarity_bonus: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.paper_ids)
+
+    def take(self, indices: Sequence[int]) -> "CandidateBatch":
+        idx = np.asarray(indices, dtype=np.int64)
+        return CandidateBatch(
+            paper_ids=[self.paper_ids[i] for i in idx],
+            papers=[self.papers[i] for i in idx],
+            X=self.X[idx],
+            rule_scores=self.rule_scores[idx],
+            feature_names=self.feature_names,
+            similarity_bonus=self.similarity_bonus[idx] if self.similarity_bonus is not None else None,
+        )
+
+    def top_k(self, k: int) -> "CandidateBatch":
+        """
+        rule_scores 내림차순 상위 k개 (동점이면 원래 순서 유지).
+        """
+        order = np.argsort(-self.rule_scores, kind="stable")[:k]
+        return self.take(order)
+
+    def feature_dict(self, i: int) -> Dict[str, float]:
+        feats = {name: float(v) for name, v in zip(self.feature_names, self.X[i])}
+        if self.similarity_bonus is not None:
+            feats["similarity_bonus"] = float(self.similarity_bonus[i])
+        return feats
+
+    def to_results(
+        self,
+        indices: Optional[Sequence[int]] = None,
+        scores: Optional[np.ndarray] = None,
+    ) -> List[RecommendationResult]:
+        """
+        선택된 row 만 RecommendationResult 로 변환. scores 를 주면 그 값을 score 로 사용.
+        """
+        if indices is None:
+            indices = range(len(self))
+        results = []
+        for i in indices:
+            score = self.rule_scores[i] if scores is None else scores[i]
+            results.append(RecommendationResult(self.papers[i], float(score), self.feature_dict(i)))
+        return results
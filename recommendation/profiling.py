@@ -0,0 +1,116 @@
+"""
+profiling.py
+
+추천 요청 하나를 cProfile 로 감싸서 .pstats 파일로 남기는 디버그 기능. (기본 꺼짐)
+
+켜는 방법 (둘 중 하나 이상 설정 시 활성화):
+- RL_PROFILE_TOKEN=<secret>  → 요청 헤더 "X-Profile: <secret>" 가 일치하는 요청만 프로파일
+- RL_PROFILE_SAMPLE_RATE=0.001 → 전체 /recommendations* 요청 중 해당 비율을 무작위로 프로파일
+
+결과: RL_PROFILE_DIR (기본 profiles/) 아래 <UTC 시각>_<request_id>.pstats
+    python -m pstats profiles/20250101T000000_abc.pstats   # 또는 snakeviz 등으로 확인
+
+주의:
+- cProfile 은 켠 스레드만 본다. async endpoint 는 event loop 스레드에서 돌아서 잡히지만,
+  sync endpoint (/recommendations/batch) 는 threadpool 에서 실행되어 거의 잡히지 않는다.
+- 프로파일러는 프로세스에 하나만 붙일 수 있으므로 동시에 하나의 요청만 프로파일 (나머지는 그냥 통과).
+- 프로파일은 middleware 가 app 을 await 하는 동안 켜져 있다. 그 사이 같은 event loop 에서 돈
+  다른 요청의 coroutine (async endpoint, middleware, 직렬화) 도 같은 .pstats 에 섞인다.
+  요청 하나만의 깨끗한 프로파일은 동시 요청이 없을 때 (단일 요청 부하) 만 얻을 수 있으므로,
+  토큰 헤더로 조용한 인스턴스 / 로컬에서 떠서 볼 것. 운영 샘플링 결과는 섞인 값으로 해석한다.
+둘 다 설정하지 않으면 maybe_profile() 은 공유 no-op 객체를 돌려준다.
+"""
+from __future__ import annotations
+
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+PROFILE_TOKEN = os.getenv("RL_PROFILE_TOKEN") or None
+PROFILE_SAMPLE_RATE = float(os.getenv("RL_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = Path(os.getenv("RL_PROFILE_DIR", "profiles"))
+
+_profile_lock = threading.Lock()
+_SAFE_ID = re.compile(r"[^0-9A-Za-z_.-]")
+
+
+def is_enabled() -> bool:
+    return PROFILE_TOKEN is not None or PROFILE_SAMPLE_RATE > 0
+
+
+def should_profile(header_value: Optional[str]) -> bool:
+    if PROFILE_TOKEN is not None and header_value == PROFILE_TOKEN:
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+class RequestProfiler:
+    """
+    with RequestProfiler(request_id) as prof:
+        ...  # 켜져 있는 동안 event loop 의 다른 coroutine 도 함께 잡힘 (모듈 docstring 참고)
+    prof.path  # .pstats 경로 (다른 요청이 프로파일 중이라 건너뛰었거나 저장 실패면 None)
+    """
+
+    __slots__ = ("request_id", "out_dir", "path", "_profile")
+
+    def __init__(self, request_id: str, out_dir: Optional[Path] = None):
+        self.request_id = request_id
+        self.out_dir = Path(out_dir or PROFILE_DIR)
+        self.path: Optional[Path] = None
+        self._profile: Optional[cProfile.Profile] = None
+
+    def __enter__(self) -> "RequestProfiler":
+        if _profile_lock.acquire(blocking=False):
+            # 파일 이름은 시작할 때 정한다 (streaming 응답은 header 가 프로파일 종료보다 먼저 나감)
+            stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+            self.path = self.out_dir / f"{stamp}_{_SAFE_ID.sub('_', self.request_id)[:64]}.pstats"
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._profile is None:
+            return
+        try:
+            self._profile.disable()
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            self._profile.dump_stats(str(self.path))
+            logger.info("[Profiling] 📈 프로파일 저장: %s", self.path)
+        except Exception as e:
+            logger.warning("[Profiling] ⚠️ 프로파일 저장 실패: %s", e)
+            self.path = None
+        finally:
+            self._profile = None
+            _profile_lock.release()
+
+
+class _NoopProfiler:
+    __slots__ = ()
+    path = None
+
+    def __enter__(self) -> "_NoopProfiler":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NOOP_PROFILER = _NoopProfiler()
+
+
+def maybe_profile(request_id: str, header_value: Optional[str] = None):
+    """
+    프로파일 대상 요청이면 RequestProfiler, 아니면 no-op.
+    """
+    if not is_enabled() or not should_profile(header_value):
+        return _NOOP_PROFILER
+    return RequestProfiler(request_id)
@@ -0,0 +1,221 @@
+"""
+request_log.py
+
+요청당 구조화 로그 한 줄 + 로그 출력 비동기화.
+
+- 요청 하나가 끝나면 "recommendation.request" logger 로 레코드 1개:
+    {"event": "request", "request_id", "endpoint", "status", "duration_ms",
+     "stages": {"build_user_profile": 12.1, ...},   # metrics span 누적 (ms)
+     "user_id", "recommendation_id", "model_version", ...}  # 처리 중 bind() 한 값
+- 후보별 상세 로그 (후보 미리보기, 최종 결과 줄, reward 상세)는 detail_enabled() 일 때만.
+  요청 단위로 RL_LOG_DETAIL_SAMPLE 비율만큼 샘플링 (한 요청 안에서는 전부 남기거나 전부 생략)
+- configure_logging(): root handler 를 QueueHandler 로 바꾸고 실제 출력(stream)은 QueueListener 스레드에서.
+  RL_LOG_FORMAT=json 이면 한 줄 JSON, text 면 기존 포맷.
+
+hot path 의 로그는 f-string 대신 %-style 인자로 넘겨서, 레벨이 꺼져 있으면 문자열을 만들지 않는다.
+"""
+from __future__ import annotations
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from . import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # orjson 미설치 환경에서는 표준 json 으로 fallback
+
+LOG_FORMAT = os.getenv("RL_LOG_FORMAT", "text").lower()
+LOG_LEVEL = os.getenv("RL_LOG_LEVEL", "INFO").upper()
+DETAIL_SAMPLE_RATE = float(os.getenv("RL_LOG_DETAIL_SAMPLE", "0.01"))
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+request_logger = logging.getLogger("recommendation.request")
+
+
+@dataclass
+class RequestRecord:
+    request_id: str
+    endpoint: str
+    detail: bool
+    start: float = field(default_factory=time.perf_counter)
+    fields: Dict[str, Any] = field(default_factory=dict)
+
+
+_current: contextvars.ContextVar[Optional[RequestRecord]] = contextvars.ContextVar(
+    "rl_request_record", default=None
+)
+
+
+def bind(**fields: Any) -> None:
+    """
+    현재 요청 레코드에 key id 추가 (요청 밖에서 호출되면 무시).
+    """
+    record = _current.get()
+    if record is not None:
+        record.fields.update(fields)
+
+
+def detail_enabled() -> bool:
+    """
+    후보별 상세 로그를 남길지. 요청 안이면 요청 시작 시 정한 샘플링 결과, 밖이면 호출마다 샘플링.
+    """
+    record = _current.get()
+    if record is not None:
+        return record.detail
+    return DETAIL_SAMPLE_RATE > 0 and random.random() < DETAIL_SAMPLE_RATE
+
+
+def current_request_id() -> Optional[str]:
+    record = _current.get()
+    return record.request_id if record is not None else None
+
+
+class request_record:
+    """
+    with request_record(endpoint, request_id) as rec:
+        ...
+        rec.fields["status"] = 200
+    블록이 끝나면 레코드 1개를 남긴다.
+    (server 의 ASGI middleware 는 streaming body 까지 다 보낸 뒤에 블록을 닫으므로
+     duration_ms / stages / bind() 값에 body 생성 구간도 포함된다)
+    """
+
+    __slots__ = ("record", "_token")
+
+    def __init__(self, endpoint: str, request_id: str, sample_rate: Optional[float] = None):
+        rate = DETAIL_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.record = RequestRecord(
+            request_id=request_id,
+            endpoint=endpoint,
+            detail=rate > 0 and random.random() < rate,
+        )
+
+    def __enter__(self) -> RequestRecord:
+        self._token = _current.set(self.record)
+        return self.record
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current.reset(self._token)
+        if not request_logger.isEnabledFor(logging.INFO):
+            return
+        rec = self.record
+        payload = {
+            "event": "request",
+            "request_id": rec.request_id,
+            "endpoint": rec.endpoint,
+            "duration_ms": round((time.perf_counter() - rec.start) * 1000, 2),
+            "stages": {k: round(v * 1000, 2) for k, v in metrics.current_stages().items()},
+            **rec.fields,
+        }
+        if exc_type is not None:
+            payload["error"] = repr(exc)
+        request_logger.info("[Request] %s", _LazyJson(payload), extra={"fields": payload})
+
+
+def _to_json(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY, default=str).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, default=str)
+
+
+class _LazyJson:
+    """
+    text 포맷에서 메시지를 실제로 출력할 때 (listener 스레드) 한 번만 직렬화.
+    """
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj: Any):
+        self.obj = obj
+
+    def __str__(self) -> str:
+        return _to_json(self.obj)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    한 줄 JSON. extra={"fields": {...}} 로 넘긴 값은 최상위 key 로 펼친다.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None)
+        out: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        if fields is not None:
+            out.update(fields)
+        else:
+            out["message"] = record.getMessage()
+        if record.exc_info:
+            out["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            out["exc_info"] = record.exc_text
+        return _to_json(out)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    기본 QueueHandler.prepare 는 호출한 스레드에서 메시지를 format 한다.
+    여기서는 traceback 만 미리 문자열로 만들고, 메시지 format 은 listener 스레드로 미룬다.
+    (%-style 인자는 로그 호출 이후 바뀌지 않는 값만 넘길 것)
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(fmt: Optional[str] = None, level: Optional[str] = None) -> None:
+    """
+    root logger → QueueHandler (요청 스레드는 queue 에 넣기만) → QueueListener 스레드가 stderr 로 출력.
+    여러 번 호출해도 listener 는 하나만 띄운다.
+    """
+    global _listener
+    fmt = (fmt or LOG_FORMAT).lower()
+    level = (level or LOG_LEVEL).upper()
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    _stop_listener()
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    root.setLevel(level)
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()  # 남은 레코드를 모두 출력한 뒤 종료
+        _listener = None
+
+
+atexit.register(_stop_listener)
@@ -2,5 +2,8 @@
 RL (Contextual Bandit) 기반 추천 모듈.
 
 - state_builder: 후보 논문 + 사용자 프로필 → feature matrix
-- bandit_policy: 학습된 Bandit 모델 로딩 및 inference
+- feature_schema: feature 이름 / 순서 / 정규화 schema (checkpoint 와 함께 저장, 로드 시 검사)
+- bandit_policy: 모델 zoo (linear / mlp), checkpoint 저장·로딩 및 inference
+- online_bandit: 상호작용 reward 로 실시간 갱신되는 LinUCB / Thompson bandit
+- hierarchical_bandit / param_store: global prior + user 별 delta (LRU 디스크 paging)
 """
\ No newline at end of file
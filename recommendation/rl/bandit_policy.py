@@ -1,11 +1,18 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional, Sequence
 
 import numpy as np
 
+from .feature_schema import (
+    DEFAULT_FEATURE_SCHEMA,
+    LEGACY_TRAIN_RL_SCHEMA,
+    FeatureSchema,
+)
+from .reward import RewardConfig
+
 try:
     import torch
     import torch.nn as nn
@@ -15,6 +22,7 @@ except ImportError:
 
 
 DEFAULT_MODEL_PATH = Path("models/rl/bandit_policy_latest.pt")
+CHECKPOINT_FORMAT = "bandit-policy"
 
 
 @dataclass
@@ -22,6 +30,7 @@ class PolicyConfig:
     input_dim: int
     model_path: Path = DEFAULT_MODEL_PATH
     device: str = "cpu"
+    schema: FeatureSchema = DEFAULT_FEATURE_SCHEMA
 
 
 class SimpleBanditModel(nn.Module if nn is not None else object):
@@ -41,6 +50,143 @@ class SimpleBanditModel(nn.Module if nn is not None else object):
         return self.linear(x).squeeze(-1)  # (N,)
 
 
+class MLPBanditModel(nn.Module if nn is not None else object):
+    """
+    2-layer MLP (D → hidden → 1). models/rl/train_rl.py 에서 학습하던 구조와 동일.
+    """
+
+    def __init__(self, input_dim: int, hidden_dim: int = 32):
+        if nn is None:
+            raise RuntimeError("PyTorch가 설치되어 있지 않습니다.")
+        super().__init__()
+        self.net = nn.Sequential(
+            nn.Linear(input_dim, hidden_dim),
+            nn.ReLU(),
+            nn.Linear(hidden_dim, 1),
+        )
+
+    def forward(self, x):
+        return self.net(x).squeeze(-1)  # (N,)
+
+
+# architecture tag → 모델 클래스 (checkpoint 의 "arch" 로 선택)
+MODEL_ZOO = {
+    "linear": SimpleBanditModel,
+    "mlp": MLPBanditModel,
+}
+
+
+def build_model(arch: str, input_dim: int, **arch_kwargs):
+    cls = MODEL_ZOO.get(arch)
+    if cls is None:
+        raise ValueError(f"알 수 없는 모델 architecture: {arch} (가능: {sorted(MODEL_ZOO)})")
+    return cls(input_dim, **arch_kwargs)
+
+
+@dataclass
+class LoadedCheckpoint:
+    model: Any
+    arch: str
+    schema: FeatureSchema
+    meta: Dict[str, Any] = field(default_factory=dict)
+    reward_config: Optional[RewardConfig] = None  # 학습 데이터 y 를 계산한 reward config
+    reward_versions: List[str] = field(default_factory=list)  # y 에 들어간 reward 의 RewardConfig.tag 목록
+
+
+def save_checkpoint(
+    model,
+    path: Path,
+    arch: str,
+    schema: FeatureSchema = DEFAULT_FEATURE_SCHEMA,
+    arch_kwargs: Optional[Dict[str, Any]] = None,
+    meta: Optional[Dict[str, Any]] = None,
+    reward_config: Optional[RewardConfig] = None,
+    reward_versions: Optional[Sequence[str]] = None,
+) -> Path:
+    """
+    모델 state_dict 와 함께 architecture tag / feature schema / reward config 를 저장.
+    reward_versions 를 안 주면 reward_config.tag 하나로 기록.
+    """
+    if torch is None:
+        raise RuntimeError("PyTorch가 설치되어 있지 않습니다.")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    torch.save(
+        {
+            "format": CHECKPOINT_FORMAT,
+            "arch": arch,
+            "arch_kwargs": arch_kwargs or {},
+            "input_dim": schema.dim,
+            "schema": schema.to_dict(),
+            "reward_config": reward_config.to_dict() if reward_config else None,
+            "reward_versions": list(reward_versions or ([reward_config.tag] if reward_config else [])),
+            "state_dict": model.state_dict(),
+            "meta": meta or {},
+        },
+        path,
+    )
+    return path
+
+
+def _legacy_checkpoint(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    schema 없이 state_dict 만 저장된 예전 checkpoint 를 해석.
+    - linear.weight        → SimpleBanditModel, state_builder 순서로 학습된 것
+    - net.0.weight         → train_rl.py 의 MLP, 예전 train_rl 순서로 학습된 것
+    """
+    if "linear.weight" in state:
+        return {
+            "arch": "linear",
+            "arch_kwargs": {},
+            "schema": DEFAULT_FEATURE_SCHEMA.to_dict(),
+            "state_dict": state,
+        }
+    if "net.0.weight" in state:
+        return {
+            "arch": "mlp",
+            "arch_kwargs": {"hidden_dim": int(state["net.0.weight"].shape[0])},
+            "schema": LEGACY_TRAIN_RL_SCHEMA.to_dict(),
+            "state_dict": state,
+        }
+    raise ValueError(f"checkpoint 형식을 알 수 없습니다: keys={list(state)[:5]}")
+
+
+def load_checkpoint(
+    path: Path,
+    expected_schema: Optional[FeatureSchema] = DEFAULT_FEATURE_SCHEMA,
+    map_location: str = "cpu",
+) -> LoadedCheckpoint:
+    """
+    checkpoint 를 읽어 architecture tag 에 맞는 모델을 만든다.
+
+    expected_schema 를 넘기면 checkpoint 의 feature 이름 / 순서가 다를 때
+    FeatureSchemaMismatch 를 낸다. (None 이면 검사하지 않음)
+    """
+    if torch is None:
+        raise RuntimeError("PyTorch가 설치되어 있지 않습니다.")
+    ckpt = torch.load(path, map_location=map_location)
+    if ckpt.get("format") != CHECKPOINT_FORMAT:
+        ckpt = _legacy_checkpoint(ckpt)
+
+    schema = FeatureSchema.from_dict(ckpt["schema"])
+    if expected_schema is not None:
+        expected_schema.require_compatible(schema)
+
+    model = build_model(ckpt["arch"], schema.dim, **(ckpt.get("arch_kwargs") or {}))
+    model.load_state_dict(ckpt["state_dict"])
+    model.to(map_location)
+    model.eval()
+    reward_config = ckpt.get("reward_config")
+    return LoadedCheckpoint(
+        model=model,
+        arch=ckpt["arch"],
+        schema=schema,
+        meta=ckpt.get("meta") or {},
+        reward_config=RewardConfig.from_dict(reward_config) if reward_config else None,
+        reward_versions=list(ckpt.get("reward_versions") or []),
+    )
+
+
 class BanditPolicy:
     """
     Contextual Bandit Policy
@@ -53,7 +199,8 @@ class BanditPolicy:
 
     def __init__(self, config: PolicyConfig):
         self.config = config
-        self.model: Optional[SimpleBanditModel] = None
+        self.model = None
+        self.schema: Optional[FeatureSchema] = None  # 로드된 checkpoint 의 schema (정규화 포함)
         self.device = config.device
         self._loaded = False
 
@@ -74,12 +221,12 @@ class BanditPolicy:
             self._loaded = True
             return
 
-        model = SimpleBanditModel(input_dim)
-        state = torch.load(model_path, map_location=self.device)
-        model.load_state_dict(state)
-        model.to(self.device)
-        model.eval()
-        self.model = model
+        # feature 순서가 다른 checkpoint 면 FeatureSchemaMismatch
+        loaded = load_checkpoint(model_path, expected_schema=self.config.schema, map_location=self.device)
+        if loaded.schema.dim != input_dim:
+            raise ValueError(f"입력 차원 불일치: checkpoint={loaded.schema.dim}, X={input_dim}")
+        self.model = loaded.model
+        self.schema = loaded.schema
         self._loaded = True
 
     def predict_scores(self, X: np.ndarray) -> np.ndarray:
@@ -101,7 +248,7 @@ class BanditPolicy:
             return X[:, -1].astype(float)
 
         with torch.no_grad():
-            x_t = torch.from_numpy(X).float().to(self.device)
+            x_t = torch.from_numpy(self.schema.normalize(X)).float().to(self.device)
             scores_t = self.model(x_t)
             scores = scores_t.cpu().numpy().astype(float)
         return scores
@@ -1,4 +1,7 @@
 """
 Dataset 관련 모듈
 - builder: Mongo 로그로부터 BanditDataset 생성
+  (build_bandit_dataset_from_logs: 노출 시점 features 로 point-in-time 학습 데이터 생성)
+- sharded: 여러 프로세스로 나눠서 feature 추출 + shard 병합
+- snapshot: 학습 데이터 on-disk 포맷(.npy + schema.json) 과 memory-map Dataset
 """
\ No newline at end of file
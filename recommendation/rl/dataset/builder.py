@@ -1,13 +1,13 @@
 from __future__ import annotations
 import time
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 import numpy as np
 
 from ...data.data_loader import MongoDataLoader
-from ..state_builder import build_candidate_features
-from ..utils.reward import InteractionSignal, compute_reward
+from ..reward import RewardConfig, compute_rewards, get_reward_config
+from ..state_builder import FEATURE_NAMES, build_candidate_features, feature_row_from_logged
 
 
 @dataclass
@@ -16,6 +16,15 @@ class BanditDataset:
     y: np.ndarray
     user_ids: List[int]
     paper_ids: List[str]
+    # y 를 계산한 reward config (snapshot / checkpoint 에 함께 기록)
+    # 로그에 저장된 reward 를 그대로 쓰면서 version 이 섞여 있으면 None
+    reward_config: Optional[RewardConfig] = None
+    # y 에 들어간 reward 의 RewardConfig.tag 목록 (로그 그대로면 로그의 reward_version 들)
+    reward_versions: List[str] = field(default_factory=list)
+
+
+# reward_version 필드가 생기기 전에 저장된 상호작용 로그의 reward
+UNVERSIONED_REWARD = "unversioned"
 
 
 def _iter_paper_recommendation_docs(loader: MongoDataLoader, limit=None):
@@ -28,7 +37,27 @@ def _iter_paper_recommendation_docs(loader: MongoDataLoader, limit=None):
         yield doc
 
 
-def build_bandit_dataset_from_mongo(limit: Optional[int] = None) -> BanditDataset:
+def _list_recommendation_user_ids(loader: MongoDataLoader) -> List[int]:
+    col = loader.db["paper_recommendations"]
+    user_ids = col.distinct("user_id", {"recommendation_type": "rule_based"})
+    return sorted({int(u) for u in user_ids if u})
+
+
+def _iter_paper_recommendation_docs_for_users(loader: MongoDataLoader, user_ids: List[int]):
+    # (user_id, paper_id, _id) 순으로 정렬해서 읽어야 shard 결과가 항상 동일하다.
+    col = loader.db["paper_recommendations"]
+    cursor = col.find(
+        {"recommendation_type": "rule_based", "user_id": {"$in": list(user_ids)}},
+        {"user_id": 1, "paper_id": 1, "was_clicked": 1},
+    ).sort([("user_id", 1), ("paper_id", 1), ("_id", 1)])
+
+    for doc in cursor:
+        yield doc
+
+
+def build_bandit_dataset_from_mongo(
+    limit: Optional[int] = None, reward_config: Optional[RewardConfig] = None
+) -> BanditDataset:
     print("[DEBUG] build_bandit_dataset_from_mongo() 시작")
     t0 = time.time()
 
@@ -36,7 +65,7 @@ def build_bandit_dataset_from_mongo(limit: Optional[int] = None) -> BanditDatase
     print("[DEBUG] MongoDataLoader 생성 완료")
 
     X_rows = []
-    y_list = []
+    actions = []
     user_ids = []
     paper_ids = []
 
@@ -69,21 +98,8 @@ def build_bandit_dataset_from_mongo(limit: Optional[int] = None) -> BanditDatase
         if X_single.shape[0] != 1:
             continue
 
-        # --------------------------
-        # REWARD 계산
-        # --------------------------
-        was_clicked = bool(doc.get("was_clicked", False))
-
-        reward = compute_reward(
-            InteractionSignal(
-                was_clicked=was_clicked,
-                was_bookmarked=False,
-                dwell_time_ms=None
-            )
-        )
-
         X_rows.append(X_single[0])
-        y_list.append(reward)
+        actions.append("click" if doc.get("was_clicked", False) else "")
         user_ids.append(user_id)
         paper_ids.append(pid_list[0])
 
@@ -98,9 +114,222 @@ def build_bandit_dataset_from_mongo(limit: Optional[int] = None) -> BanditDatase
             paper_ids=[],
         )
 
+    # --------------------------
+    # REWARD 계산 (was_clicked 만 있음 → click 보상)
+    # --------------------------
+    reward_config = reward_config or get_reward_config()
     return BanditDataset(
         X=np.stack(X_rows),
-        y=np.asarray(y_list, dtype=float),
+        y=compute_rewards(actions, config=reward_config),
+        user_ids=user_ids,
+        paper_ids=paper_ids,
+        reward_config=reward_config,
+        reward_versions=[reward_config.tag],
+    )
+
+
+# ------------------------------------------------------
+# 노출 로그(recommendation_events) 기반 dataset
+# ------------------------------------------------------
+@dataclass
+class LoggedExposureChunk:
+    """
+    recommendation_events.items 한 덩어리 (event 경계에서만 잘림).
+
+    - event_ids: 각 row 가 속한 recommendation_id
+    - positions / scores: 노출 당시 순위와 점수
+    - X: 노출 당시 저장된 features 로 만든 feature matrix
+    - y: 해당 (recommendation_id, paper_id) 상호작용 reward 합 (없으면 0)
+    - interacted: 상호작용 로그가 있었는지 여부
+    - reward_versions: y 를 만든 상호작용 로그 reward 의 RewardConfig.tag 목록
+    """
+    event_ids: List[str]
+    user_ids: List[int]
+    paper_ids: List[str]
+    positions: np.ndarray
+    scores: np.ndarray
+    X: np.ndarray
+    y: np.ndarray
+    interacted: np.ndarray
+    reward_versions: Tuple[str, ...] = ()
+
+    def __len__(self) -> int:
+        return len(self.paper_ids)
+
+
+def _build_interaction_index(
+    loader: MongoDataLoader, reward_config: Optional[RewardConfig] = None
+) -> Tuple[Dict[Tuple[str, str], float], Tuple[str, ...]]:
+    """
+    recommendation_interactions 를 (recommendation_id, paper_id) → reward 합 으로 인덱싱.
+    (hash join 의 build side)
+
+    - reward_config 가 없으면 로그에 저장된 reward 를 쓰고, 비어있는 것만 기본 config 로 계산
+    - reward_config 를 주면 저장된 값은 무시하고 action_type / dwell_time 으로 전부 다시 계산 (relabel)
+    reward 계산은 문서를 다 읽은 뒤 compute_rewards 한 번으로 한다.
+    return: (index, 사용한 reward 의 RewardConfig.tag 목록)
+    """
+    cursor = loader.col_reco_interactions.find(
+        {"recommendation_id": {"$ne": None}},
+        {
+            "recommendation_id": 1, "paper_id": 1, "reward": 1, "reward_version": 1,
+            "action_type": 1, "dwell_time": 1,
+        },
+    )
+    keys: List[Tuple[str, str]] = []
+    stored: List[Optional[float]] = []
+    stored_versions: List[Optional[str]] = []
+    actions: List[Optional[str]] = []
+    dwell_times: List[Optional[float]] = []
+    for doc in cursor:
+        keys.append((doc["recommendation_id"], doc.get("paper_id")))
+        stored.append(doc.get("reward"))
+        stored_versions.append(doc.get("reward_version"))
+        actions.append(doc.get("action_type"))
+        dwell_times.append(doc.get("dwell_time"))
+
+    config = reward_config or get_reward_config()
+    rewards = compute_rewards(actions, dwell_times, config=config)
+    if reward_config is None:
+        logged = np.asarray(stored, dtype=np.float64)  # None → NaN
+        computed = np.isnan(logged)
+        rewards = np.where(computed, rewards, logged)
+        versions: Set[str] = {
+            config.tag if c else (v or UNVERSIONED_REWARD)
+            for c, v in zip(computed.tolist(), stored_versions)
+        }
+    else:
+        versions = {config.tag} if keys else set()
+
+    index: Dict[Tuple[str, str], float] = {}
+    for key, reward in zip(keys, rewards.tolist()):
+        index[key] = index.get(key, 0.0) + reward
+    return index, tuple(sorted(versions))
+
+
+def _make_exposure_chunk(rows: List[tuple], reward_versions: Tuple[str, ...] = ()) -> LoggedExposureChunk:
+    event_ids, user_ids, paper_ids, positions, scores, feats, rewards, interacted = zip(*rows)
+    return LoggedExposureChunk(
+        event_ids=list(event_ids),
+        user_ids=list(user_ids),
+        paper_ids=list(paper_ids),
+        positions=np.asarray(positions, dtype=np.int32),
+        scores=np.asarray(scores, dtype=np.float32),
+        X=np.asarray(feats, dtype=np.float32).reshape(len(rows), len(FEATURE_NAMES)),
+        y=np.asarray(rewards, dtype=np.float32),
+        interacted=np.asarray(interacted, dtype=bool),
+        reward_versions=reward_versions,
+    )
+
+
+def iter_logged_exposures(
+    loader: MongoDataLoader,
+    chunk_size: int = 10_000,
+    include_unclicked: bool = True,
+    mode: Optional[str] = None,
+    limit: Optional[int] = None,
+    reward_config: Optional[RewardConfig] = None,
+) -> Iterator[LoggedExposureChunk]:
+    """
+    recommendation_events.items 와 recommendation_interactions 를
+    (recommendation_id, paper_id) 로 hash join 해서 chunk 단위로 돌려준다.
+
+    - interactions 쪽을 먼저 dict 로 인덱싱하고, events 는 커서로 흘려보내며 probe.
+    - features 는 노출 시점에 로그로 남은 값을 사용 (build_user_profile 호출 없음)
+    - include_unclicked=False 면 상호작용이 있었던 노출만 남긴다.
+    - reward_config 를 주면 로그의 reward 대신 그 config 로 다시 계산한 reward 를 쓴다.
+    """
+    index, reward_versions = _build_interaction_index(loader, reward_config)
+
+    query = {"mode": mode} if mode else {}
+    cursor = loader.col_reco_events.find(
+        query, {"recommendation_id": 1, "user_id": 1, "items": 1}
+    ).sort("created_at", 1)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    rows: List[tuple] = []
+    for event in cursor:
+        rec_id = event.get("recommendation_id") or event.get("_id")
+        user_id = event.get("user_id")
+        for item in event.get("items") or []:
+            paper_id = item.get("paper_id")
+            if not paper_id:
+                continue
+            reward = index.get((rec_id, paper_id))
+            if reward is None and not include_unclicked:
+                continue
+            rows.append((
+                rec_id,
+                user_id,
+                paper_id,
+                int(item.get("position", 0) or 0),
+                float(item.get("score", 0.0) or 0.0),
+                feature_row_from_logged(item.get("features") or {}),
+                reward or 0.0,
+                reward is not None,
+            ))
+
+        # event 중간에서 자르지 않는다 (OPE 등에서 event 단위 집계가 필요)
+        if len(rows) >= chunk_size:
+            yield _make_exposure_chunk(rows, reward_versions)
+            rows = []
+
+    if rows:
+        yield _make_exposure_chunk(rows, reward_versions)
+
+
+def build_bandit_dataset_from_logs(
+    limit: Optional[int] = None,
+    include_unclicked: bool = True,
+    loader: Optional[MongoDataLoader] = None,
+    reward_config: Optional[RewardConfig] = None,
+) -> BanditDataset:
+    """
+    노출 당시 로그에 저장된 feature 로 BanditDataset 생성 (point-in-time correct).
+
+    build_bandit_dataset_from_mongo 와 달리 오늘의 profile / 오늘 시각으로
+    feature 를 다시 계산하지 않으므로 미래 북마크가 섞이지 않고, row 당 DB 조회도 없다.
+    reward_config 를 주면 상호작용 로그를 그 config 로 relabel 한다.
+    안 주면 로그에 저장된 reward 를 쓰고, 그 reward_version 들을 dataset.reward_versions 에 남긴다.
+    (모두 현재 기본 config 로 계산된 값이면 dataset.reward_config 도 그 config)
+    """
+    t0 = time.time()
+    loader = loader or MongoDataLoader()
+
+    X_parts: List[np.ndarray] = []
+    y_parts: List[np.ndarray] = []
+    user_ids: List[int] = []
+    paper_ids: List[str] = []
+    reward_versions: Set[str] = set()
+    chunks = iter_logged_exposures(
+        loader, include_unclicked=include_unclicked, limit=limit, reward_config=reward_config
+    )
+    for chunk in chunks:
+        X_parts.append(chunk.X)
+        y_parts.append(chunk.y)
+        user_ids.extend(chunk.user_ids)
+        paper_ids.extend(chunk.paper_ids)
+        reward_versions.update(chunk.reward_versions)
+
+    print(f"[logs] 샘플 개수: {len(paper_ids)} (소요 {time.time() - t0:.2f}초)")
+
+    if not X_parts:
+        return BanditDataset(
+            X=np.zeros((0, 0)),
+            y=np.zeros((0,)),
+            user_ids=[],
+            paper_ids=[],
+        )
+
+    if reward_config is None and reward_versions == {get_reward_config().tag}:
+        reward_config = get_reward_config()
+
+    return BanditDataset(
+        X=np.concatenate(X_parts, axis=0),
+        y=np.concatenate(y_parts, axis=0).astype(float),
         user_ids=user_ids,
         paper_ids=paper_ids,
+        reward_config=reward_config,
+        reward_versions=sorted(reward_versions),
     )
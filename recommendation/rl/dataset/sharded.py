@@ -0,0 +1,311 @@
+"""
+sharded.py
+
+paper_recommendations 기반 offline feature 추출을 여러 프로세스로 나눠 수행하는 모듈.
+
+- user 를 num_shards 개로 나누고 ProcessPoolExecutor 로 병렬 처리
+- 각 worker 프로세스는 자신만의 MongoDataLoader(MongoClient) 를 가진다
+- shard 결과는 shard_XXXX/ 아래 X.npy, y.npy, meta.json 으로 저장
+- merge_shards() 로 shard 순서대로 이어 붙인다 (결과는 snapshot 포맷으로 저장 가능)
+
+결정성:
+- user 분할은 정렬된 user_id 기준 round-robin 이라 worker 수와 무관하다.
+- 기준 시각(now)을 고정해서 넘기면 같은 입력에 대해 항상 byte 단위로 같은 결과가 나온다.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from ...data.data_loader import MongoDataLoader
+from ..state_builder import build_candidate_features
+from ..reward import DEFAULT_REWARD_CONFIG, RewardConfig, compute_rewards, get_reward_config
+from .builder import (
+    BanditDataset,
+    _iter_paper_recommendation_docs_for_users,
+    _list_recommendation_user_ids,
+)
+from .snapshot import write_snapshot
+
+NUM_FEATURES = 5
+
+LoaderFactory = Callable[[], MongoDataLoader]
+
+
+@dataclass
+class ShardSpec:
+    shard_index: int
+    user_ids: List[int]
+    output_dir: Path
+    now: datetime
+    reward_config: RewardConfig = field(default=DEFAULT_REWARD_CONFIG)
+
+    @property
+    def shard_dir(self) -> Path:
+        return self.output_dir / f"shard_{self.shard_index:04d}"
+
+    def fingerprint(self) -> str:
+        # 같은 shard 입력인지 확인하기 위한 해시 (재실행 시 완료된 shard 는 건너뜀)
+        h = hashlib.sha1()
+        h.update(self.now.isoformat().encode())
+        h.update(",".join(str(u) for u in self.user_ids).encode())
+        h.update(self.reward_config.fingerprint.encode())
+        return h.hexdigest()
+
+
+# ------------------------------------------------------
+# worker 프로세스 전역 상태 (프로세스마다 MongoClient 1개)
+# ------------------------------------------------------
+_worker_loader: Optional[MongoDataLoader] = None
+
+
+def _init_worker(loader_factory: LoaderFactory) -> None:
+    global _worker_loader
+    _worker_loader = loader_factory()
+
+
+def partition_users(user_ids: List[int], num_shards: int) -> List[List[int]]:
+    """
+    정렬된 user_id 를 round-robin 으로 num_shards 개에 분배.
+    """
+    ordered = sorted(set(user_ids))
+    return [ordered[i::num_shards] for i in range(num_shards)]
+
+
+def _is_shard_complete(spec: ShardSpec) -> bool:
+    meta_path = spec.shard_dir / "meta.json"
+    if not meta_path.exists():
+        return False
+    try:
+        meta = json.loads(meta_path.read_text())
+    except Exception:
+        return False
+    return meta.get("fingerprint") == spec.fingerprint()
+
+
+def _write_shard(spec: ShardSpec, X: np.ndarray, y: np.ndarray,
+                 user_ids: List[int], paper_ids: List[str]) -> None:
+    # 임시 디렉토리에 다 쓴 뒤 rename → 중간에 죽어도 반쪽짜리 shard 가 남지 않는다.
+    tmp_dir = spec.output_dir / f".tmp_shard_{spec.shard_index:04d}_{os.getpid()}"
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    np.save(tmp_dir / "X.npy", X)
+    np.save(tmp_dir / "y.npy", y)
+    meta = {
+        "shard_index": spec.shard_index,
+        "fingerprint": spec.fingerprint(),
+        "num_rows": int(X.shape[0]),
+        "user_ids": user_ids,
+        "paper_ids": paper_ids,
+    }
+    (tmp_dir / "meta.json").write_text(json.dumps(meta, sort_keys=True))
+
+    if spec.shard_dir.exists():
+        shutil.rmtree(spec.shard_dir)
+    os.replace(tmp_dir, spec.shard_dir)
+
+
+def _extract_shard(spec: ShardSpec) -> int:
+    """
+    worker 에서 실행: shard 에 속한 user 들의 feature 를 계산해서 저장.
+    - user 별로 profile 은 1번만 만들고, 논문은 $in 쿼리로 한 번에 가져온다.
+    """
+    loader = _worker_loader
+    if loader is None:
+        raise RuntimeError("worker loader 가 초기화되지 않았습니다.")
+
+    X_rows: List[np.ndarray] = []
+    actions: List[str] = []
+    row_user_ids: List[int] = []
+    row_paper_ids: List[str] = []
+
+    def flush(user_id: int, docs: List[dict]) -> None:
+        papers = loader.get_papers_by_arxiv_ids(d["paper_id"] for d in docs)
+        docs = [d for d in docs if d["paper_id"] in papers]
+        if not docs:
+            return
+
+        profile = loader.build_user_profile(user_id)
+        X_user, pid_list, _ = build_candidate_features(
+            profile, [papers[d["paper_id"]] for d in docs], now=spec.now
+        )
+        for d, row, pid in zip(docs, X_user, pid_list):
+            X_rows.append(row)
+            actions.append("click" if d.get("was_clicked", False) else "")
+            row_user_ids.append(user_id)
+            row_paper_ids.append(pid)
+
+    current_user: Optional[int] = None
+    current_docs: List[dict] = []
+    for doc in _iter_paper_recommendation_docs_for_users(loader, spec.user_ids):
+        user_id = doc.get("user_id")
+        paper_id = doc.get("paper_id")
+        if not user_id or not paper_id:
+            continue
+
+        user_id = int(user_id)
+        if user_id != current_user:
+            if current_user is not None:
+                flush(current_user, current_docs)
+            current_user, current_docs = user_id, []
+        current_docs.append(doc)
+
+    if current_user is not None:
+        flush(current_user, current_docs)
+
+    if X_rows:
+        X = np.stack(X_rows).astype(np.float32)
+    else:
+        X = np.zeros((0, NUM_FEATURES), dtype=np.float32)
+    # was_clicked 만 있음 → click 보상. shard 전체를 한 번에 계산
+    y = compute_rewards(actions, config=spec.reward_config).astype(np.float32)
+
+    _write_shard(spec, X, y, row_user_ids, row_paper_ids)
+    return spec.shard_index
+
+
+def extract_features_sharded(
+    output_dir: Path,
+    num_workers: Optional[int] = None,
+    num_shards: int = 16,
+    now: Optional[datetime] = None,
+    max_retries: int = 2,
+    loader_factory: LoaderFactory = MongoDataLoader,
+    user_ids: Optional[List[int]] = None,
+    reward_config: Optional[RewardConfig] = None,
+) -> Path:
+    """
+    paper_recommendations 를 user 단위 shard 로 나눠 병렬로 feature 를 추출한다.
+
+    - num_shards 는 결과 파일 구성을 결정하므로 worker 수와 분리되어 있다.
+      (worker 수를 바꿔도 결과는 동일)
+    - now 를 고정하지 않으면 오늘 날짜 00:00(UTC) 을 기준 시각으로 사용한다.
+    - 이미 완료된 shard(meta.json fingerprint 일치)는 건너뛰므로, 실패 후 재실행하면
+      남은 shard 만 다시 계산한다.
+    - worker 가 예외로 죽거나 프로세스 풀이 깨지면 새 풀을 만들어 max_retries 번까지 재시도.
+    - reward_config 는 shard fingerprint 에 들어가므로 바꾸면 모든 shard 를 다시 계산한다.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if now is None:
+        today = datetime.utcnow()
+        now = datetime(today.year, today.month, today.day)
+
+    if user_ids is None:
+        user_ids = _list_recommendation_user_ids(loader_factory())
+    reward_config = reward_config or get_reward_config()
+
+    specs = [
+        ShardSpec(
+            shard_index=i, user_ids=shard_users, output_dir=output_dir, now=now, reward_config=reward_config
+        )
+        for i, shard_users in enumerate(partition_users(user_ids, num_shards))
+    ]
+    pending = [s for s in specs if not _is_shard_complete(s)]
+    print(f"[sharded] shard {len(specs)}개 중 {len(pending)}개 계산 필요 (users={len(user_ids)})")
+
+    # fork 된 MongoClient / SSH 터널 스레드를 공유하지 않도록 spawn 사용
+    ctx = multiprocessing.get_context("spawn")
+    attempt = 0
+    while pending:
+        if attempt > max_retries:
+            failed = ", ".join(str(s.shard_index) for s in pending)
+            raise RuntimeError(f"shard 추출 실패 (재시도 초과): {failed}")
+
+        failed_specs: List[ShardSpec] = []
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(loader_factory,),
+        ) as pool:
+            futures = {pool.submit(_extract_shard, s): s for s in pending}
+            for fut in as_completed(futures):
+                spec = futures[fut]
+                try:
+                    fut.result()
+                except BrokenProcessPool as e:
+                    print(f"[sharded] shard {spec.shard_index}: worker 프로세스 종료됨 ({e})")
+                    failed_specs.append(spec)
+                except Exception as e:
+                    print(f"[sharded] shard {spec.shard_index} 실패: {e!r}")
+                    failed_specs.append(spec)
+
+        # 풀이 깨져도 이미 디스크에 기록된 shard 는 다시 계산하지 않는다.
+        pending = sorted(
+            (s for s in failed_specs if not _is_shard_complete(s)),
+            key=lambda s: s.shard_index,
+        )
+        attempt += 1
+
+    manifest = {
+        "num_shards": num_shards,
+        "now": now.isoformat(),
+        "reward_config": reward_config.to_dict(),
+        "shards": [s.shard_dir.name for s in specs],
+    }
+    (output_dir / "manifest.json").write_text(json.dumps(manifest, sort_keys=True, indent=2))
+    return output_dir
+
+
+def merge_shards(shard_root: Path, out_dir: Optional[Path] = None) -> BanditDataset:
+    """
+    manifest.json 에 적힌 shard 순서대로 X / y / id 목록을 이어 붙인다.
+    out_dir 를 주면 합친 결과를 학습 데이터 snapshot 포맷으로 저장.
+    """
+    shard_root = Path(shard_root)
+    manifest = json.loads((shard_root / "manifest.json").read_text())
+
+    X_parts: List[np.ndarray] = []
+    y_parts: List[np.ndarray] = []
+    user_ids: List[int] = []
+    paper_ids: List[str] = []
+    for name in manifest["shards"]:
+        shard_dir = shard_root / name
+        meta: Dict = json.loads((shard_dir / "meta.json").read_text())
+        X_parts.append(np.load(shard_dir / "X.npy"))
+        y_parts.append(np.load(shard_dir / "y.npy"))
+        user_ids.extend(meta["user_ids"])
+        paper_ids.extend(meta["paper_ids"])
+
+    if X_parts:
+        X = np.concatenate(X_parts, axis=0)
+        y = np.concatenate(y_parts, axis=0)
+    else:
+        X = np.zeros((0, NUM_FEATURES), dtype=np.float32)
+        y = np.zeros((0,), dtype=np.float32)
+
+    reward_config = manifest.get("reward_config")
+    reward_config = RewardConfig.from_dict(reward_config) if reward_config else None
+    dataset = BanditDataset(
+        X=X,
+        y=y,
+        user_ids=user_ids,
+        paper_ids=paper_ids,
+        reward_config=reward_config,
+        reward_versions=[reward_config.tag] if reward_config else [],
+    )
+    if out_dir is not None:
+        write_snapshot(dataset, Path(out_dir), source="sharded", extra={"now": manifest["now"]})
+
+    return dataset
+
+
+if __name__ == "__main__":
+    # 예시 실행:
+    root = extract_features_sharded(Path("data/features/shards"))
+    merge_shards(root, Path("data/features/merged"))
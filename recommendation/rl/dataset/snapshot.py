@@ -0,0 +1,217 @@
+"""
+snapshot.py
+
+offline 학습 데이터를 디스크에 한 번 써두고 여러 학습 run 에서 재사용하기 위한 포맷.
+
+디렉토리 구성 (format_version = 1):
+    schema.json     : 포맷 버전, feature 이름/순서, dtype, row 수, reward config / reward_versions, 생성 정보
+    X.npy           : (N, D) float32 feature matrix
+    y.npy           : (N,) float32 reward
+    user_ids.npy    : (N,) int64
+    paper_ids.npy   : (N,) unicode
+
+읽을 때는 np.load(mmap_mode="r") 로 memory-map 하므로
+RAM 보다 큰 데이터셋도 minibatch 단위로 읽으면서 학습할 수 있다.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ..feature_schema import DEFAULT_FEATURE_SCHEMA, FeatureSchema
+from ..reward import RewardConfig
+from ..state_builder import FEATURE_NAMES
+from .builder import BanditDataset, build_bandit_dataset_from_logs, build_bandit_dataset_from_mongo
+
+SNAPSHOT_FORMAT_VERSION = 1
+SCHEMA_FILE = "schema.json"
+
+
+def write_snapshot(
+    dataset: BanditDataset,
+    out_dir: Path,
+    feature_names: Sequence[str] = FEATURE_NAMES,
+    source: Optional[str] = None,
+    extra: Optional[Dict[str, Any]] = None,
+    feature_schema: Optional[FeatureSchema] = None,
+    reward_config: Optional[RewardConfig] = None,
+) -> Path:
+    """
+    BanditDataset 을 snapshot 디렉토리로 저장.
+    임시 디렉토리에 다 쓴 뒤 rename 하므로 읽는 쪽은 항상 완성된 snapshot 만 본다.
+    reward_config 를 안 주면 dataset.reward_config 를 기록 (없으면 null = 로그에 저장된 reward 그대로,
+    이때 y 에 섞인 로그의 reward_version 들은 reward_versions 에 기록).
+    """
+    out_dir = Path(out_dir)
+    X = np.ascontiguousarray(dataset.X, dtype=np.float32)
+    y = np.ascontiguousarray(dataset.y, dtype=np.float32)
+
+    if X.ndim != 2 or X.shape[0] != y.shape[0]:
+        raise ValueError(f"X / y shape 불일치: X={X.shape}, y={y.shape}")
+    if X.shape[0] and X.shape[1] != len(feature_names):
+        raise ValueError(
+            f"feature 개수 불일치: X 는 {X.shape[1]}열, feature_names 는 {len(feature_names)}개"
+        )
+
+    tmp_dir = out_dir.parent / f".{out_dir.name}.tmp{os.getpid()}"
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    np.save(tmp_dir / "X.npy", X)
+    np.save(tmp_dir / "y.npy", y)
+    np.save(tmp_dir / "user_ids.npy", np.asarray(dataset.user_ids, dtype=np.int64))
+    np.save(tmp_dir / "paper_ids.npy", np.asarray(dataset.paper_ids, dtype=str))
+
+    reward_config = reward_config or dataset.reward_config
+    reward_versions = list(dataset.reward_versions) or ([reward_config.tag] if reward_config else [])
+
+    if feature_schema is None:
+        feature_schema = (
+            DEFAULT_FEATURE_SCHEMA
+            if tuple(feature_names) == DEFAULT_FEATURE_SCHEMA.names
+            else FeatureSchema(version=0, names=tuple(feature_names))
+        )
+
+    schema = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "feature_names": list(feature_names),
+        "feature_schema": feature_schema.to_dict(),
+        "reward_config": reward_config.to_dict() if reward_config else None,
+        "reward_versions": reward_versions,
+        "num_rows": int(X.shape[0]),
+        "num_features": len(feature_names),
+        "dtype": "float32",
+        "source": source,
+        "created_at": datetime.utcnow().isoformat(),
+        "extra": extra or {},
+    }
+    (tmp_dir / SCHEMA_FILE).write_text(json.dumps(schema, ensure_ascii=False, indent=2))
+
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    os.replace(tmp_dir, out_dir)
+    return out_dir
+
+
+def is_snapshot(path: Path) -> bool:
+    return (Path(path) / SCHEMA_FILE).exists()
+
+
+class SnapshotDataset:
+    """
+    memory-map 기반 Dataset.
+
+    - __getitem__ 에 int 하나 또는 index 배열을 넘길 수 있다.
+      (torch DataLoader 에 BatchSampler 를 sampler 로 넘기면 minibatch 단위로 한 번에 읽음)
+    - feature_names 를 넘기면 학습 코드가 기대하는 순서와 다를 때 바로 에러를 낸다.
+    """
+
+    def __init__(self, path: Path, feature_names: Optional[Sequence[str]] = None):
+        self.path = Path(path)
+        self.schema: Dict[str, Any] = json.loads((self.path / SCHEMA_FILE).read_text())
+
+        version = self.schema.get("format_version")
+        if version != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(
+                f"지원하지 않는 snapshot 포맷 버전입니다: {version} (기대값 {SNAPSHOT_FORMAT_VERSION})"
+            )
+        if feature_names is not None and list(feature_names) != self.feature_names:
+            raise ValueError(
+                f"feature 순서 불일치: snapshot={self.feature_names}, 기대값={list(feature_names)}"
+            )
+
+        self.X = np.load(self.path / "X.npy", mmap_mode="r")
+        self.y = np.load(self.path / "y.npy", mmap_mode="r")
+
+    @property
+    def feature_names(self) -> list:
+        return list(self.schema["feature_names"])
+
+    @property
+    def feature_schema(self) -> FeatureSchema:
+        d = self.schema.get("feature_schema")
+        if d is None:
+            # feature_schema 가 없던 시절 snapshot
+            return FeatureSchema(version=0, names=tuple(self.feature_names))
+        return FeatureSchema.from_dict(d)
+
+    @property
+    def reward_config(self) -> Optional[RewardConfig]:
+        d = self.schema.get("reward_config")
+        return RewardConfig.from_dict(d) if d else None
+
+    @property
+    def reward_versions(self) -> List[str]:
+        versions = self.schema.get("reward_versions")
+        if versions is None:
+            # reward_versions 가 없던 시절 snapshot
+            reward_config = self.reward_config
+            return [reward_config.tag] if reward_config else []
+        return list(versions)
+
+    @property
+    def num_features(self) -> int:
+        return int(self.schema["num_features"])
+
+    def __len__(self) -> int:
+        return int(self.X.shape[0])
+
+    def __getitem__(self, idx: Union[int, Sequence[int], np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        if isinstance(idx, (int, np.integer)):
+            return np.asarray(self.X[idx]), np.asarray(self.y[idx])
+        # 정렬된 index 로 읽어야 memmap 에서 순차 접근에 가깝게 된다.
+        idx = np.sort(np.asarray(idx, dtype=np.int64))
+        return self.X[idx], self.y[idx]
+
+    def iter_minibatches(
+        self,
+        batch_size: int,
+        shuffle: bool = True,
+        seed: Optional[int] = None,
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        torch 없이 numpy minibatch 로 순회할 때 사용.
+        """
+        n = len(self)
+        order = np.random.default_rng(seed).permutation(n) if shuffle else np.arange(n)
+        for start in range(0, n, batch_size):
+            yield self[order[start:start + batch_size]]
+
+
+def load_snapshot(path: Path, feature_names: Optional[Sequence[str]] = None) -> SnapshotDataset:
+    return SnapshotDataset(path, feature_names=feature_names)
+
+
+def build_snapshot(
+    out_dir: Path,
+    source: str = "logs",
+    limit: Optional[int] = None,
+    reward_config: Optional[RewardConfig] = None,
+) -> Path:
+    """
+    dataset builder 로 Mongo 에서 데이터를 한 번 만들고 snapshot 으로 저장.
+    이후 학습은 snapshot 만 읽으면 되므로 Mongo 에 다시 접근하지 않는다.
+    reward_config 를 주면 (source="logs") 상호작용 로그를 그 config 로 relabel.
+    """
+    if source == "logs":
+        dataset = build_bandit_dataset_from_logs(limit=limit, reward_config=reward_config)
+    elif source == "paper_recommendations":
+        dataset = build_bandit_dataset_from_mongo(limit=limit, reward_config=reward_config)
+    else:
+        raise ValueError(f"알 수 없는 dataset source: {source}")
+
+    if dataset.X.size == 0:
+        dataset.X = np.zeros((0, len(FEATURE_NAMES)), dtype=np.float32)
+    return write_snapshot(dataset, out_dir, source=source, extra={"limit": limit})
+
+
+if __name__ == "__main__":
+    # 예시 실행:
+    build_snapshot(Path("data/snapshots/bandit_logs_latest"), source="logs")
@@ -0,0 +1,4 @@
+"""
+Offline 평가 관련 모듈
+- ope: 노출/상호작용 로그를 replay 해서 새 정책의 기대 reward 를 추정 (IPS / SNIPS / DR)
+"""
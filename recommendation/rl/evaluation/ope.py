@@ -0,0 +1,281 @@
+"""
+ope.py
+
+Off-policy evaluation: recommendation_events / recommendation_interactions 로그를 replay 해서
+새 BanditPolicy checkpoint 를 배포하지 않고도 기대 reward 를 추정한다.
+
+Propensity 모델:
+- 로그의 각 노출(event, item)을 "event 후보 중 하나가 뽑힌 것" 으로 본다.
+- 로깅 정책:  p0(i) ∝ exam(pos_i)  · exp(score_i / temperature)
+    - pos_i: 로그에 남은 노출 순위, score_i: 로그에 남은 점수
+    - exam(k) = 1 / log2(k + 2) ** position_eta  (position bias, eta=0 이면 점수만 사용)
+- 평가 정책:  p1(i) ∝ exam(rank_i) · exp(q_i / temperature)
+    - q_i: 평가할 정책의 예상 reward, rank_i: 그 점수로 event 안에서 다시 정렬한 순위
+- w_i = min(p1(i) / p0(i), max_weight)
+
+추정량 (N = 노출 수, m_e = event e 의 노출 수):
+- IPS   = Σ w r / N
+- SNIPS = Σ w r / Σ w
+- DR    = Σ_e [ m_e · Σ_{j∈e} s_j r̂_j + Σ_{i∈e} w_i (r_i − r̂_i) ] / N,   s_j = w_j / Σ_{k∈e} w_k
+    - r̂ = 로그 (X, y) 에 ridge 회귀로 맞춘 reward 모델 (평가할 정책의 점수 q 가 아님)
+    - direct-method 항도 보정항과 같은 "로그에 남은 노출" 분포 위에서 정의
+      (노출은 slate 전체가 로그에 남으므로 p0 에서 뽑힌 표본이 아님)
+      → 평가 정책 = 로깅 정책 (w ≡ 1) 이면 DR = 로그 평균 reward
+    - r̂ 이 선형이라 Σ X, Σ XᵀX 같은 누적합만으로 한 번의 스트리밍 pass 에서 계산.
+      (r̂ 은 같은 로그로 맞춘 in-sample 모델이고, bootstrap 복제본마다 다시 맞추지는 않는다)
+
+신뢰구간은 event 단위 Poisson bootstrap 으로 계산한다.
+(chunk 마다 가중치를 뽑아 누적할 수 있어서 스트리밍 입력에서도 그대로 동작)
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+from ...data.data_loader import MongoDataLoader
+from ..bandit_policy import BanditPolicy, PolicyConfig, DEFAULT_MODEL_PATH
+from ..dataset.builder import LoggedExposureChunk, iter_logged_exposures
+from ..state_builder import FEATURE_NAMES
+
+ScoreFn = Callable[[np.ndarray], np.ndarray]
+
+ESTIMATORS = ("ips", "snips", "dr")
+
+
+@dataclass
+class OPEConfig:
+    temperature: float = 1.0
+    position_eta: float = 1.0
+    max_weight: float = 20.0
+    n_bootstrap: int = 200
+    confidence: float = 0.95
+    seed: int = 0
+    ridge: float = 1.0  # DR reward 모델 (ridge 회귀) 의 L2 계수, intercept 는 제외
+
+
+@dataclass
+class OPEEstimate:
+    value: float
+    ci_low: float
+    ci_high: float
+
+
+@dataclass
+class OPEReport:
+    n_impressions: int
+    n_events: int
+    logged_reward: float
+    effective_sample_size: float
+    estimates: Dict[str, OPEEstimate] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        return {
+            "n_impressions": self.n_impressions,
+            "n_events": self.n_events,
+            "logged_reward": self.logged_reward,
+            "effective_sample_size": self.effective_sample_size,
+            "estimates": {
+                name: {"value": e.value, "ci_low": e.ci_low, "ci_high": e.ci_high}
+                for name, e in self.estimates.items()
+            },
+        }
+
+
+def _examination(rank: np.ndarray, eta: float) -> np.ndarray:
+    return 1.0 / np.log2(rank + 2.0) ** eta
+
+
+def _group_softmax(logits: np.ndarray, starts: np.ndarray, group: np.ndarray) -> np.ndarray:
+    z = logits - np.maximum.reduceat(logits, starts)[group]
+    e = np.exp(z)
+    return e / np.add.reduceat(e, starts)[group]
+
+
+def _rank_within_group(scores: np.ndarray, starts: np.ndarray, group: np.ndarray) -> np.ndarray:
+    # group 순서는 유지하면서 score 내림차순 → group 시작 위치를 빼면 group 내 순위
+    order = np.lexsort((-scores, group))
+    rank = np.empty_like(group)
+    rank[order] = np.arange(group.shape[0]) - starts[group[order]]
+    return rank
+
+
+class OPEAccumulator:
+    """
+    chunk 단위로 update() 를 호출하면 IPS / SNIPS 합계, DR reward 모델의 누적합과
+    bootstrap 복제본 합계를 누적한다. chunk 는 event 중간에서 잘리면 안 된다.
+    """
+
+    def __init__(self, score_fn: ScoreFn, config: Optional[OPEConfig] = None):
+        self.score_fn = score_fn
+        self.config = config or OPEConfig()
+        self._rng = np.random.default_rng(self.config.seed)
+
+        # [wr, w, r, n, w^2]
+        self._totals = np.zeros(5, dtype=np.float64)
+        # bootstrap: (B, [wr, w, n])
+        self._boot = np.zeros((self.config.n_bootstrap, 3), dtype=np.float64)
+        # reward 모델 (X + intercept 열) 의 XᵀX, Xᵀy 와 DR 의 r̂ 계수 벡터 (전체 / bootstrap)
+        self._xtx: Optional[np.ndarray] = None
+        self._xty: Optional[np.ndarray] = None
+        self._dr_x: Optional[np.ndarray] = None
+        self._boot_dr_x: Optional[np.ndarray] = None
+        self._n_events = 0
+
+    def update(self, chunk: LoggedExposureChunk) -> None:
+        n = len(chunk)
+        if n == 0:
+            return
+        cfg = self.config
+
+        events = np.asarray(chunk.event_ids)
+        is_start = np.empty(n, dtype=bool)
+        is_start[0] = True
+        is_start[1:] = events[1:] != events[:-1]
+        starts = np.flatnonzero(is_start)
+        group = np.cumsum(is_start) - 1
+
+        rewards = np.asarray(chunk.y, dtype=np.float64)
+        X = np.asarray(chunk.X, dtype=np.float64)
+        logged_scores = np.asarray(chunk.scores, dtype=np.float64)
+        positions = np.asarray(chunk.positions, dtype=np.float64)
+        q = np.asarray(self.score_fn(X.astype(np.float32)), dtype=np.float64)
+
+        # 로깅 / 평가 정책 propensity
+        p0 = _group_softmax(
+            logged_scores / cfg.temperature + np.log(_examination(positions, cfg.position_eta)),
+            starts, group,
+        )
+        target_rank = _rank_within_group(q, starts, group).astype(np.float64)
+        p1 = _group_softmax(
+            q / cfg.temperature + np.log(_examination(target_rank, cfg.position_eta)),
+            starts, group,
+        )
+        w = np.minimum(p1 / p0, cfg.max_weight)
+        wr = w * rewards
+        sizes = np.diff(np.append(starts, n)).astype(np.float64)
+
+        # DR 의 r̂ 항 = (m_e · s_i − w_i) · r̂_i 의 합. r̂_i = x_i · β 이므로 x 쪽 계수만 누적
+        Xa = np.hstack([X, np.ones((n, 1))])
+        s = w / np.add.reduceat(w, starts)[group]
+        per_event_dr_x = np.add.reduceat((sizes[group] * s - w)[:, None] * Xa, starts, axis=0)
+
+        if self._xtx is None:
+            dim = Xa.shape[1]
+            self._xtx = np.zeros((dim, dim))
+            self._xty = np.zeros(dim)
+            self._dr_x = np.zeros(dim)
+            self._boot_dr_x = np.zeros((cfg.n_bootstrap, dim))
+        self._xtx += Xa.T @ Xa
+        self._xty += Xa.T @ rewards
+        self._dr_x += per_event_dr_x.sum(axis=0)
+
+        self._totals += (wr.sum(), w.sum(), rewards.sum(), float(n), (w * w).sum())
+
+        # event 단위 합 → Poisson(1) bootstrap 가중치와 곱해서 누적
+        per_event = np.stack([np.add.reduceat(wr, starts), np.add.reduceat(w, starts), sizes], axis=1)
+        counts = self._rng.poisson(1.0, size=(cfg.n_bootstrap, starts.shape[0]))
+        self._boot += counts @ per_event
+        self._boot_dr_x += counts @ per_event_dr_x
+        self._n_events += int(starts.shape[0])
+
+    def reward_model(self) -> np.ndarray:
+        """
+        지금까지 본 로그 (X, y) 에 맞춘 ridge 회귀 계수 β (마지막 원소가 intercept). r̂ = [X, 1] · β
+        """
+        penalty = np.full(self._xtx.shape[0], self.config.ridge)
+        penalty[-1] = 0.0
+        return np.linalg.solve(self._xtx + np.diag(penalty), self._xty)
+
+    def result(self) -> OPEReport:
+        wr, w, r, n, w2 = self._totals
+        if n == 0:
+            return OPEReport(n_impressions=0, n_events=0, logged_reward=0.0, effective_sample_size=0.0)
+
+        beta = self.reward_model()
+        alpha = (1.0 - self.config.confidence) / 2.0
+        b_wr, b_w, b_n = self._boot.T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            boot = {
+                "ips": b_wr / b_n,
+                "snips": b_wr / b_w,
+                "dr": (b_wr + self._boot_dr_x @ beta) / b_n,
+            }
+        point = {"ips": wr / n, "snips": wr / w if w > 0 else 0.0, "dr": (wr + self._dr_x @ beta) / n}
+
+        estimates = {}
+        for name in ESTIMATORS:
+            samples = boot[name][np.isfinite(boot[name])]
+            if samples.size:
+                lo, hi = np.quantile(samples, [alpha, 1.0 - alpha])
+            else:
+                lo = hi = float("nan")
+            estimates[name] = OPEEstimate(value=float(point[name]), ci_low=float(lo), ci_high=float(hi))
+
+        return OPEReport(
+            n_impressions=int(n),
+            n_events=self._n_events,
+            logged_reward=float(r / n),
+            effective_sample_size=float(w * w / w2) if w2 > 0 else 0.0,
+            estimates=estimates,
+        )
+
+
+def evaluate_policy(
+    chunks: Iterable[LoggedExposureChunk],
+    score_fn: ScoreFn,
+    config: Optional[OPEConfig] = None,
+) -> OPEReport:
+    """
+    임의의 chunk iterator (Mongo 스트림, snapshot 등) 에 대해 OPE 수행.
+    """
+    acc = OPEAccumulator(score_fn, config)
+    for chunk in chunks:
+        acc.update(chunk)
+    return acc.result()
+
+
+def evaluate_checkpoint(
+    model_path: Path = DEFAULT_MODEL_PATH,
+    loader: Optional[MongoDataLoader] = None,
+    config: Optional[OPEConfig] = None,
+    chunk_size: int = 50_000,
+    mode: Optional[str] = None,
+) -> OPEReport:
+    """
+    BanditPolicy checkpoint 하나를 Mongo 로그 전체에 대해 평가.
+    (모델 파일이 없으면 BanditPolicy 가 rule_total_score 로 fallback 하므로
+     현재 rule-based 정렬을 평가한 결과가 된다)
+    """
+    loader = loader or MongoDataLoader()
+    policy = BanditPolicy(PolicyConfig(input_dim=len(FEATURE_NAMES), model_path=Path(model_path)))
+    chunks = iter_logged_exposures(loader, chunk_size=chunk_size, mode=mode)
+    return evaluate_policy(chunks, policy.predict_scores, config)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="BanditPolicy checkpoint off-policy evaluation")
+    parser.add_argument("--model", type=Path, default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--mode", type=str, default=None, help="recommendation_events.mode 필터")
+    parser.add_argument("--temperature", type=float, default=1.0)
+    parser.add_argument("--position-eta", type=float, default=1.0)
+    parser.add_argument("--max-weight", type=float, default=20.0)
+    parser.add_argument("--bootstrap", type=int, default=200)
+    args = parser.parse_args()
+
+    report = evaluate_checkpoint(
+        args.model,
+        mode=args.mode,
+        config=OPEConfig(
+            temperature=args.temperature,
+            position_eta=args.position_eta,
+            max_weight=args.max_weight,
+            n_bootstrap=args.bootstrap,
+        ),
+    )
+    print(json.dumps(report.to_dict(), indent=2, ensure_ascii=False))
@@ -0,0 +1,119 @@
+"""
+feature_schema.py
+
+bandit 모델 입력 feature 의 이름 / 순서 / dtype / 정규화를 하나로 정의하는 schema.
+
+- checkpoint, 학습 데이터 snapshot 에 schema 를 같이 저장하고
+- 모델을 로드할 때 serving 쪽 schema 와 비교해서 다르면 FeatureSchemaMismatch 를 낸다.
+  (feature 순서가 다른 checkpoint 가 조용히 잘못된 점수를 내는 것을 막기 위함)
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class FeatureSchemaMismatch(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class FeatureSchema:
+    version: int
+    names: Tuple[str, ...]
+    dtype: str = "float32"
+    # name → (mean, std). 비어 있으면 정규화하지 않음
+    normalization: Dict[str, Tuple[float, float]] = field(default_factory=dict)
+
+    @property
+    def dim(self) -> int:
+        return len(self.names)
+
+    def index(self, name: str) -> int:
+        return self.names.index(name)
+
+    # ------------------------------------------------------
+    # 변환
+    # ------------------------------------------------------
+    def vector_from_dict(self, feats: Mapping[str, Any]) -> list:
+        return [float(feats.get(name, 0.0) or 0.0) for name in self.names]
+
+    def normalize(self, X: np.ndarray) -> np.ndarray:
+        """
+        (N, D) feature matrix 에 (x - mean) / std 적용. 정규화 정보가 없으면 dtype 변환만.
+        """
+        X = np.asarray(X, dtype=self.dtype)
+        if not self.normalization:
+            return X
+        mean, std = self.normalization_arrays()
+        return (X - mean) / std
+
+    def normalization_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        mean = np.array([self.normalization.get(n, (0.0, 1.0))[0] for n in self.names], dtype=self.dtype)
+        std = np.array([self.normalization.get(n, (0.0, 1.0))[1] for n in self.names], dtype=self.dtype)
+        return mean, np.where(std > 0, std, 1.0).astype(self.dtype)
+
+    def with_normalization_from(self, X: np.ndarray) -> "FeatureSchema":
+        """
+        학습 데이터에서 column 별 mean / std 를 계산해 정규화 정보를 채운 schema 를 반환.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        mean = X.mean(axis=0)
+        std = X.std(axis=0)
+        return replace(
+            self,
+            normalization={n: (float(m), float(s)) for n, m, s in zip(self.names, mean, std)},
+        )
+
+    # ------------------------------------------------------
+    # 직렬화 / 호환성 검사
+    # ------------------------------------------------------
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "names": list(self.names),
+            "dtype": self.dtype,
+            "normalization": {k: list(v) for k, v in self.normalization.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d: Mapping[str, Any]) -> "FeatureSchema":
+        return cls(
+            version=int(d["version"]),
+            names=tuple(d["names"]),
+            dtype=d.get("dtype", "float32"),
+            normalization={k: (float(v[0]), float(v[1])) for k, v in (d.get("normalization") or {}).items()},
+        )
+
+    def require_compatible(self, other: "FeatureSchema") -> None:
+        """
+        feature 이름 / 순서가 같아야 같은 모델 입력으로 쓸 수 있다.
+        (정규화 값은 checkpoint 마다 다를 수 있으므로 비교하지 않음)
+        """
+        if self.names != other.names:
+            raise FeatureSchemaMismatch(
+                f"feature schema 불일치: checkpoint=v{other.version}{list(other.names)}, "
+                f"serving=v{self.version}{list(self.names)}"
+            )
+
+
+# state_builder.build_candidate_features 가 만드는 순서
+DEFAULT_FEATURE_SCHEMA = FeatureSchema(
+    version=1,
+    names=("keyword", "category", "popularity", "recency", "rule_total_score"),
+)
+
+# 예전 models/rl/train_rl.py 가 사용하던 순서 (schema 없이 저장된 MLP checkpoint 판별용)
+LEGACY_TRAIN_RL_SCHEMA = FeatureSchema(
+    version=0,
+    names=("recency", "popularity", "category", "keyword", "rule_score"),
+)
+
+
+def schema_from_names(names: Sequence[str], version: Optional[int] = None) -> FeatureSchema:
+    names = tuple(names)
+    if names == DEFAULT_FEATURE_SCHEMA.names:
+        return DEFAULT_FEATURE_SCHEMA
+    return FeatureSchema(version=version if version is not None else 0, names=names)
@@ -0,0 +1,116 @@
+"""
+hierarchical_bandit.py
+
+global prior + user(또는 segment) 별 delta 로 구성된 계층형 선형 bandit.
+
+- θ_user = θ_global + δ_user
+    - θ_global: LinearOnlineBandit (모든 user 의 reward 로 갱신, exploration bonus 담당)
+    - δ_user:   UserParamStore 의 row (해당 user 의 reward 잔차로 SGD 갱신, 0 쪽으로 shrinkage)
+- 점수 계산은 θ_user 를 먼저 만든 뒤 X @ θ_user 한 번 (후보 100개든 user 수십만이든 동일)
+
+환경변수:
+- RL_HIERARCHICAL=1           : 활성화 (RL_ONLINE_BANDIT 도 설정되어 있어야 함)
+- RL_HIER_SEGMENTS=N          : 0 이면 user 별, N>0 이면 user_id % N segment 별 delta
+- RL_HIER_STORE_DIR           : delta 저장 디렉토리
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .online_bandit import LinearOnlineBandit, get_online_bandit
+from .param_store import UserParamStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = Path("models/rl/user_params")
+
+
+@dataclass
+class HierarchicalConfig:
+    lr: float = 0.05
+    shrinkage: float = 0.01  # δ 를 global prior 쪽으로 당기는 정도
+    num_segments: int = 0  # 0 이면 user 별
+    store_dir: Path = DEFAULT_STORE_DIR
+    max_resident: int = 50_000
+    flush_every: int = 1000
+
+
+class HierarchicalBandit:
+    def __init__(
+        self,
+        global_bandit: LinearOnlineBandit,
+        config: Optional[HierarchicalConfig] = None,
+        store: Optional[UserParamStore] = None,
+    ):
+        self.global_bandit = global_bandit
+        self.config = config or HierarchicalConfig()
+        self.store = store or UserParamStore(
+            dim=global_bandit.config.dim,
+            root_dir=self.config.store_dir,
+            max_resident=self.config.max_resident,
+        )
+        self._n_updates = 0
+        self._lock = threading.Lock()
+
+    def key_of(self, user_id: int) -> int:
+        if self.config.num_segments > 0:
+            return int(user_id) % self.config.num_segments
+        return int(user_id)
+
+    def score(self, user_id: int, X: np.ndarray) -> np.ndarray:
+        delta = self.store.get(self.key_of(user_id))
+        return self.global_bandit.score(X, theta_offset=delta)
+
+    def update(self, user_id: int, x: Sequence[float], reward: float) -> None:
+        x = np.asarray(x, dtype=np.float64).reshape(-1)
+        key = self.key_of(user_id)
+
+        # 1) global prior 갱신
+        self.global_bandit.update(x, reward)
+
+        # 2) user delta: 잔차에 대한 SGD + shrinkage
+        delta = self.store.get(key).astype(np.float64)
+        residual = float(reward) - float(x @ (self.global_bandit.theta + delta))
+        step = self.config.lr * (residual * x - self.config.shrinkage * delta)
+        self.store.add(key, step)
+
+        with self._lock:
+            self._n_updates += 1
+            should_flush = self._n_updates % self.config.flush_every == 0
+        if should_flush:
+            self.store.flush()
+
+    def save(self) -> None:
+        self.global_bandit.save()
+        self.store.flush()
+
+
+_hier_bandit: Optional[HierarchicalBandit] = None
+_hier_lock = threading.Lock()
+
+
+def get_hierarchical_bandit() -> Optional[HierarchicalBandit]:
+    global _hier_bandit
+    if os.getenv("RL_HIERARCHICAL", "").strip() not in ("1", "true", "yes"):
+        return None
+    global_bandit = get_online_bandit()
+    if global_bandit is None:
+        return None
+
+    if _hier_bandit is None:
+        with _hier_lock:
+            if _hier_bandit is None:
+                config = HierarchicalConfig(
+                    num_segments=int(os.getenv("RL_HIER_SEGMENTS", "0")),
+                    store_dir=Path(os.getenv("RL_HIER_STORE_DIR", str(DEFAULT_STORE_DIR))),
+                )
+                _hier_bandit = HierarchicalBandit(global_bandit, config)
+                logger.info(f"[Hierarchical Bandit] 저장소 로드: keys={len(_hier_bandit.store)}")
+    return _hier_bandit
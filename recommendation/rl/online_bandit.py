@@ -0,0 +1,291 @@
+"""
+online_bandit.py
+
+상호작용 로그가 들어올 때마다 바로 갱신되는 online contextual bandit.
+
+- LinUCB:    score = xᵀθ + alpha · sqrt(xᵀ A⁻¹ x)
+- Thompson:  θ̃ ~ N(θ, alpha² A⁻¹) 한 번 샘플링 후 score = xᵀθ̃
+- A⁻¹ 는 Sherman–Morrison rank-1 업데이트로 갱신 → update 1회 O(d²)
+- checkpoint_every 번 업데이트마다 상태를 .npz 로 저장하고, 재시작 시 이어서 사용
+  (저장은 백그라운드 스레드에서, update 를 부른 요청 경로는 기다리지 않음)
+
+환경변수 RL_ONLINE_BANDIT=linucb | thompson 으로 켠다. (미설정이면 비활성화)
+
+상호작용이 들어온 item 은 그 reward 로 바로 update 하고,
+노출됐지만 상호작용이 없는 item 은 UnclickedExposureFeeder 가 노출 후 RL_ONLINE_ZERO_DELAY_SEC 가 지나면
+reward 0 으로 update 한다. (클릭된 item 만 학습하면 거의 양수 reward 만 보게 되어 θ 가 위로 치우침)
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .state_builder import FEATURE_NAMES, feature_row_from_logged
+
+if TYPE_CHECKING:
+    from ..data.data_loader import MongoDataLoader
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ONLINE_STATE_PATH = Path("models/rl/online_bandit_state.npz")
+# 노출 후 이 시간 (초) 동안 상호작용이 없으면 reward 0 으로 update. 0 이하이면 비활성화 (클릭된 item 만 학습)
+ONLINE_ZERO_DELAY_SEC = float(os.getenv("RL_ONLINE_ZERO_DELAY_SEC", "1800"))
+ONLINE_ZERO_INTERVAL_SEC = float(os.getenv("RL_ONLINE_ZERO_INTERVAL_SEC", "60"))
+
+# (user_id, x, reward) → None  (LinearOnlineBandit 이면 user_id 무시, hierarchical 이면 user delta 도 갱신)
+UpdateFn = Callable[[int, np.ndarray, float], None]
+
+
+def _covariance_factor(cov: np.ndarray) -> np.ndarray:
+    """
+    L Lᵀ = cov 인 L. Sherman–Morrison 을 오래 누적하면 A⁻¹ 이 수치적으로 비대칭 / 양정치가 아니게 될 수 있어서
+    대칭화 → Cholesky → (실패 시) 작은 jitter 추가 → (그래도 실패 시) eigh 로 음수 고유값을 0 으로 잘라 사용.
+    """
+    cov = (cov + cov.T) / 2.0
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        pass
+    d = cov.shape[0]
+    jitter = 1e-10 * max(float(np.trace(cov)) / d, 1e-12)
+    try:
+        return np.linalg.cholesky(cov + jitter * np.eye(d))
+    except np.linalg.LinAlgError:
+        logger.debug("[Online Bandit] A⁻¹ 양정치성 깨짐 → eigh fallback")
+        eigvals, eigvecs = np.linalg.eigh(cov)
+        return eigvecs * np.sqrt(np.clip(eigvals, 0.0, None))
+
+
+@dataclass
+class OnlineBanditConfig:
+    dim: int = len(FEATURE_NAMES)
+    algorithm: str = "linucb"  # "linucb" | "thompson"
+    alpha: float = 0.5  # exploration 강도
+    ridge: float = 1.0  # A = ridge · I 로 시작
+    state_path: Path = DEFAULT_ONLINE_STATE_PATH
+    checkpoint_every: int = 100
+
+
+class LinearOnlineBandit:
+    """
+    선형 contextual bandit (LinUCB / linear Thompson sampling).
+
+    상태 (A⁻¹, b, θ) 는 update 때마다 새 배열로 만들어 참조만 교체하므로
+    score() 쪽은 lock 없이 항상 일관된 상태를 읽는다.
+    """
+
+    def __init__(self, config: Optional[OnlineBanditConfig] = None):
+        self.config = config or OnlineBanditConfig()
+        d = self.config.dim
+        A_inv = np.eye(d, dtype=np.float64) / self.config.ridge
+        b = np.zeros(d, dtype=np.float64)
+        self._state: Tuple[np.ndarray, np.ndarray, np.ndarray] = (A_inv, b, np.zeros(d))
+        self.n_updates = 0
+        self._lock = threading.Lock()
+        self._rng = np.random.default_rng()
+        self._save_lock = threading.Lock()
+        self._save_requested = threading.Event()
+        self._saver: Optional[threading.Thread] = None
+
+    @property
+    def theta(self) -> np.ndarray:
+        return self._state[2]
+
+    def update(self, x: Sequence[float], reward: float) -> None:
+        x = np.asarray(x, dtype=np.float64).reshape(-1)
+        if x.shape[0] != self.config.dim:
+            raise ValueError(f"feature 차원 불일치: {x.shape[0]} != {self.config.dim}")
+
+        with self._lock:
+            A_inv, b, _ = self._state
+            # Sherman–Morrison: (A + xxᵀ)⁻¹ = A⁻¹ − (A⁻¹x)(A⁻¹x)ᵀ / (1 + xᵀA⁻¹x)
+            Ax = A_inv @ x
+            A_inv = A_inv - np.outer(Ax, Ax) / (1.0 + x @ Ax)
+            b = b + float(reward) * x
+            self._state = (A_inv, b, A_inv @ b)
+            self.n_updates += 1
+            should_save = self.n_updates % self.config.checkpoint_every == 0
+
+        if should_save:
+            self._request_save()
+
+    def score(self, X: np.ndarray, theta_offset: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        후보 feature matrix X(N, D) → exploration bonus 가 포함된 점수(N,)
+
+        theta_offset: user 별 보정값 (hierarchical bandit). θ 에 더한 뒤 X 와 한 번만 곱한다.
+        """
+        if X.size == 0:
+            return np.zeros((0,), dtype=float)
+        X = np.asarray(X, dtype=np.float64)
+        A_inv, _, theta = self._state
+        if theta_offset is not None:
+            theta = theta + theta_offset
+
+        if self.config.algorithm == "thompson":
+            L = _covariance_factor(A_inv)
+            theta = theta + self.config.alpha * (L @ self._rng.standard_normal(theta.shape[0]))
+            return X @ theta
+
+        bonus = np.sqrt(np.maximum(np.einsum("ij,jk,ik->i", X, A_inv, X), 0.0))
+        return X @ theta + self.config.alpha * bonus
+
+    # ------------------------------------------------------
+    # checkpoint
+    # ------------------------------------------------------
+    def save(self, path: Optional[Path] = None) -> Path:
+        path = Path(path or self.config.state_path)
+        with self._save_lock:  # 백그라운드 저장과 종료 시 저장이 같은 tmp 파일을 쓰지 않도록
+            path.parent.mkdir(parents=True, exist_ok=True)
+            A_inv, b, theta = self._state
+            tmp = path.with_name(path.name + ".tmp.npz")
+            np.savez(tmp, A_inv=A_inv, b=b, theta=theta, n_updates=np.int64(self.n_updates))
+            os.replace(tmp, path)
+        return path
+
+    def _request_save(self) -> None:
+        # 저장 요청만 남기고 바로 반환 (여러 번 요청돼도 스레드는 최신 상태를 한 번 저장)
+        if self._saver is None:
+            with self._lock:
+                if self._saver is None:
+                    self._saver = threading.Thread(target=self._save_loop, name="rl-online-saver", daemon=True)
+                    self._saver.start()
+        self._save_requested.set()
+
+    def _save_loop(self) -> None:
+        while True:
+            self._save_requested.wait()
+            self._save_requested.clear()
+            try:
+                self.save()
+            except Exception as e:
+                logger.warning(f"[Online Bandit] ⚠️ 상태 저장 실패 (다음 checkpoint 때 재시도): {e}")
+
+    def load(self, path: Optional[Path] = None) -> bool:
+        path = Path(path or self.config.state_path)
+        if not path.exists():
+            return False
+        with np.load(path) as data:
+            A_inv, b, theta = data["A_inv"], data["b"], data["theta"]
+            if A_inv.shape != (self.config.dim, self.config.dim):
+                logger.warning(f"[Online Bandit] ⚠️ 저장된 상태 차원 불일치 → 무시: {path}")
+                return False
+            with self._lock:
+                self._state = (A_inv, b, theta)
+                self.n_updates = int(data["n_updates"])
+        return True
+
+
+# ------------------------------------------------------
+# 노출됐지만 상호작용이 없는 item → reward 0 update (지연 작업)
+# ------------------------------------------------------
+class UnclickedExposureFeeder:
+    """
+    feeder = UnclickedExposureFeeder(loader, update_fn)
+    feeder.start()   # interval 마다 run_once()
+
+    created_at 이 (watermark, now − delay] 인 노출 로그를 순서대로 읽어서
+    recommendation_interactions 에 없는 item 만 update_fn(user_id, x, 0.0).
+    - delay 는 클릭 / 북마크가 들어올 시간. 그보다 늦게 온 상호작용은 0 update 뒤에 그 reward 로 한 번 더 갱신된다.
+    - watermark 는 메모리에만 있다 (프로세스 시작 시 now − delay). 재시작 전 노출 중 처리 못 한 것은 건너뛴다.
+    """
+
+    def __init__(
+        self,
+        loader: "MongoDataLoader",
+        update_fn: UpdateFn,
+        delay_sec: float = ONLINE_ZERO_DELAY_SEC,
+        interval_sec: float = ONLINE_ZERO_INTERVAL_SEC,
+        batch_size: int = 1000,
+    ):
+        self.loader = loader
+        self.update_fn = update_fn
+        self.delay = timedelta(seconds=delay_sec)
+        self.interval_sec = interval_sec
+        self.batch_size = batch_size
+        self.watermark = datetime.utcnow() - self.delay
+        self._stopped = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def run_once(self, now: Optional[datetime] = None) -> int:
+        """
+        return: reward 0 으로 update 한 item 수
+        """
+        cutoff = (now or datetime.utcnow()) - self.delay
+        updated = 0
+        while self.watermark < cutoff:
+            events = self.loader.get_events_created_between(self.watermark, cutoff, limit=self.batch_size)
+            if not events:
+                break
+            interacted = self.loader.get_interacted_paper_ids_many([e["_id"] for e in events])
+            for event in events:
+                seen = interacted.get(event["_id"], ())
+                for item in event.get("items") or []:
+                    if item.get("paper_id") in seen:
+                        continue
+                    self.update_fn(event.get("user_id"), feature_row_from_logged(item.get("features") or {}), 0.0)
+                    updated += 1
+            self.watermark = events[-1]["created_at"]
+            if len(events) < self.batch_size:
+                break
+        return updated
+
+    def start(self) -> None:
+        if self.delay.total_seconds() <= 0 or self.interval_sec <= 0 or self._worker is not None:
+            return
+        self._stopped.clear()
+        self._worker = threading.Thread(target=self._loop, name="rl-online-zero-reward", daemon=True)
+        self._worker.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        worker, self._worker = self._worker, None
+        if worker is not None and worker is not threading.current_thread():
+            worker.join(timeout=1)
+
+    def _loop(self) -> None:
+        while not self._stopped.wait(self.interval_sec):
+            try:
+                n = self.run_once()
+                if n:
+                    logger.debug("[Online Bandit] 상호작용 없는 노출 %d개 reward 0 으로 update", n)
+            except Exception as e:
+                logger.warning(f"[Online Bandit] ⚠️ reward 0 update 실패 (다음 주기에 재시도): {e}")
+
+
+# ------------------------------------------------------
+# 프로세스 전역 싱글톤
+# ------------------------------------------------------
+_online_bandit: Optional[LinearOnlineBandit] = None
+_online_lock = threading.Lock()
+
+
+def get_online_bandit() -> Optional[LinearOnlineBandit]:
+    """
+    RL_ONLINE_BANDIT 환경변수가 설정되어 있을 때만 bandit 을 만들어 돌려준다.
+    """
+    global _online_bandit
+    algorithm = os.getenv("RL_ONLINE_BANDIT", "").strip().lower()
+    if algorithm not in ("linucb", "thompson"):
+        return None
+
+    if _online_bandit is None:
+        with _online_lock:
+            if _online_bandit is None:
+                config = OnlineBanditConfig(
+                    algorithm=algorithm,
+                    alpha=float(os.getenv("RL_ONLINE_ALPHA", "0.5")),
+                    state_path=Path(os.getenv("RL_ONLINE_STATE_PATH", str(DEFAULT_ONLINE_STATE_PATH))),
+                )
+                bandit = LinearOnlineBandit(config)
+                if bandit.load():
+                    logger.info(f"[Online Bandit] 상태 복원: n_updates={bandit.n_updates}")
+                _online_bandit = bandit
+    return _online_bandit
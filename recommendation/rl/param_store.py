@@ -0,0 +1,155 @@
+"""
+param_store.py
+
+user(또는 segment) 별 파라미터 벡터(d,) 를 담는 array 기반 저장소.
+
+- 메모리: (max_resident, d) float32 행렬 하나에 활성 user 의 row 만 올려둔다.
+- LRU: 오래 안 쓰인 user 는 디스크로 page-out 하고 row 를 재사용한다.
+- 디스크: user ordinal 순서로 block_XXXX.npy (block_rows, d) memmap 에 저장.
+         keys.npy 에 ordinal → key 매핑을 저장한다.
+
+수십만 user 라도 메모리에는 max_resident × d 개의 float 만 유지된다.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+
+class _UserSlot:
+    __slots__ = ("ordinal", "row")
+
+    def __init__(self, ordinal: int, row: int):
+        self.ordinal = ordinal  # 디스크 block 상의 위치
+        self.row = row  # 메모리 행렬 상의 위치
+
+
+class UserParamStore:
+    def __init__(
+        self,
+        dim: int,
+        root_dir: Path,
+        max_resident: int = 50_000,
+        block_rows: int = 65_536,
+    ):
+        self.dim = dim
+        self.root_dir = Path(root_dir)
+        self.max_resident = max_resident
+        self.block_rows = block_rows
+
+        self._matrix = np.zeros((max_resident, dim), dtype=np.float32)
+        self._free_rows = list(range(max_resident - 1, -1, -1))
+        self._resident: "OrderedDict[int, _UserSlot]" = OrderedDict()  # LRU 순서
+        self._ordinals: Dict[int, int] = {}  # key → ordinal (디스크 위치)
+        self._blocks: Dict[int, np.memmap] = {}
+        self._lock = threading.RLock()
+
+        self._load_index()
+
+    # ------------------------------------------------------
+    # 디스크 block
+    # ------------------------------------------------------
+    def _block_path(self, block: int) -> Path:
+        return self.root_dir / f"block_{block:04d}.npy"
+
+    def _block(self, block: int) -> np.memmap:
+        mm = self._blocks.get(block)
+        if mm is None:
+            path = self._block_path(block)
+            if path.exists():
+                mm = np.load(path, mmap_mode="r+")
+            else:
+                self.root_dir.mkdir(parents=True, exist_ok=True)
+                mm = np.lib.format.open_memmap(
+                    path, mode="w+", dtype=np.float32, shape=(self.block_rows, self.dim)
+                )
+            self._blocks[block] = mm
+        return mm
+
+    def _disk_row(self, ordinal: int) -> np.ndarray:
+        block, offset = divmod(ordinal, self.block_rows)
+        return self._block(block)[offset]
+
+    def _load_index(self) -> None:
+        keys_path = self.root_dir / "keys.npy"
+        if keys_path.exists():
+            keys = np.load(keys_path)
+            self._ordinals = {int(k): i for i, k in enumerate(keys)}
+
+    # ------------------------------------------------------
+    # LRU paging
+    # ------------------------------------------------------
+    def _page_in(self, key: int) -> _UserSlot:
+        slot = self._resident.get(key)
+        if slot is not None:
+            self._resident.move_to_end(key)
+            return slot
+
+        if not self._free_rows:
+            # 가장 오래 안 쓰인 user 를 디스크로 내보내고 row 재사용
+            old_key, old_slot = self._resident.popitem(last=False)
+            self._disk_row(old_slot.ordinal)[:] = self._matrix[old_slot.row]
+            self._free_rows.append(old_slot.row)
+
+        row = self._free_rows.pop()
+        ordinal = self._ordinals.get(key)
+        if ordinal is None:
+            ordinal = len(self._ordinals)
+            self._ordinals[key] = ordinal
+            self._matrix[row] = 0.0
+        else:
+            self._matrix[row] = self._disk_row(ordinal)
+
+        slot = _UserSlot(ordinal=ordinal, row=row)
+        self._resident[key] = slot
+        return slot
+
+    def get(self, key: int) -> np.ndarray:
+        """
+        key 의 파라미터 벡터 복사본 (d,) — 처음 보는 key 면 0 벡터.
+        """
+        key = int(key)
+        with self._lock:
+            if key not in self._resident and key not in self._ordinals:
+                return np.zeros(self.dim, dtype=np.float32)
+            slot = self._page_in(key)
+            return self._matrix[slot.row].copy()
+
+    def add(self, key: int, delta: np.ndarray) -> None:
+        """
+        key 의 파라미터에 delta 를 더한다.
+        """
+        with self._lock:
+            slot = self._page_in(int(key))
+            self._matrix[slot.row] += np.asarray(delta, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def flush(self) -> None:
+        """
+        메모리에 올라와 있는 row 와 key index 를 모두 디스크에 기록.
+        """
+        with self._lock:
+            for slot in self._resident.values():
+                self._disk_row(slot.ordinal)[:] = self._matrix[slot.row]
+            for mm in self._blocks.values():
+                mm.flush()
+
+            if not self._ordinals:
+                return
+            keys = np.empty(len(self._ordinals), dtype=np.int64)
+            for key, ordinal in self._ordinals.items():
+                keys[ordinal] = key
+            self.root_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self.root_dir / "keys.tmp.npy"
+            np.save(tmp, keys)
+            os.replace(tmp, self.root_dir / "keys.npy")
+
+    def resident_count(self) -> int:
+        return len(self._resident)
@@ -0,0 +1,148 @@
+"""
+registry.py
+
+버전이 붙은 bandit 모델 checkpoint 저장소.
+
+디렉토리 구성:
+    models/rl/registry/
+        manifest.json   : {"latest": 3, "versions": [{"version": 1, "file": "v0001.pt", ...}, ...]}
+        v0001.pt
+        v0002.pt
+        ...
+
+manifest.json 은 임시 파일에 쓴 뒤 rename 하므로, 서버 쪽 reloader 는
+항상 완성된 manifest 와 이미 복사가 끝난 checkpoint 만 보게 된다.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_REGISTRY_DIR = Path(os.getenv("RL_MODEL_REGISTRY_DIR", "models/rl/registry"))
+MANIFEST_FILE = "manifest.json"
+
+
+def format_version(version: int) -> str:
+    return f"v{version:04d}"
+
+
+def version_from_results(results: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    reranker 가 결과 breakdown(features) 에 남긴 model_version 으로 노출을 모델 버전에 귀속.
+    """
+    for r in results:
+        version = (r.get("features") or {}).get("model_version")
+        if version is not None:
+            return format_version(int(version))
+    return None
+
+
+@dataclass
+class ModelVersion:
+    version: int
+    path: Path
+    created_at: str
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        return format_version(self.version)
+
+
+class ModelRegistry:
+    def __init__(self, root: Path = DEFAULT_REGISTRY_DIR):
+        self.root = Path(root)
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.root / MANIFEST_FILE
+
+    def exists(self) -> bool:
+        return self.manifest_path.exists()
+
+    def manifest_mtime(self) -> Optional[float]:
+        try:
+            return self.manifest_path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        if not self.manifest_path.exists():
+            return {"latest": None, "versions": []}
+        return json.loads(self.manifest_path.read_text())
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2))
+        os.replace(tmp, self.manifest_path)
+
+    def _to_version(self, entry: Dict[str, Any]) -> ModelVersion:
+        return ModelVersion(
+            version=int(entry["version"]),
+            path=self.root / entry["file"],
+            created_at=entry.get("created_at", ""),
+            meta=entry.get("meta", {}),
+        )
+
+    def versions(self) -> List[ModelVersion]:
+        return [self._to_version(e) for e in self._read_manifest()["versions"]]
+
+    def get(self, version: int) -> Optional[ModelVersion]:
+        for v in self.versions():
+            if v.version == version:
+                return v
+        return None
+
+    def latest(self) -> Optional[ModelVersion]:
+        manifest = self._read_manifest()
+        if manifest.get("latest") is None:
+            return None
+        return self.get(int(manifest["latest"]))
+
+    def register(
+        self,
+        checkpoint_path: Path,
+        meta: Optional[Dict[str, Any]] = None,
+        make_latest: bool = True,
+    ) -> ModelVersion:
+        """
+        checkpoint 를 registry 로 복사하고 새 버전으로 등록.
+        """
+        manifest = self._read_manifest()
+        version = max((int(e["version"]) for e in manifest["versions"]), default=0) + 1
+        filename = f"{format_version(version)}.pt"
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f".{filename}.tmp"
+        shutil.copyfile(checkpoint_path, tmp)
+        os.replace(tmp, self.root / filename)
+
+        entry = {
+            "version": version,
+            "file": filename,
+            "created_at": datetime.utcnow().isoformat(),
+            "meta": meta or {},
+        }
+        manifest["versions"].append(entry)
+        if make_latest:
+            manifest["latest"] = version
+        self._write_manifest(manifest)
+        return self._to_version(entry)
+
+    def promote(self, version: int) -> ModelVersion:
+        """
+        이미 등록된 버전을 latest 로 지정 (롤백 용도).
+        """
+        target = self.get(version)
+        if target is None:
+            raise ValueError(f"등록되지 않은 모델 버전입니다: {version}")
+        manifest = self._read_manifest()
+        manifest["latest"] = version
+        self._write_manifest(manifest)
+        return target
@@ -1,30 +1,122 @@
 from __future__ import annotations
-from typing import Mapping, Any, Optional
 
 """
 reward.py
 
 추천 상호작용 로그(recommendation_interactions)에 대해
-보상 값을 계산하는 모듈.
+보상 값을 계산하는 모듈. (serving / dataset builder / offline relabel 공용)
 
-현재 설계:
+현재 설계 (RewardConfig v1):
 - click  : +1.0
 - bookmark : +3.0
 - dwell_time >= 3초 : +0.3
 - dwell_time <= 1초 : -0.2   (바로 이탈한 경우 페널티)
+
+- compute_reward(interaction): 상호작용 1건 (serving)
+- compute_rewards(action_types, dwell_times): numpy 배열 단위 (수백만 건 offline relabel)
+  두 API 는 같은 RewardConfig 로 같은 값을 낸다.
+- RewardConfig 는 version + fingerprint(값 해시)로 구분하고,
+  상호작용 로그 / 학습 snapshot / checkpoint 에 함께 기록한다.
+- RL_REWARD_CONFIG=<json 경로> 로 serving / 학습의 기본 config 를 바꿀 수 있다.
 """
 
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ArrayLike = Union[Sequence[Any], np.ndarray]
+
+
+@dataclass(frozen=True)
+class RewardConfig:
+    """
+    보상 하이퍼파라미터. 값을 바꾸면 version 도 올린다.
+    (version 을 안 올려도 fingerprint 가 달라지므로 기록된 config 로 구분 가능)
+    """
+    version: int = 1
+    # action_type → 보상 (목록에 없는 action 은 0)
+    action_rewards: Mapping[str, float] = field(
+        default_factory=lambda: {"click": 1.0, "bookmark": 3.0}
+    )
+    dwell_threshold: float = 3.0  # seconds
+    dwell_reward: float = 0.3
+    bounce_threshold: float = 1.0  # seconds
+    bounce_penalty: float = -0.2
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = asdict(self)
+        d["action_rewards"] = dict(self.action_rewards)
+        d["fingerprint"] = self.fingerprint
+        return d
+
+    @classmethod
+    def from_dict(cls, d: Mapping[str, Any]) -> "RewardConfig":
+        d = {k: v for k, v in d.items() if k != "fingerprint"}
+        d["action_rewards"] = dict(d.get("action_rewards") or {})
+        return cls(**d)
 
-# 보상 하이퍼파라미터 (필요시 나중에 조정 가능)
-CLICK_REWARD = 1.0
-BOOKMARK_REWARD = 3.0
-DWELL_THRESHOLD = 3.0  # seconds
-DWELL_REWARD = 0.3
-BOUNCE_THRESHOLD = 1.0  # seconds
-BOUNCE_PENALTY = -0.2
+    @property
+    def fingerprint(self) -> str:
+        d = asdict(self)
+        d["action_rewards"] = dict(sorted(self.action_rewards.items()))
+        return hashlib.sha1(json.dumps(d, sort_keys=True).encode()).hexdigest()[:12]
 
+    @property
+    def tag(self) -> str:
+        # 로그 / registry meta 에 남기는 짧은 식별자
+        return f"v{self.version}-{self.fingerprint}"
 
-def compute_reward(interaction: Mapping[str, Any]) -> float:
+
+DEFAULT_REWARD_CONFIG = RewardConfig()
+
+# 이전 코드 호환용 상수 (기본 config 값)
+CLICK_REWARD = DEFAULT_REWARD_CONFIG.action_rewards["click"]
+BOOKMARK_REWARD = DEFAULT_REWARD_CONFIG.action_rewards["bookmark"]
+DWELL_THRESHOLD = DEFAULT_REWARD_CONFIG.dwell_threshold
+DWELL_REWARD = DEFAULT_REWARD_CONFIG.dwell_reward
+BOUNCE_THRESHOLD = DEFAULT_REWARD_CONFIG.bounce_threshold
+BOUNCE_PENALTY = DEFAULT_REWARD_CONFIG.bounce_penalty
+
+
+_reward_config: Optional[RewardConfig] = None
+
+
+def load_reward_config(path: Union[str, Path]) -> RewardConfig:
+    return RewardConfig.from_dict(json.loads(Path(path).read_text()))
+
+
+def get_reward_config() -> RewardConfig:
+    """
+    프로세스 기본 config. RL_REWARD_CONFIG 가 있으면 그 파일, 없으면 DEFAULT_REWARD_CONFIG.
+    """
+    global _reward_config
+    if _reward_config is None:
+        path = os.getenv("RL_REWARD_CONFIG")
+        _reward_config = load_reward_config(path) if path else DEFAULT_REWARD_CONFIG
+        logger.info("[Reward] reward config %s", _reward_config.tag)
+    return _reward_config
+
+
+def set_reward_config(config: Optional[RewardConfig]) -> None:
+    # None 이면 다음 get_reward_config() 때 환경변수에서 다시 읽음
+    global _reward_config
+    _reward_config = config
+
+
+# ------------------------------------------------------
+# scalar (serving)
+# ------------------------------------------------------
+def compute_reward(
+    interaction: Mapping[str, Any], config: Optional[RewardConfig] = None
+) -> float:
     """
     interaction dict 예시:
     {
@@ -33,22 +125,74 @@ def compute_reward(interaction: Mapping[str, Any]) -> float:
         "meta": {...}
     }
     """
+    config = config or get_reward_config()
     action_type: str = interaction.get("action_type", "")
     dwell_time: Optional[float] = interaction.get("dwell_time")
 
     reward = 0.0
 
     # 1) 기본 action 기반 보상
-    if action_type == "click":
-        reward += CLICK_REWARD
-    elif action_type == "bookmark":
-        reward += BOOKMARK_REWARD
+    reward += config.action_rewards.get(action_type, 0.0)
 
     # 2) 체류시간 기반 보상/패널티
     if dwell_time is not None:
-        if dwell_time >= DWELL_THRESHOLD:
-            reward += DWELL_REWARD
-        elif dwell_time <= BOUNCE_THRESHOLD:
-            reward += BOUNCE_PENALTY
+        if dwell_time >= config.dwell_threshold:
+            reward += config.dwell_reward
+        elif dwell_time <= config.bounce_threshold:
+            reward += config.bounce_penalty
 
     return reward
+
+
+# ------------------------------------------------------
+# vectorized (offline relabel)
+# ------------------------------------------------------
+def action_rewards(action_types: ArrayLike, config: Optional[RewardConfig] = None) -> np.ndarray:
+    """
+    action_type 배열 → (N,) float64. 목록에 없는 action (None 포함) 은 0.
+
+    - numpy 문자열 배열: 보상이 있는 action 종류마다 == 비교 한 번 (종류 수가 적어서 정렬보다 빠름)
+    - list / object 배열 (Mongo 에서 읽은 값): dict 조회 한 번씩
+    """
+    config = config or get_reward_config()
+    table = config.action_rewards
+    if isinstance(action_types, np.ndarray) and action_types.dtype.kind == "U":
+        actions = action_types.ravel()
+        out = np.zeros(actions.size, dtype=np.float64)
+        for kind, value in table.items():
+            out[actions == kind] = value
+        return out
+    if isinstance(action_types, np.ndarray):
+        action_types = action_types.ravel().tolist()
+    get = table.get
+    return np.array([get(a, 0.0) for a in action_types], dtype=np.float64).reshape(-1)
+
+
+def dwell_rewards(dwell_times: Optional[ArrayLike], n: int, config: Optional[RewardConfig] = None) -> np.ndarray:
+    """
+    dwell_time(초) 배열 → (N,) float64 가산값. None / NaN 은 0.
+    """
+    config = config or get_reward_config()
+    if dwell_times is None:
+        return np.zeros(n, dtype=np.float64)
+    dwell = np.asarray(dwell_times, dtype=np.float64)  # None → NaN
+    with np.errstate(invalid="ignore"):
+        return np.where(
+            dwell >= config.dwell_threshold,
+            config.dwell_reward,
+            np.where(dwell <= config.bounce_threshold, config.bounce_penalty, 0.0),
+        )
+
+
+def compute_rewards(
+    action_types: ArrayLike,
+    dwell_times: Optional[ArrayLike] = None,
+    config: Optional[RewardConfig] = None,
+) -> np.ndarray:
+    """
+    compute_reward 의 배열 버전. 같은 config 면 원소별로 compute_reward 와 같은 값.
+    dwell_times 가 None 이면 체류시간 정보 없음으로 본다.
+    """
+    config = config or get_reward_config()
+    base = action_rewards(action_types, config)
+    return base + dwell_rewards(dwell_times, base.size, config).reshape(base.shape)
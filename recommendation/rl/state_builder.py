@@ -1,11 +1,15 @@
 # recommendation/rl/state_builder.py
 
-from typing import List, Tuple, Dict
+from typing import Any, List, Mapping, Tuple, Dict
 import numpy as np
 from datetime import datetime
 
 from ..models.data_models import Paper, UserProfile
-from ..rule_based.scoring import compute_total_score
+from ..rule_based.scoring import W_POPULARITY, W_RECENCY, compute_total_score
+from .feature_schema import DEFAULT_FEATURE_SCHEMA
+
+# feature vector column 순서 (build_candidate_features 와 동일, feature_schema 에서 관리)
+FEATURE_NAMES = DEFAULT_FEATURE_SCHEMA.names
 
 
 def build_candidate_features(
@@ -48,3 +52,18 @@ def build_candidate_features(
 
     X = np.asarray(feature_rows, dtype=float)
     return X, paper_ids, feature_dicts
+
+
+def feature_row_from_logged(feats: Mapping[str, Any]) -> List[float]:
+    """
+    log_recommendation_event 에 저장된 item features(dict)를 feature vector 로 변환.
+
+    - 노출 시점에 계산된 값을 그대로 쓰므로 현재 profile / 현재 시각이 섞이지 않는다.
+    - rule_total_score 는 저장된 구성요소로 compute_total_score 와 같은 식으로 다시 합산.
+    """
+    keyword = float(feats.get("keyword", 0.0) or 0.0)
+    category = float(feats.get("category", 0.0) or 0.0)
+    popularity = float(feats.get("popularity", 0.0) or 0.0)
+    recency = float(feats.get("recency", 0.0) or 0.0)
+    rule_total = keyword + category + W_POPULARITY * popularity + W_RECENCY * recency
+    return [keyword, category, popularity, recency, rule_total]
@@ -14,15 +14,25 @@ Offline 학습용 trainer 모듈 패키지
 try:
     import torch
     import torch.nn as nn
-    from torch.utils.data import DataLoader, TensorDataset
+    from torch.utils.data import BatchSampler, DataLoader, RandomSampler, TensorDataset
 except ImportError as e:
     raise ImportError(
         "PyTorch가 설치되어 있어야 offline RL 학습을 수행할 수 있습니다. "
         "pip install torch 로 설치 후 다시 시도하세요."
     ) from e
 
-from ..bandit_policy import SimpleBanditModel, DEFAULT_MODEL_PATH
-from ..dataset.builder import build_bandit_dataset_from_mongo
+from ..bandit_policy import DEFAULT_MODEL_PATH, build_model, save_checkpoint
+from ..feature_schema import DEFAULT_FEATURE_SCHEMA
+from ..registry import ModelRegistry
+from ..reward import RewardConfig
+from ..dataset.builder import build_bandit_dataset_from_logs, build_bandit_dataset_from_mongo
+from ..dataset.snapshot import SnapshotDataset, is_snapshot, write_snapshot
+from ..state_builder import FEATURE_NAMES
+
+
+def _snapshot_batch_to_tensors(batch):
+    X, y = batch
+    return torch.from_numpy(np.asarray(X, dtype=np.float32)), torch.from_numpy(np.asarray(y, dtype=np.float32))
 
 
 def train_offline_bandit(
@@ -31,36 +41,115 @@ def train_offline_bandit(
     num_epochs: int = 5,
     lr: float = 1e-3,
     limit: Optional[int] = None,
+    source: str = "paper_recommendations",
+    snapshot_dir: Optional[Path] = None,
+    registry_dir: Optional[Path] = None,
+    arch: str = "linear",
+    normalize: bool = False,
+    reward_config: Optional[RewardConfig] = None,
 ) -> Path:
     """
-    MongoDB paper_recommendations 데이터를 사용하여
-    SimpleBanditModel을 offline 학습하고, model_path에 저장한다.
+    MongoDB 데이터를 사용하여 bandit 모델을 offline 학습하고, model_path에 저장한다.
+    checkpoint 에는 architecture tag 와 FeatureSchema 가 같이 저장된다.
+
+    source:
+      - "paper_recommendations": 현재 profile 로 feature 를 다시 계산 (기존 방식)
+      - "logs": recommendation_events 에 노출 당시 저장된 feature 사용 (point-in-time)
+
+    snapshot_dir:
+      - 지정하면 해당 위치의 학습 데이터 snapshot 을 memory-map 으로 읽어 minibatch 학습.
+      - snapshot 이 아직 없으면 source 로 한 번 만들어서 저장한 뒤 사용한다.
+        (이후 run 은 Mongo 에 접근하지 않음)
+
+    registry_dir:
+      - 지정하면 학습된 모델을 registry 에 새 버전으로 등록 (서버가 자동으로 hot reload)
+
+    arch:
+      - bandit_policy.MODEL_ZOO 의 architecture tag ("linear" | "mlp")
+
+    normalize:
+      - True 면 학습 데이터의 column 별 mean / std 를 schema 에 기록하고 정규화된 입력으로 학습
+        (serving 쪽은 checkpoint 의 schema 로 같은 정규화를 적용)
+
+    reward_config:
+      - 지정하면 상호작용 로그를 이 config 로 다시 계산해서 학습 (source="logs" 일 때 relabel)
+      - 기존 snapshot 을 재사용할 때 snapshot 의 config 와 다르면 ValueError (snapshot 을 다시 만들 것)
+      - 학습에 쓴 reward config 와 reward_versions (로그 그대로 쓴 경우 로그의 reward_version 들) 는
+        checkpoint / registry meta 에 함께 기록된다.
     """
     model_path = Path(model_path or DEFAULT_MODEL_PATH)
 
     # 1) Dataset 구축
-    dataset = build_bandit_dataset_from_mongo(limit=limit)
-    X, y = dataset.X, dataset.y
-
-    if X.size == 0 or y.size == 0:
-        raise RuntimeError(
-            "offline 학습용 데이터가 없습니다. "
-            "paper_recommendations 컬렉션에 데이터가 쌓였는지 확인하세요."
+    if snapshot_dir is not None and is_snapshot(snapshot_dir):
+        snapshot = SnapshotDataset(snapshot_dir)
+        snapshot_config = snapshot.reward_config
+        if reward_config is not None and (
+            snapshot_config is None or snapshot_config.fingerprint != reward_config.fingerprint
+        ):
+            # 요청한 config 를 조용히 snapshot 의 config 로 바꾸지 않는다
+            raise ValueError(
+                f"snapshot 의 reward config ({snapshot_config.tag if snapshot_config else ', '.join(snapshot.reward_versions)}) 가 "
+                f"요청한 reward config ({reward_config.tag}) 와 다릅니다. "
+                f"snapshot 을 지우거나 다른 snapshot_dir 로 다시 만드세요: {snapshot_dir}"
+            )
+        print(f"학습 데이터 snapshot 재사용: {snapshot_dir}")
+    else:
+        if source == "logs":
+            dataset = build_bandit_dataset_from_logs(limit=limit, reward_config=reward_config)
+        elif source == "paper_recommendations":
+            dataset = build_bandit_dataset_from_mongo(limit=limit, reward_config=reward_config)
+        else:
+            raise ValueError(f"알 수 없는 dataset source: {source}")
+
+        if dataset.X.size == 0 or dataset.y.size == 0:
+            raise RuntimeError(
+                "offline 학습용 데이터가 없습니다. "
+                f"{source} 데이터가 쌓였는지 확인하세요."
+            )
+
+        reward_config, reward_versions = dataset.reward_config, dataset.reward_versions
+        if snapshot_dir is not None:
+            write_snapshot(dataset, snapshot_dir, source=source, extra={"limit": limit})
+            print(f"학습 데이터 snapshot 저장: {snapshot_dir}")
+
+    # 2) DataLoader 준비
+    schema = DEFAULT_FEATURE_SCHEMA
+    if snapshot_dir is not None:
+        # memory-map 에서 minibatch 단위로 읽음 (RAM 보다 큰 데이터셋도 가능)
+        ds = SnapshotDataset(snapshot_dir, feature_names=FEATURE_NAMES)
+        reward_config, reward_versions = ds.reward_config, ds.reward_versions
+        if len(ds) == 0:
+            raise RuntimeError(f"snapshot 에 학습 데이터가 없습니다: {snapshot_dir}")
+        input_dim = ds.num_features
+        if normalize:
+            schema = schema.with_normalization_from(ds.X)
+        dl = DataLoader(
+            ds,
+            sampler=BatchSampler(RandomSampler(ds), batch_size=batch_size, drop_last=False),
+            batch_size=None,
+            collate_fn=_snapshot_batch_to_tensors,
         )
+    else:
+        X, y = dataset.X, dataset.y
+        input_dim = X.shape[1]
+        if normalize:
+            schema = schema.with_normalization_from(X)
 
-    input_dim = X.shape[1]
+        X_t = torch.from_numpy(X).float()
+        y_t = torch.from_numpy(y).float()
 
-    # 2) TensorDataset 준비
-    X_t = torch.from_numpy(X).float()
-    y_t = torch.from_numpy(y).float()
-
-    ds = TensorDataset(X_t, y_t)
-    dl = DataLoader(ds, batch_size=batch_size, shuffle=True)
+        ds = TensorDataset(X_t, y_t)
+        dl = DataLoader(ds, batch_size=batch_size, shuffle=True)
 
     # 3) 모델 초기화
-    model = SimpleBanditModel(input_dim=input_dim)
+    if input_dim != schema.dim:
+        raise ValueError(f"feature 차원 불일치: 데이터={input_dim}, schema={schema.dim}")
+    model = build_model(arch, input_dim)
     model.train()
 
+    mean_np, std_np = schema.normalization_arrays()
+    mean_t, std_t = torch.from_numpy(mean_np), torch.from_numpy(std_np)
+
     optimizer = torch.optim.Adam(model.parameters(), lr=lr)
     # 회귀 문제로 간주하여 MSE 사용 (reward ~ expected value)
     criterion = nn.MSELoss()
@@ -70,6 +159,8 @@ def train_offline_bandit(
         epoch_loss = 0.0
         for xb, yb in dl:
             optimizer.zero_grad()
+            if schema.normalization:
+                xb = (xb - mean_t) / std_t
             pred = model(xb)  # (B,)
             loss = criterion(pred, yb)
             loss.backward()
@@ -79,10 +170,28 @@ def train_offline_bandit(
         epoch_loss /= len(ds)
         print(f"[epoch {epoch+1}/{num_epochs}] loss={epoch_loss:.4f}")
 
-    # 5) 디렉토리 생성 및 저장
-    model_path.parent.mkdir(parents=True, exist_ok=True)
-    torch.save(model.state_dict(), model_path)
-    print(f"Saved bandit policy model to: {model_path}")
+    # 5) 저장 (architecture tag + feature schema 포함)
+    save_checkpoint(
+        model, model_path, arch=arch, schema=schema, meta={"source": source},
+        reward_config=reward_config, reward_versions=reward_versions,
+    )
+    print(f"Saved bandit policy model to: {model_path} (arch={arch}, schema=v{schema.version})")
+
+    if registry_dir is not None:
+        registered = ModelRegistry(registry_dir).register(
+            model_path,
+            meta={
+                "source": source,
+                "arch": arch,
+                "feature_schema_version": schema.version,
+                "reward_config": reward_config.tag if reward_config else None,
+                "reward_versions": list(reward_versions),
+                "snapshot_dir": str(snapshot_dir) if snapshot_dir else None,
+                "num_epochs": num_epochs,
+                "final_loss": epoch_loss,
+            },
+        )
+        print(f"Registered model version: {registered.name} ({registered.path})")
 
     return model_path
 
@@ -3,6 +3,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Optional
 
+from ..reward import RewardConfig, compute_reward as _compute_interaction_reward
+
 
 @dataclass
 class InteractionSignal:
@@ -18,33 +20,24 @@ class InteractionSignal:
     dwell_time_ms: Optional[int] = None
 
 
-def compute_reward(sig: InteractionSignal) -> float:
+def compute_reward(sig: InteractionSignal, config: Optional[RewardConfig] = None) -> float:
     """
     InteractionSignal을 바탕으로 단일 scalar reward를 계산.
 
-    기본 정책 (예시):
-      - 클릭: +1.0
-      - 북마크: +1.0 (클릭과 별도로 가산)
-      - dwell_time_ms:
-          60초 이상: +0.5
-          30초 이상: +0.25
-
-    NOTE:
-      - 이 함수는 쉽게 수정/실험할 수 있도록 별도 모듈로 분리했다.
-      - 나중에 프로젝트 상황에 맞게 가중치만 바꿔도 된다.
+    가중치는 rl.reward 의 RewardConfig 를 그대로 사용한다 (serving / 학습과 같은 식).
+      - 클릭 / 북마크: 각 action 보상을 가산
+      - dwell_time_ms: 초 단위로 바꿔 dwell 보상 / 이탈 페널티 적용
     """
     reward = 0.0
+    dwell_time = sig.dwell_time_ms / 1000.0 if sig.dwell_time_ms is not None else None
 
     if sig.was_clicked:
-        reward += 1.0
+        reward += _compute_interaction_reward({"action_type": "click"}, config)
 
     if sig.was_bookmarked:
-        reward += 1.0
+        reward += _compute_interaction_reward({"action_type": "bookmark"}, config)
 
-    if sig.dwell_time_ms is not None:
-        if sig.dwell_time_ms >= 60_000:
-            reward += 0.5
-        elif sig.dwell_time_ms >= 30_000:
-            reward += 0.25
+    # dwell 보상은 한 번만 (action 없이 계산)
+    reward += _compute_interaction_reward({"action_type": "", "dwell_time": dwell_time}, config)
 
-    return reward
\ No newline at end of file
+    return reward
@@ -1,8 +1,14 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional
 
+import numpy as np
+
+from .. import metrics
 from ..data.data_loader import MongoDataLoader
-from ..models.data_models import UserProfile, RecommendationResult, Paper
-from .scoring import compute_total_score
+from ..data.vocabulary import get_vocabulary, overlap_count
+from ..models.data_models import CandidateBatch, UserProfile, RecommendationResult, Paper
+from ..rl.feature_schema import DEFAULT_FEATURE_SCHEMA
+from .scoring import combine_scores, profile_scores
 
 
 class RuleBasedRecommender:
@@ -13,10 +19,12 @@ class RuleBasedRecommender:
     def _similarity_bonus(self, paper: Paper, base: Paper) -> float:
         bonus = 0.0
 
-        # Category similarity
-        cats1 = set(paper.categories or [])
-        cats2 = set(base.categories or [])
-        cat_overlap = len(cats1 & cats2)
+        vocab = get_vocabulary()
+        enc1 = vocab.encode_paper(paper)
+        enc2 = vocab.encode_paper(base)
+
+        # Category similarity (bitmask popcount)
+        cat_overlap = (enc1.category_bits & enc2.category_bits).bit_count()
 
         if cat_overlap >= 3:
             bonus += 0.8
@@ -29,9 +37,7 @@ class RuleBasedRecommender:
 
 
         # Keyword similarity
-        kw1 = set(paper.keywords or [])
-        kw2 = set(base.keywords or [])
-        kw_overlap = len(kw1 & kw2)
+        kw_overlap = overlap_count(enc1.keyword_ids, enc2.keyword_ids)
 
         if kw_overlap >= 3:
             bonus += 0.5
@@ -43,16 +49,43 @@ class RuleBasedRecommender:
             bonus += 0.03
 
         return bonus
+
+    def _score_columns(
+            self, candidates: List[Paper], profile: UserProfile, now: datetime
+        ) -> Dict[str, np.ndarray]:
+        """
+        compute_total_score 와 같은 feature 를 열 단위로 (각 (N,) float64).
+        keyword / category 는 후보마다, popularity / recency 는 static_features 에서 한 번에 gather.
+        """
+        n = len(candidates)
+        s_kw = np.zeros(n, dtype=np.float64)
+        s_cat = np.zeros(n, dtype=np.float64)
+        for i, p in enumerate(candidates):
+            s_kw[i], s_cat[i] = profile_scores(p, profile)
+        s_pop, s_rec = self.data_loader.static_features.gather(candidates, now)
+        return {
+            "keyword": s_kw,
+            "category": s_cat,
+            "popularity": s_pop,
+            "recency": s_rec,
+            "rule_total_score": combine_scores(s_kw, s_cat, s_pop, s_rec),
+        }
     
-    # 수정됨. 유저 + 논문 유사도
-    def recommend_for_user(
+    def recommend_candidate_batch(
             self,
             user_id: int,
-            top_k: int = 6,
-            base_paper_id: Optional[str] = None
-        ) -> List[RecommendationResult]:
-
+            top_k: int = 100,
+            base_paper_id: Optional[str] = None,
+            now: Optional[datetime] = None,
+        ) -> CandidateBatch:
+        """
+        후보 논문마다 compute_total_score 와 같은 점수를 계산해서
+        (N, D) feature matrix + rule 점수 배열로 묶어 상위 top_k 를 반환.
+        (RL reranker 가 이 feature matrix 를 그대로 사용)
+        user 와 무관한 popularity / recency 는 loader.static_features 에서 후보 전체를 한 번에 gather.
+        """
         profile: UserProfile = self.data_loader.build_user_profile(user_id)
+        now = now or datetime.utcnow()
 
         # base 논문 로딩
         base_paper = None
@@ -63,22 +96,62 @@ class RuleBasedRecommender:
         # 자기 자신은 추천하지 않게 중복 피하기.
         if base_paper_id:
             candidates = [p for p in candidates if p.arxiv_id != base_paper_id]
-        results = []
 
-        for p in candidates:
-            score, feats = compute_total_score(p, profile)
+        names = DEFAULT_FEATURE_SCHEMA.names
+        sim_bonus = None
+
+        with metrics.span("compute_total_score"):
+            columns = self._score_columns(candidates, profile, now)
+            X = np.empty((len(candidates), len(names)), dtype=np.float32)
+            for j, name in enumerate(names):
+                X[:, j] = columns[name]
+            rule_scores = columns["rule_total_score"]
 
             # base 논문 유사도 추가
             if base_paper:
-                sim = self._similarity_bonus(p, base_paper)
-                score += sim
-                feats["similarity_bonus"] = sim
+                sim_bonus = np.array([self._similarity_bonus(p, base_paper) for p in candidates], dtype=np.float64)
+                rule_scores = rule_scores + sim_bonus
+
+        batch = CandidateBatch(
+            paper_ids=[p.arxiv_id or p.mongo_id for p in candidates],
+            papers=candidates,
+            X=X,
+            rule_scores=rule_scores,
+            feature_names=names,
+            similarity_bonus=sim_bonus,
+        )
+        return batch.top_k(top_k)
+
+    # 수정됨. 유저 + 논문 유사도
+    def recommend_for_user(
+            self,
+            user_id: int,
+            top_k: int = 6,
+            base_paper_id: Optional[str] = None
+        ) -> List[RecommendationResult]:
 
-            results.append(RecommendationResult(p, score, feats))
+        batch = self.recommend_candidate_batch(user_id, top_k=top_k, base_paper_id=base_paper_id)
+        return batch.to_results()
+
+    def recommend(
+            self,
+            user_id: Optional[int] = None,
+            paper_id: Optional[str] = None,
+            top_k: int = 6,
+            candidate_k: Optional[int] = None,
+        ) -> List[RecommendationResult]:
+        """
+        interface/recommend.py 의 단일 진입점.
+        - user_id 있음: 유저 기반 (paper_id 가 있으면 해당 논문 유사도 보너스 추가)
+        - user_id 없고 paper_id 만: 순수 논문 기반 유사 논문
+        candidate_k 는 rule-based 에서는 사용하지 않음 (전체 후보를 점수화한 뒤 top_k)
+        """
+        if user_id is not None:
+            return self.recommend_for_user(user_id, top_k=top_k, base_paper_id=paper_id)
+        if paper_id:
+            return self.recommend_similar_papers(paper_id, top_k=top_k)
+        return []
 
-        results.sort(key=lambda r: r.score, reverse=True)
-        return results[:top_k]
-    
 
     def recommend_similar_papers(self, paper_id: str, top_k: int = 6):
         base = self.data_loader.get_paper_by_arxiv_id(paper_id)
@@ -94,10 +167,12 @@ class RuleBasedRecommender:
         candidates = self.data_loader.get_papers_by_categories(base.categories, limit=300)
         candidates = [p for p in candidates if p.arxiv_id != base.arxiv_id]
 
-        results = []
-        for p in candidates:
-            score, feats = compute_total_score(p, profile)
-            results.append(RecommendationResult(p, score, feats))
-
+        with metrics.span("compute_total_score"):
+            columns = self._score_columns(candidates, profile, datetime.utcnow())
+        total = columns.pop("rule_total_score")
+        results = [
+            RecommendationResult(p, float(total[i]), {name: float(col[i]) for name, col in columns.items()})
+            for i, p in enumerate(candidates)
+        ]
         results.sort(key=lambda r: r.score, reverse=True)
         return results[:top_k]
\ No newline at end of file
@@ -1,9 +1,9 @@
 from datetime import datetime
-from math import log1p
-from typing import Dict, Tuple, Set
+from typing import Dict, Tuple
 
 from ..models.data_models import Paper, UserProfile
-from ..data.preprocess import tokenize_keywords
+from ..data.static_features import popularity_feature, raw_popularity, recency_feature
+from ..data.vocabulary import get_vocabulary, overlap_count
 
 # Weight Definitions
 W_EXPLICIT_CAT = 0.50
@@ -15,34 +15,23 @@ W_RECENCY = 0.05 #낮춤
 
 
 # Keyword Score 
+# category / keyword 는 data.vocabulary 의 정수 인코딩으로 비교한다.
+# (논문 토큰화는 캐시되고, 겹치는 개수는 np.intersect1d / popcount)
 
 def _keyword_score(paper: Paper, profile: UserProfile) -> float:
-    
-    paper_kw: Set[str] = set(k.lower() for k in paper.keywords)
+    vocab = get_vocabulary()
+    paper_kw = vocab.encode_paper(paper).token_ids
 
-    if paper.title:
-        paper_kw.update(tokenize_keywords(paper.title))
-    if paper.abstract:
-        paper_kw.update(tokenize_keywords(paper.abstract))
-
-    if not paper_kw:
+    if paper_kw.size == 0:
         return 0.0
 
-    bookmark_kw = set()
-    search_kw = set()
-
-    for p_kw in profile.bookmarked_paper_ids:
-        # NOTE: keywords in Paper level parsed separately
-        pass  # bookmark keywords already added via interests_keywords
-
-    for q in profile.search_queries:
-        search_kw.update(tokenize_keywords(q))
+    prof = vocab.encode_profile(profile)
+    bookmark_kw = prof.bookmark_kw_ids
+    search_kw = prof.search_kw_ids
 
-    all_profile_kw = set(profile.interests_keywords)
-    bookmark_kw = all_profile_kw - search_kw
-
-    overlap_bookmark = len(bookmark_kw & paper_kw) / len(bookmark_kw) if bookmark_kw else 0.0
-    overlap_search = len(search_kw & paper_kw) / len(search_kw) if search_kw else 0.0
+    # 분모는 사전에 없는 토큰까지 포함한 프로필 토큰 수
+    overlap_bookmark = overlap_count(bookmark_kw, paper_kw) / prof.bookmark_kw_count if bookmark_kw.size else 0.0
+    overlap_search = overlap_count(search_kw, paper_kw) / prof.search_kw_count if search_kw.size else 0.0
 
     # 가중치 합산
     score = (W_BOOKMARK_KW * overlap_bookmark +
@@ -54,54 +43,59 @@ def _keyword_score(paper: Paper, profile: UserProfile) -> float:
 # Category Score 
 
 def _category_score(paper: Paper, profile: UserProfile) -> float:
-    paper_cats = set(paper.categories)
-
-    explicit = set(profile.explicit_categories or [])
-    all_cats = set(profile.interests_categories)
+    vocab = get_vocabulary()
+    paper_cats = vocab.encode_paper(paper).category_bits
+    prof = vocab.encode_profile(profile)
 
-    bookmark_cats = all_cats - explicit if explicit else all_cats
+    explicit = prof.explicit_bits
+    bookmark_cats = prof.bookmark_cat_bits
 
-    s_explicit = (len(explicit & paper_cats) / len(explicit)) if explicit else 0.0
-    s_bookmark = (len(bookmark_cats & paper_cats) / len(bookmark_cats)) if bookmark_cats else 0.0
+    s_explicit = ((explicit & paper_cats).bit_count() / explicit.bit_count()) if explicit else 0.0
+    s_bookmark = ((bookmark_cats & paper_cats).bit_count() / bookmark_cats.bit_count()) if bookmark_cats else 0.0
 
     return min(W_EXPLICIT_CAT * s_explicit + W_BOOKMARK_CAT * s_bookmark, 1.0)
 
 
 # Popularity Score 
 
+# popularity / recency 는 user 와 무관 → 후보 목록 단위로는 data.static_features 테이블에서 gather
+
 def _popularity_score(paper: Paper) -> float:
-    b = max(paper.bookmark_count, 0)
-    v = max(paper.view_count, 0)
-    return (log1p(b) + log1p(v)) / 2.0
+    return raw_popularity(paper.bookmark_count, paper.view_count)
 
 
 # Recency Score 
 
 def _recency_score(paper: Paper, now: datetime) -> float:
-    if not paper.update_date:
-        return 0.0
-    days = (now - paper.update_date).days
-    return 0.5 ** (days / 730.0)  # half-life ~2 years
+    return recency_feature(paper.update_date, now)  # half-life ~2 years
 
 
 # Total Score
 
+def profile_scores(paper: Paper, profile: UserProfile) -> Tuple[float, float]:
+    """
+    user 에 의존하는 (keyword, category) 점수만.
+    """
+    return _keyword_score(paper, profile), _category_score(paper, profile)
+
+
+def combine_scores(s_kw, s_cat, s_pop, s_rec):
+    """
+    compute_total_score 와 같은 합산 순서 (float / numpy 배열 모두 가능).
+    """
+    return s_kw + s_cat + W_POPULARITY * s_pop + W_RECENCY * s_rec
+
+
 def compute_total_score(paper: Paper, profile: UserProfile,
                         now: datetime = None) -> Tuple[float, Dict[str, float]]:
 
     now = now or datetime.utcnow()
 
-    s_kw = _keyword_score(paper, profile)
-    s_cat = _category_score(paper, profile)
-    s_pop = min(_popularity_score(paper) / 10.0, 1.0)
+    s_kw, s_cat = profile_scores(paper, profile)
+    s_pop = popularity_feature(paper.bookmark_count, paper.view_count)
     s_rec = _recency_score(paper, now)
 
-    total = (
-        s_kw +
-        s_cat +
-        W_POPULARITY * s_pop +
-        W_RECENCY * s_rec
-    )
+    total = combine_scores(s_kw, s_cat, s_pop, s_rec)
 
     return total, {
         "keyword": s_kw,
@@ -2,4 +2,6 @@
 추천 서비스 파이프라인 모듈.
 
 - rule-based 후보 생성 + RL reranking 을 하나의 파이프라인으로 묶는다.
+- batch: 여러 user 를 block 단위 행렬 연산으로 한 번에 추천
+- feed_materializer: 활성 user feed 사전 계산 job + serving 시 조회
 """
\ No newline at end of file
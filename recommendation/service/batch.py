@@ -0,0 +1,320 @@
+"""
+batch.py
+
+여러 user 의 추천을 한 번에 계산하는 batch 경로 (알림 메일용 feed 사전 계산 등).
+
+- 프로필: 북마크 / 북마크 논문 / 검색 기록을 bulk 쿼리로 한 번에 로드
+- 후보군: category 별 최신 논문 + 최신 논문을 모든 user 가 공유하는 pool 로 한 번만 조회
+- rule 점수: user block(B명) × pool(P편) 에 대해 category / keyword 겹침 수를 한 번에 계산
+  (token ID 로 정렬한 (paper, token) 쌍에 user 토큰을 searchsorted 로 join → bincount.
+   pool × vocabulary 크기의 dense 행렬을 만들지 않으므로 메모리는 B×P + 실제 겹침 수에 비례)
+  (compute_total_score 와 같은 식, 같은 연산 순서라 점수가 그대로 일치)
+- RL rerank: block 의 후보 feature 를 쌓아서 정책 forward 1번
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .. import metrics
+from ..data.data_loader import MongoDataLoader
+from ..data.vocabulary import Vocabulary, get_vocabulary
+from ..models.data_models import CandidateBatch, Paper, RecommendationResult, UserProfile
+from ..rl.feature_schema import DEFAULT_FEATURE_SCHEMA
+from ..rule_based.scoring import (
+    W_BOOKMARK_CAT,
+    W_BOOKMARK_KW,
+    W_EXPLICIT_CAT,
+    W_POPULARITY,
+    W_RECENCY,
+    W_SEARCH_KW,
+)
+from .reranker import RLBanditReranker
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_SIZE = 64
+
+
+@dataclass
+class CandidatePool:
+    """
+    여러 user 가 공유하는 후보 논문 pool 과, user 와 무관한 feature (popularity / recency).
+    """
+    papers: List[Paper]
+    index: Dict[str, int]  # arxiv_id → pool 위치
+    by_category: Dict[str, List[int]]  # category → 최신순 pool 위치 목록
+    recent: List[int]
+    popularity: np.ndarray  # (P,)
+    recency: np.ndarray  # (P,)
+    token_rows: np.ndarray  # keyword 토큰 incidence 의 (row, token_id) 쌍, token_id 순 정렬
+    token_ids: np.ndarray
+    category_bits: List[int]
+    category_rows: np.ndarray  # category incidence 의 (row, category_id) 쌍, category_id 순 정렬
+    category_ids: np.ndarray
+
+
+def _date_key(p: Paper) -> datetime:
+    return p.update_date or datetime.min
+
+
+def build_candidate_pool(
+    loader: MongoDataLoader,
+    profiles: Sequence[UserProfile],
+    limit_per_source: int = 200,
+    now: Optional[datetime] = None,
+    vocab: Optional[Vocabulary] = None,
+) -> CandidatePool:
+    now = now or datetime.utcnow()
+    vocab = vocab or get_vocabulary()
+
+    categories = sorted({c for prof in profiles for c in prof.interests_categories})
+    by_cat_papers = loader.get_papers_by_category_many(categories, limit_per_source)
+    recent_papers = loader.get_recent_papers(limit_per_source)
+
+    papers: List[Paper] = []
+    index: Dict[str, int] = {}
+
+    def add(p: Paper) -> int:
+        idx = index.get(p.arxiv_id)
+        if idx is None:
+            idx = index[p.arxiv_id] = len(papers)
+            papers.append(p)
+        return idx
+
+    by_category = {
+        c: [add(p) for p in ps if p.arxiv_id] for c, ps in by_cat_papers.items()
+    }
+    recent = [add(p) for p in recent_papers if p.arxiv_id]
+
+    popularity, recency = loader.static_features.gather(papers, now)
+
+    encoded = [vocab.encode_paper(p) for p in papers]
+    lengths = np.array([e.token_ids.size for e in encoded], dtype=np.int64)
+    token_ids = (
+        np.concatenate([e.token_ids for e in encoded]) if len(encoded) else np.zeros(0, dtype=np.int32)
+    )
+    token_rows = np.repeat(np.arange(len(papers)), lengths)
+    token_rows, token_ids = _sorted_pairs(token_rows, token_ids)
+    category_bits = [e.category_bits for e in encoded]
+    category_rows, category_ids = _sorted_pairs(
+        *_pairs([np.array(_bits_to_ids(b), dtype=np.int64) for b in category_bits])
+    )
+
+    return CandidatePool(
+        papers=papers,
+        index=index,
+        by_category=by_category,
+        recent=recent,
+        popularity=popularity,
+        recency=recency,
+        token_rows=token_rows,
+        token_ids=token_ids,
+        category_bits=category_bits,
+        category_rows=category_rows,
+        category_ids=category_ids,
+    )
+
+
+def candidate_indices(
+    pool: CandidatePool, profile: UserProfile, limit_per_source: int = 200
+) -> List[int]:
+    """
+    MongoDataLoader.get_candidate_papers_for_user 와 같은 후보 (pool 위치, 같은 순서).
+    """
+    merged = {}
+    for c in profile.interests_categories:
+        for idx in pool.by_category.get(c, ()):
+            merged.setdefault(idx, None)
+    by_cat = sorted(merged, key=lambda i: _date_key(pool.papers[i]), reverse=True)[:limit_per_source]
+
+    candidates: Dict[str, int] = {}
+    for idx in by_cat:
+        candidates[pool.papers[idx].arxiv_id] = idx
+    for idx in pool.recent:
+        candidates.setdefault(pool.papers[idx].arxiv_id, idx)
+    for pid in profile.bookmarked_paper_ids:
+        candidates.pop(pid, None)
+    return list(candidates.values())
+
+
+def _sorted_pairs(rows: np.ndarray, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # (row, id) 쌍을 id 순으로 (같은 id 안에서는 row 순) → id 별 row 목록 (CSR 의 열 방향)
+    order = np.argsort(ids, kind="stable")
+    return rows[order], ids[order]
+
+
+def _overlap_counts(
+    user_rows: np.ndarray,
+    user_ids: np.ndarray,
+    paper_rows: np.ndarray,
+    paper_ids: np.ndarray,
+    n_users: int,
+    n_papers: int,
+) -> np.ndarray:
+    """
+    (n_users, n_papers) 겹침 수. paper 쪽 쌍은 _sorted_pairs 로 id 순 정렬되어 있어야 한다.
+    user 의 id 마다 같은 id 를 가진 paper 구간을 찾아 (user, paper) 쌍으로 펼친 뒤 bincount.
+    (user / paper 안에서 id 는 중복 없음)
+    """
+    if user_ids.size == 0 or paper_ids.size == 0:
+        return np.zeros((n_users, n_papers), dtype=np.int64)
+    start = np.searchsorted(paper_ids, user_ids, side="left")
+    n = np.searchsorted(paper_ids, user_ids, side="right") - start
+    total = int(n.sum())
+    if total == 0:
+        return np.zeros((n_users, n_papers), dtype=np.int64)
+    offsets = np.arange(total) - np.repeat(np.cumsum(n) - n, n)
+    papers = paper_rows[np.repeat(start, n) + offsets]
+    flat = np.repeat(user_rows, n) * n_papers + papers
+    return np.bincount(flat, minlength=n_users * n_papers).reshape(n_users, n_papers)
+
+
+def _bits_to_ids(bits: int) -> List[int]:
+    out = []
+    i = 0
+    while bits:
+        if bits & 1:
+            out.append(i)
+        bits >>= 1
+        i += 1
+    return out
+
+
+def _pairs(values: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    lengths = np.array([v.size for v in values], dtype=np.int64)
+    ids = np.concatenate(values) if values else np.zeros(0, dtype=np.int32)
+    return np.repeat(np.arange(len(values)), lengths), ids
+
+
+def _ratio(counts: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    # len(a & b) / len(a), a 가 비어 있으면 0
+    out = np.zeros_like(counts, dtype=np.float64)
+    np.divide(counts, sizes[:, None], out=out, where=sizes[:, None] > 0)
+    return out
+
+
+def score_user_block(
+    pool: CandidatePool,
+    profiles: Sequence[UserProfile],
+    vocab: Optional[Vocabulary] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    user block × pool 전체 rule feature 를 행렬 연산으로 계산.
+    return: {"keyword", "category", "popularity", "recency", "rule_total_score"} 각 (B, P)
+    """
+    vocab = vocab or get_vocabulary()
+    enc = [vocab.encode_profile(prof) for prof in profiles]
+    B, P = len(profiles), len(pool.papers)
+
+    # keyword
+    ub_rows, ub_ids = _pairs([e.bookmark_kw_ids for e in enc])
+    us_rows, us_ids = _pairs([e.search_kw_ids for e in enc])
+    overlap_bookmark = _ratio(
+        _overlap_counts(ub_rows, ub_ids, pool.token_rows, pool.token_ids, B, P),
+        np.array([e.bookmark_kw_count for e in enc]),
+    )
+    overlap_search = _ratio(
+        _overlap_counts(us_rows, us_ids, pool.token_rows, pool.token_ids, B, P),
+        np.array([e.search_kw_count for e in enc]),
+    )
+    s_kw = np.minimum(W_BOOKMARK_KW * overlap_bookmark + W_SEARCH_KW * overlap_search, 1.0)
+
+    # category: bit 위치를 id 로 사용
+    ue_rows, ue_ids = _pairs([np.array(_bits_to_ids(e.explicit_bits), dtype=np.int64) for e in enc])
+    ub2_rows, ub2_ids = _pairs([np.array(_bits_to_ids(e.bookmark_cat_bits), dtype=np.int64) for e in enc])
+    s_explicit = _ratio(
+        _overlap_counts(ue_rows, ue_ids, pool.category_rows, pool.category_ids, B, P),
+        np.array([e.explicit_bits.bit_count() for e in enc]),
+    )
+    s_bookmark = _ratio(
+        _overlap_counts(ub2_rows, ub2_ids, pool.category_rows, pool.category_ids, B, P),
+        np.array([e.bookmark_cat_bits.bit_count() for e in enc]),
+    )
+    s_cat = np.minimum(W_EXPLICIT_CAT * s_explicit + W_BOOKMARK_CAT * s_bookmark, 1.0)
+
+    # paper 에 토큰이 하나도 없으면 keyword score 는 0 (compute_total_score 와 동일)
+    s_pop = np.broadcast_to(pool.popularity, (B, P))
+    s_rec = np.broadcast_to(pool.recency, (B, P))
+    total = s_kw + s_cat + W_POPULARITY * s_pop + W_RECENCY * s_rec
+    return {
+        "keyword": s_kw,
+        "category": s_cat,
+        "popularity": s_pop,
+        "recency": s_rec,
+        "rule_total_score": total,
+    }
+
+
+def _user_batch(
+    pool: CandidatePool,
+    feats: Dict[str, np.ndarray],
+    row: int,
+    cand: List[int],
+    candidate_k: int,
+) -> CandidateBatch:
+    names = DEFAULT_FEATURE_SCHEMA.names
+    idx = np.asarray(cand, dtype=np.int64)
+    X = np.empty((idx.size, len(names)), dtype=np.float32)
+    for j, name in enumerate(names):
+        X[:, j] = feats[name][row, idx]
+    batch = CandidateBatch(
+        paper_ids=[pool.papers[i].arxiv_id for i in cand],
+        papers=[pool.papers[i] for i in cand],
+        X=X,
+        rule_scores=feats["rule_total_score"][row, idx].astype(np.float64),
+        feature_names=names,
+    )
+    return batch.top_k(candidate_k)
+
+
+def iter_user_blocks(
+    user_ids: Sequence[int],
+    top_k: int = 6,
+    candidate_k: int = 100,
+    use_rl: bool = True,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    loader: Optional[MongoDataLoader] = None,
+    reranker: Optional[RLBanditReranker] = None,
+    limit_per_source: int = 200,
+    diversify: bool = True,
+) -> Iterator[List[Tuple[int, List[RecommendationResult]]]]:
+    """
+    user_ids 를 block_size 씩 나눠 block 마다 [(user_id, 결과), ...] 를 yield.
+    (block 단위로 내보내므로 호출 쪽은 계산이 끝난 user 부터 바로 응답으로 흘려보낼 수 있음)
+    diversify=False 면 RL rerank 결과를 다양성 적용 없이 점수 순서 그대로.
+    reranker 는 호출 쪽의 공용 인스턴스를 넘길 것 (없으면 호출마다 새로 만들어 모델 로딩 + reload 스레드 시작).
+    """
+    loader = loader or MongoDataLoader()
+    if use_rl:
+        reranker = reranker or RLBanditReranker(loader)
+    vocab = get_vocabulary()
+    user_ids = list(dict.fromkeys(int(u) for u in user_ids))
+
+    for start in range(0, len(user_ids), block_size):
+        block = user_ids[start:start + block_size]
+        now = datetime.utcnow()
+
+        with metrics.span("build_user_profile"):
+            profiles_by_id = loader.build_user_profiles_many(block)
+        profiles = [profiles_by_id[uid] for uid in block]
+        with metrics.span("get_candidate_papers_for_user"):
+            pool = build_candidate_pool(loader, profiles, limit_per_source, now=now, vocab=vocab)
+        with metrics.span("compute_total_score"):
+            feats = score_user_block(pool, profiles, vocab=vocab)
+
+        batches = [
+            _user_batch(pool, feats, row, candidate_indices(pool, prof, limit_per_source), candidate_k)
+            for row, prof in enumerate(profiles)
+        ]
+        logger.info(f"[Batch] block {start // block_size + 1}: users={len(block)}, pool={len(pool.papers)}")
+
+        if use_rl:
+            results = reranker.rerank_many(block, batches, top_k=top_k, diversify=diversify)
+        else:
+            results = [b.to_results(range(min(top_k, len(b)))) for b in batches]
+        yield list(zip(block, results))
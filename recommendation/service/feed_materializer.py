@@ -0,0 +1,217 @@
+"""
+feed_materializer.py
+
+활성 user 의 추천 top-N 을 미리 계산해서 precomputed_recommendations 컬렉션에 저장하는 batch job,
+그리고 serving 시점의 조회 함수.
+
+저장 문서 (_id = user_id):
+    {
+        "_id": 42,
+        "mode": "rule_based",            # --rl 로 계산하면 "rule_based+rl"
+        "model_version": None,
+        "results": [to_frontend_dict(), ...],   # top_n 개, 점수 내림차순
+        "computed_at": datetime,
+    }
+
+- 기본은 rule-based (GET /recommendations 의 live 계산과 같은 알고리즘 → prefix 가 live top-limit 과 같음)
+- --rl 이면 RL rerank 점수 순서로 저장하되 다양성은 적용하지 않는다.
+  다양성은 요청 limit 에 따라 결과가 달라지므로 serving 시 limit 에 맞춰 적용.
+  (다양성 선택은 후보 전체를 훑을 수 있어서 top_n 이 아니라 후보 candidate_k 개를 모두 저장)
+
+serving (lookup_precomputed_feed):
+- _id 조회 1번 → mode 가 요청한 알고리즘과 다르거나 computed_at 이 ttl 보다 오래됐으면 None (live 계산 fallback)
+- 계산 이후 북마크한 논문은 제외 (북마크 조회 1번), 남은 개수가 limit 보다 적으면 None
+
+주기 실행 예 (cron, 매시 정각):
+    0 * * * * cd /app && python -m recommendation.service.feed_materializer --workers 4
+"""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from ..data.data_loader import MongoDataLoader
+from ..rl.registry import version_from_results
+from .batch import DEFAULT_BLOCK_SIZE, iter_user_blocks
+from .reranker import RLBanditReranker, diversify_order
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP_N = 50
+DEFAULT_FEED_TTL_SEC = float(os.getenv("RL_FEED_TTL_SEC", str(6 * 3600)))
+
+LoaderFactory = Callable[[], MongoDataLoader]
+
+
+# ------------------------------------------------------
+# worker 프로세스 전역 상태 (프로세스마다 MongoClient / RL 모델 1개)
+# ------------------------------------------------------
+_worker_loader: Optional[MongoDataLoader] = None
+_worker_reranker: Optional[RLBanditReranker] = None
+
+
+def _init_worker(loader_factory: LoaderFactory) -> None:
+    global _worker_loader
+    _worker_loader = loader_factory()
+
+
+def _get_worker_reranker() -> RLBanditReranker:
+    # worker 프로세스당 하나 (chunk 마다 checkpoint 를 다시 읽지 않도록)
+    global _worker_reranker
+    if _worker_reranker is None:
+        _worker_reranker = RLBanditReranker(_worker_loader)
+    return _worker_reranker
+
+
+def materialize_users(
+    user_ids: List[int],
+    loader: MongoDataLoader,
+    top_n: int = DEFAULT_TOP_N,
+    candidate_k: int = 200,
+    use_rl: bool = False,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    reranker: Optional[RLBanditReranker] = None,
+) -> int:
+    """
+    user_ids 의 top_n 을 batch 경로 (rule, use_rl 이면 + RL rerank) 로 계산해서 block 마다 upsert.
+    use_rl 이면 reranker 를 넘길 것 (없으면 호출마다 새로 만든다).
+    """
+    mode = "rule_based+rl" if use_rl else "rule_based"
+    written = 0
+    for block in iter_user_blocks(
+        user_ids,
+        top_k=max(candidate_k, top_n) if use_rl else top_n,
+        candidate_k=candidate_k,
+        use_rl=use_rl,
+        block_size=block_size,
+        loader=loader,
+        reranker=reranker,
+        diversify=False,
+    ):
+        now = datetime.utcnow()
+        docs = []
+        for uid, recs in block:
+            results = [r.to_frontend_dict() for r in recs]
+            docs.append({
+                "_id": uid,
+                "mode": mode,
+                "model_version": version_from_results(results),
+                "results": results,
+                "computed_at": now,
+            })
+        written += loader.upsert_precomputed_feeds(docs)
+    return written
+
+
+def _materialize_chunk(user_ids: List[int], options: Dict[str, Any]) -> int:
+    reranker = _get_worker_reranker() if options.get("use_rl") else None
+    return materialize_users(user_ids, _worker_loader, reranker=reranker, **options)
+
+
+def run_materialization(
+    num_workers: int = 4,
+    active_days: int = 30,
+    top_n: int = DEFAULT_TOP_N,
+    candidate_k: int = 200,
+    use_rl: bool = False,
+    chunk_size: int = 512,
+    loader_factory: LoaderFactory = MongoDataLoader,
+    user_ids: Optional[List[int]] = None,
+) -> int:
+    """
+    활성 user 를 chunk_size 씩 나눠 프로세스 풀에서 계산.
+    실패한 chunk 는 로그만 남기고 건너뛴다. (해당 user 는 serving 시 live 계산)
+    """
+    if user_ids is None:
+        since = datetime.utcnow() - timedelta(days=active_days)
+        user_ids = loader_factory().get_active_user_ids(since)
+    chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+    options = {"top_n": top_n, "candidate_k": candidate_k, "use_rl": use_rl}
+    logger.info(f"[Feed Materializer] 활성 user {len(user_ids)}명, chunk {len(chunks)}개, workers={num_workers}")
+
+    written = 0
+    # fork 된 MongoClient / SSH 터널 스레드를 공유하지 않도록 spawn 사용
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(loader_factory,),
+    ) as pool:
+        futures = {pool.submit(_materialize_chunk, chunk, options): i for i, chunk in enumerate(chunks)}
+        for fut in as_completed(futures):
+            try:
+                written += fut.result()
+            except Exception as e:
+                logger.error(f"[Feed Materializer] chunk {futures[fut]} 실패: {e!r}")
+
+    logger.info(f"[Feed Materializer] ✅ {written}명 feed 저장 완료")
+    return written
+
+
+# ------------------------------------------------------
+# serving
+# ------------------------------------------------------
+def lookup_precomputed_feed(
+    loader: MongoDataLoader,
+    user_id: int,
+    limit: int,
+    mode: str = "rule_based",
+    ttl_sec: float = DEFAULT_FEED_TTL_SEC,
+    now: Optional[datetime] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    mode 로 계산된 feed 가 있고 신선하면 {"results", "mode", "model_version", "computed_at"} 반환, 아니면 None.
+    """
+    doc = loader.get_precomputed_feed(user_id)
+    if doc is None or doc.get("mode", "rule_based") != mode:
+        return None
+
+    now = now or datetime.utcnow()
+    computed_at = doc.get("computed_at")
+    if computed_at is None or (now - computed_at).total_seconds() > ttl_sec:
+        return None
+
+    # 계산 이후 북마크한 논문은 다시 추천하지 않음 (나머지 순서는 유지)
+    bookmarked = set(loader.get_user_bookmarked_paper_ids(user_id))
+    results = [r for r in doc.get("results") or [] if r.get("id") not in bookmarked]
+    if len(results) < limit:
+        return None
+
+    if mode.endswith("+rl"):
+        # live RL 경로와 같은 다양성 규칙을 요청 limit 기준으로
+        order = diversify_order(range(len(results)), lambda i: results[i].get("categories"), limit)
+        results = [results[i] for i in order]
+
+    return {
+        "results": results[:limit],
+        "mode": mode,
+        "model_version": doc.get("model_version"),
+        "computed_at": computed_at,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="활성 user 추천 feed 사전 계산")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--active-days", type=int, default=30)
+    parser.add_argument("--top-n", type=int, default=DEFAULT_TOP_N)
+    parser.add_argument("--candidate-k", type=int, default=200)
+    parser.add_argument("--rl", action="store_true", help="RL rerank 순서로 저장 (GET /recommendations 는 rule-based feed 만 사용)")
+    args = parser.parse_args()
+
+    run_materialization(
+        num_workers=args.workers,
+        active_days=args.active_days,
+        top_n=args.top_n,
+        candidate_k=args.candidate_k,
+        use_rl=args.rl,
+    )
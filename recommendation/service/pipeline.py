@@ -1,10 +1,11 @@
 from __future__ import annotations
 import logging
+import threading
 from typing import List, Optional
 
+from .. import request_log
 from ..data.data_loader import MongoDataLoader
 from ..models.data_models import RecommendationResult, UserProfile
-from ..rule_based.rule_based_recommender import RuleBasedRecommender, compute_total_score
 from .reranker import RLBanditReranker
 from ..rule_based.rule_based_recommender import RuleBasedRecommender
 
@@ -13,6 +14,7 @@ logger = logging.getLogger(__name__)
 _loader: MongoDataLoader | None = None
 _rule_rec: RuleBasedRecommender | None = None
 _rl_reranker: RLBanditReranker | None = None
+_rl_reranker_lock = threading.Lock()
 
 
 def _get_loader() -> MongoDataLoader:
@@ -29,10 +31,15 @@ def _get_rule_recommender() -> RuleBasedRecommender:
     return _rule_rec
 
 
-def _get_rl_reranker() -> RLBanditReranker:
+def get_rl_reranker() -> RLBanditReranker:
+    """
+    프로세스 공용 reranker (모델 로딩 / hot reload 스레드가 하나). batch 경로도 이걸 같이 쓴다.
+    """
     global _rl_reranker
     if _rl_reranker is None:
-        _rl_reranker = RLBanditReranker(_get_loader())
+        with _rl_reranker_lock:
+            if _rl_reranker is None:
+                _rl_reranker = RLBanditReranker(_get_loader())
     return _rl_reranker
 
 
@@ -47,51 +54,57 @@ def recommend_for_user_hybrid(
     2) RL(Contextual Bandit)으로 rerank
     3) 최종 top_k개 반환
     """
-    logger.info("=" * 60)
-    logger.info("[RL Pipeline] 🚀 Hybrid 추천 시작")
-    logger.info(f"[RL Pipeline] 📋 Parameters: user_id={user_id}, top_k={top_k}, candidate_k={candidate_k}, base_paper_id={base_paper_id}")
-    
+    logger.debug(
+        "[RL Pipeline] 🚀 Hybrid 추천 시작: user_id=%s, top_k=%s, candidate_k=%s, base_paper_id=%s",
+        user_id, top_k, candidate_k, base_paper_id,
+    )
+    detail = request_log.detail_enabled()
+
     rule_rec = _get_rule_recommender()
-    rl_reranker = _get_rl_reranker()
+    rl_reranker = get_rl_reranker()
 
-    # 1) Rule-based 후보 100개
-    logger.info(f"[RL Pipeline] 📊 Step 1: Rule-based 후보 {candidate_k}개 생성 중...")
-    candidates = rule_rec.recommend_for_user(
+    # 1) Rule-based 후보 100개 (feature matrix 포함, feature 계산은 여기서 한 번만)
+    batch = rule_rec.recommend_candidate_batch(
         user_id=user_id,
         top_k=candidate_k,
         base_paper_id=base_paper_id,
     )
-    logger.info(f"[RL Pipeline] ✅ Rule-based 후보 {len(candidates)}개 생성 완료")
+    logger.debug("[RL Pipeline] ✅ Rule-based 후보 %d개 생성 완료", len(batch))
+    request_log.bind(n_candidates=len(batch))
 
-    if not candidates:
-        logger.warning("[RL Pipeline] ⚠️ 후보가 없어 빈 결과 반환")
+    if len(batch) == 0:
+        logger.warning("[RL Pipeline] ⚠️ 후보가 없어 빈 결과 반환 (user_id=%s)", user_id)
         return []
 
-    # 후보 상위 3개 미리보기
-    for i, c in enumerate(candidates[:3]):
-        logger.info(f"[RL Pipeline]   후보 {i+1}: {c.paper.title[:50]}... (rule_score={c.score:.4f})")
+    # 후보 상위 3개 미리보기 (샘플링된 요청만)
+    if detail:
+        for i in range(min(3, len(batch))):
+            logger.info(
+                "[RL Pipeline]   후보 %d: %.50s... (rule_score=%.4f)",
+                i + 1, batch.papers[i].title or "", batch.rule_scores[i],
+            )
 
     # 2) RL로 rerank → 최종 6개
-    logger.info(f"[RL Pipeline] 🤖 Step 2: RL Bandit으로 reranking 중...")
-    final_results = rl_reranker.rerank(
+    final_results = rl_reranker.rerank_batch(
         user_id=user_id,
-        candidates=candidates,
+        batch=batch,
         top_k=top_k,
     )
-    
-    logger.info(f"[RL Pipeline] ✅ RL reranking 완료 → 최종 {len(final_results)}개 선택")
-    
-    # 최종 결과 로그
-    for i, r in enumerate(final_results):
-        rl_score = r.features.get("rl_score", "N/A")
-        rule_score = r.features.get("rule_score", r.score)
-        sim_bonus = r.features.get("similarity_bonus", 0)
-        rl_score_str = f"{rl_score:.4f}" if isinstance(rl_score, (int, float)) else str(rl_score)
-        rule_score_str = f"{rule_score:.4f}" if isinstance(rule_score, (int, float)) else str(rule_score)
-        logger.info(f"[RL Pipeline]   결과 {i+1}: {r.paper.title[:40]}... | rl={rl_score_str} | rule={rule_score_str} | sim_bonus={sim_bonus}")
-    
-    logger.info("[RL Pipeline] 🎯 Hybrid 추천 완료")
-    logger.info("=" * 60)
-    
+    logger.debug("[RL Pipeline] ✅ RL reranking 완료 → 최종 %d개 선택", len(final_results))
+
+    # 최종 결과 로그 (샘플링된 요청만)
+    if detail:
+        for i, r in enumerate(final_results):
+            logger.info(
+                "[RL Pipeline]   결과 %d: %.40s... | rl=%s | rule=%s | sim_bonus=%s",
+                i + 1, r.paper.title or "",
+                _fmt_score(r.features.get("rl_score", "N/A")),
+                _fmt_score(r.features.get("rule_score", r.score)),
+                r.features.get("similarity_bonus", 0),
+            )
+
     return final_results
 
+
+def _fmt_score(value) -> str:
+    return f"{value:.4f}" if isinstance(value, (int, float)) else str(value)
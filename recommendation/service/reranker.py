@@ -1,16 +1,24 @@
 from __future__ import annotations
 
 import logging
+import os
+import threading
+import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Iterable, List, Optional, Tuple
 
 import numpy as np
 
+from .. import metrics, request_log
 from ..data.data_loader import MongoDataLoader
-from ..models.data_models import RecommendationResult, UserProfile
-from ..rl.state_builder import build_candidate_features
-from ..rl.bandit_policy import SimpleBanditModel, DEFAULT_MODEL_PATH
+from ..models.data_models import CandidateBatch, RecommendationResult, UserProfile
+from ..rl.state_builder import FEATURE_NAMES, build_candidate_features
+from ..rl.bandit_policy import DEFAULT_MODEL_PATH, load_checkpoint
+from ..rl.feature_schema import DEFAULT_FEATURE_SCHEMA, FeatureSchema, FeatureSchemaMismatch
+from ..rl.hierarchical_bandit import get_hierarchical_bandit
+from ..rl.online_bandit import get_online_bandit
+from ..rl.registry import DEFAULT_REGISTRY_DIR, ModelRegistry, format_version
 
 logger = logging.getLogger(__name__)
 
@@ -22,21 +30,71 @@ except ImportError:
 
 @dataclass
 class RerankConfig:
+    # registry 에 등록된 모델이 없을 때 사용하는 기존 단일 모델 파일
     model_path: Path = Path(DEFAULT_MODEL_PATH)
+    registry_dir: Path = DEFAULT_REGISTRY_DIR
+    # registry manifest 확인 주기 (초). 0 이하이면 hot reload 비활성화
+    poll_interval: float = float(os.getenv("RL_MODEL_POLL_SEC", "10"))
+    # build_candidate_features 가 만드는 feature schema. checkpoint schema 와 다르면 로드 거부
+    schema: FeatureSchema = DEFAULT_FEATURE_SCHEMA
+
+
+@dataclass
+class _LoadedModel:
+    model: object  # bandit_policy.MODEL_ZOO 의 모델
+    version: int  # registry 버전 (legacy 단일 파일은 0)
+    path: Path
+    schema: FeatureSchema
+    arch: str
 
 
 class BanditPolicyWrapper:
     """
-    SimpleBanditModel을 감싸는 래퍼.
-    - 처음 호출 시에만 모델을 로드해서 메모리에 유지
+    bandit 모델 checkpoint 를 감싸는 래퍼.
+    - 처음 호출 시 registry 의 latest 모델(없으면 model_path)을 로드
+    - checkpoint 의 feature schema 가 serving schema 와 다르면 로드하지 않음 (rule-based 유지)
+    - 이후 백그라운드 스레드가 manifest 를 polling 하다가 새 버전이 등록되면
+      요청 경로 밖에서 로딩한 뒤 참조만 교체 (요청은 교체 중에도 기다리지 않음)
     - 모델 파일이 없거나 torch 미설치면 None 상태로 두고, 그 경우 rule-based만 사용
     """
     def __init__(self, config: Optional[RerankConfig] = None) -> None:
         self.config = config or RerankConfig()
-        self._model: Optional[SimpleBanditModel] = None
+        self.registry = ModelRegistry(self.config.registry_dir)
+        self._current: Optional[_LoadedModel] = None
+        self._input_dim: Optional[int] = None
+        self._manifest_mtime: Optional[float] = None
+        self._load_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._load_failed = False  # 첫 로드 실패 시 요청마다 재시도하지 않도록
+
+    @property
+    def version(self) -> Optional[int]:
+        current = self._current
+        return current.version if current is not None else None
+
+    def _resolve_checkpoint(self) -> Tuple[Optional[Path], Optional[int]]:
+        latest = self.registry.latest() if self.registry.exists() else None
+        if latest is not None:
+            return latest.path, latest.version
+        if self.config.model_path.exists():
+            return self.config.model_path, 0
+        return None, None
+
+    def _load(self, path: Path, version: int, input_dim: int) -> _LoadedModel:
+        logger.info(f"[RL Reranker] 🧠 RL 모델 로딩: {path} (version={format_version(version)}, input_dim={input_dim})")
+        loaded = load_checkpoint(path, expected_schema=self.config.schema)
+        if loaded.schema.dim != input_dim:
+            raise FeatureSchemaMismatch(f"입력 차원 불일치: checkpoint={loaded.schema.dim}, X={input_dim}")
+        return _LoadedModel(
+            model=loaded.model,
+            version=version,
+            path=path,
+            schema=loaded.schema,
+            arch=loaded.arch,
+        )
 
     def _ensure_model(self, input_dim: int) -> None:
-        if self._model is not None:
+        if self._current is not None or self._load_failed:
             return
 
         # torch 없는 환경이면 그대로 포기
@@ -44,120 +102,270 @@ class BanditPolicyWrapper:
             logger.warning("[RL Reranker] ⚠️ torch 가 설치되어 있지 않아 RL rerank를 비활성화합니다.")
             return
 
-        if not self.config.model_path.exists():
-            logger.warning(f"[RL Reranker] ⚠️ RL 모델 파일이 없습니다: {self.config.model_path}")
+        with self._load_lock:
+            if self._current is not None:
+                return
+            self._manifest_mtime = self.registry.manifest_mtime()
+            path, version = self._resolve_checkpoint()
+            if path is None:
+                logger.warning(f"[RL Reranker] ⚠️ RL 모델 파일이 없습니다: {self.config.registry_dir}, {self.config.model_path}")
+                return
+            self._input_dim = input_dim
+            try:
+                self._current = self._load(path, version, input_dim)
+            except FeatureSchemaMismatch as e:
+                # 다른 feature 순서로 학습된 checkpoint → 새 버전이 등록될 때까지 rule-based
+                self._load_failed = True
+                logger.error(f"[RL Reranker] ❌ RL 모델 로드 거부: {e}")
+            else:
+                logger.info(f"[RL Reranker] ✅ RL 모델 로딩 완료 (arch={self._current.arch}, schema=v{self._current.schema.version})")
+
+        self._start_watcher()
+
+    # ------------------------------------------------------
+    # hot reload
+    # ------------------------------------------------------
+    def _start_watcher(self) -> None:
+        if self.config.poll_interval <= 0 or self._watcher is not None:
             return
-
-        logger.info(f"[RL Reranker] 🧠 RL 모델 로딩: {self.config.model_path} (input_dim={input_dim})")
-        model = SimpleBanditModel(input_dim=input_dim)
-        state = torch.load(self.config.model_path, map_location="cpu")
-        model.load_state_dict(state)
-        model.eval()
-        self._model = model
-        logger.info("[RL Reranker] ✅ RL 모델 로딩 완료")
-
-    def predict_scores(self, X: np.ndarray) -> Optional[np.ndarray]:
+        self._watcher = threading.Thread(
+            target=self._watch_loop, name="rl-model-reloader", daemon=True
+        )
+        self._watcher.start()
+
+    def _watch_loop(self) -> None:
+        while True:
+            time.sleep(self.config.poll_interval)
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                logger.warning(f"[RL Reranker] ⚠️ 모델 reload 실패 (기존 모델 유지): {e}")
+
+    def reload_if_changed(self) -> bool:
+        """
+        manifest 가 바뀌었고 latest 버전이 현재와 다르면 새 모델로 교체.
+        """
+        mtime = self.registry.manifest_mtime()
+        if mtime is None or mtime == self._manifest_mtime or self._input_dim is None:
+            return False
+        self._manifest_mtime = mtime
+
+        latest = self.registry.latest()
+        current = self._current
+        if latest is None or (current is not None and current.version == latest.version):
+            return False
+
+        loaded = self._load(latest.path, latest.version, self._input_dim)
+        self._current = loaded  # 참조 교체 (in-flight 요청은 이전 모델로 끝까지 계산)
+        logger.info(f"[RL Reranker] 🔄 RL 모델 교체 완료: {format_version(latest.version)}")
+        return True
+
+    def predict_scores_with_version(self, X: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[int]]:
         """
         X: (N, D) feature matrix
-        return: (N,) 예측 점수 or None (모델 사용 불가 시)
+        return: ((N,) 예측 점수, 사용한 모델 버전) or (None, None) (모델 사용 불가 시)
         """
         if X.size == 0:
-            return None
+            return None, None
 
         self._ensure_model(input_dim=X.shape[1])
-        if self._model is None or torch is None:
-            return None
+        current = self._current
+        if current is None or torch is None:
+            return None, None
 
-        with torch.no_grad():
-            t = torch.from_numpy(X).float()
-            y = self._model(t).squeeze(-1).cpu().numpy()
+        with metrics.span("predict_scores"), torch.no_grad():
+            t = torch.from_numpy(current.schema.normalize(X)).float()
+            y = current.model(t).squeeze(-1).cpu().numpy()
         
-        logger.info(f"[RL Reranker] 🎲 RL 점수 예측 완료: min={y.min():.4f}, max={y.max():.4f}, mean={y.mean():.4f}")
-        return y
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[RL Reranker] 🎲 RL 점수 예측 완료: min=%.4f, max=%.4f, mean=%.4f", y.min(), y.max(), y.mean())
+        return y, current.version
+
+    def predict_scores(self, X: np.ndarray) -> Optional[np.ndarray]:
+        return self.predict_scores_with_version(X)[0]
+
+
+def diversify_order(
+    order: Iterable[int], categories_of: Callable[[int], Optional[Iterable[str]]], top_k: int
+) -> List[int]:
+    """
+    이미 선택된 것들과 카테고리가 겹치면 패널티 (또는 스킵)
+    너무 빡세게 스킵하면 추천이 비어버릴 수 있으니까 가능하면
+    다른 카테고리 우선으로 구성. 왜냐면 후보군에서 추천된걸 rerank하는거라
+    (사전 계산 feed 도 serving limit 에 맞춰 같은 함수로 적용)
+    """
+    order = [int(i) for i in order]
+    selected: List[int] = []
+    used_categories = set()
+
+    for i in order:
+        cats = set(categories_of(i) or [])
+        if used_categories and cats & used_categories and len(selected) >= 3:#앞쪽 3개는 그냥 두고 이후부터는 겹치는 건 한 번 건너뛰는 식
+            continue
+
+        selected.append(i)
+        used_categories.update(cats)
+        if len(selected) >= top_k:
+            break
+
+    if len(selected) < top_k:
+        chosen = set(selected)
+        for i in order:
+            if i in chosen:
+                continue
+            selected.append(i)
+            if len(selected) >= top_k:
+                break
+    return selected
 
 
 class RLBanditReranker:
     """
-    Rule-based 후보군(List[RecommendationResult])을 입력으로 받아
+    Rule-based 후보군(CandidateBatch)을 입력으로 받아
     Contextual Bandit 정책으로 rerank 후 top_k개를 반환.
     """
     def __init__(self, loader: Optional[MongoDataLoader] = None):
         self.loader = loader or MongoDataLoader()
         self.policy = BanditPolicyWrapper()
 
-    def rerank(
+    def _predict(self, user_id: int, X: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[int]]:
+        # online bandit 이 켜져 있으면 exploration bonus 포함 점수를 우선 사용
+        hier = get_hierarchical_bandit()
+        online = get_online_bandit()
+        if hier is not None:
+            logger.debug("[RL Reranker] 🎲 Hierarchical bandit 점수 사용 (user_id=%s)", user_id)
+            with metrics.span("predict_scores"):
+                return hier.score(user_id, X), None
+        if online is not None:
+            logger.debug("[RL Reranker] 🎲 Online bandit 점수 사용 (%s, n_updates=%d)", online.config.algorithm, online.n_updates)
+            with metrics.span("predict_scores"):
+                return online.score(X), None
+        return self.policy.predict_scores_with_version(X)
+
+    def rerank_batch(
         self,
         user_id: int,
-        candidates: List[RecommendationResult],
+        batch: CandidateBatch,
         top_k: int = 6,
+        diversify: bool = True,
     ) -> List[RecommendationResult]:
         """
-        candidates: RuleBasedRecommender가 만든 상위 N개 (예: 100개)
+        batch: RuleBasedRecommender.recommend_candidate_batch 결과 (예: 100개)
         return: RL 점수를 기준으로 다시 정렬한 상위 top_k
+
+        feature 는 rule 단계에서 계산된 batch.X 를 그대로 사용하고,
+        RecommendationResult 는 최종 top_k 에 대해서만 만든다.
         """
-        if not candidates:
+        if len(batch) == 0:
             return []
 
-        logger.info(f"[RL Reranker] 📥 Reranking 시작: {len(candidates)}개 후보 → top {top_k}")
+        logger.debug("[RL Reranker] 📥 Reranking 시작: %d개 후보 → top %d, feature shape=%s", len(batch), top_k, batch.X.shape)
 
-        # 1) UserProfile 로딩
-        profile: UserProfile = self.loader.build_user_profile(user_id)
+        # 1) RL 정책으로 점수 예측
+        rl_scores, model_version = self._predict(user_id, batch.X)
+        return self._select(batch, rl_scores, model_version, top_k, diversify)
 
-        # 2) 후보 논문들 feature matrix 생성
-        papers = [c.paper for c in candidates]
-        X, paper_ids, _feat_dicts = build_candidate_features(profile, papers)
-        logger.info(f"[RL Reranker] 📊 Feature matrix 생성: shape={X.shape}")
+    def rerank_many(
+        self,
+        user_ids: List[int],
+        batches: List[CandidateBatch],
+        top_k: int = 6,
+        diversify: bool = True,
+    ) -> List[List[RecommendationResult]]:
+        """
+        여러 user 의 후보군을 한 번에 rerank (batch 추천용).
+        offline 정책이면 모든 후보 feature 를 쌓아서 forward 1번, online / hierarchical bandit 은 user 별.
+        diversify=False 면 최종 점수 순서 그대로 (feed 사전 계산: 다양성은 serving 시 limit 에 맞춰 적용)
+        """
+        if get_hierarchical_bandit() is not None or get_online_bandit() is not None:
+            return [self.rerank_batch(uid, b, top_k, diversify) for uid, b in zip(user_ids, batches)]
 
-        # 3) RL 정책으로 점수 예측
-        rl_scores = self.policy.predict_scores(X)
+        sizes = [len(b) for b in batches]
+        if sum(sizes) == 0:
+            return [[] for _ in batches]
 
+        X_all = np.concatenate([b.X for b in batches if len(b)], axis=0)
+        rl_all, model_version = self.policy.predict_scores_with_version(X_all)
+        offsets = np.cumsum([0] + sizes)
+
+        results: List[List[RecommendationResult]] = []
+        for b, start, end in zip(batches, offsets[:-1], offsets[1:]):
+            if len(b) == 0:
+                results.append([])
+                continue
+            rl_scores = rl_all[start:end] if rl_all is not None else None
+            results.append(self._select(b, rl_scores, model_version, top_k, diversify))
+        return results
+
+    def _select(
+        self,
+        batch: CandidateBatch,
+        rl_scores: Optional[np.ndarray],
+        model_version: Optional[int],
+        top_k: int,
+        diversify: bool = True,
+    ) -> List[RecommendationResult]:
         # RL 사용 불가(troch 미설치, 모델 없음 등) → rule-based 순서 그대로 top_k
         if rl_scores is None:
-            logger.warning("[RL Reranker] ⚠️ RL 모델 사용 불가 → rule-based 결과 그대로 사용")
-            return candidates[:top_k]
+            logger.debug("[RL Reranker] ⚠️ RL 모델 사용 불가 → rule-based 결과 그대로 사용")
+            request_log.bind(rl_fallback=True)
+            return batch.to_results(range(min(top_k, len(batch))))
 
-        logger.info("[RL Reranker] ✅ RL 모델 활성화 → RL 점수로 reranking")
+        logger.debug("[RL Reranker] ✅ RL 모델 활성화 → RL 점수로 reranking")
+        request_log.bind(model_version=model_version)
 
-        # 4) 후보들에 RL 점수 적용
-        reranked: List[RecommendationResult] = []
-        for c, rl_s in zip(candidates, rl_scores):
-            # 기존 rule-based score를 보존하고, score를 RL 점수로 덮어씌움
-            rule_score = c.score
-            c.features = dict(c.features or {})
-            c.features["rule_score"] = float(rule_score)
-            c.features["rl_score"] = float(rl_s)
-            final_score = 0.6 * rl_s + 0.4 * rule_score
-            c.score = final_score
-            reranked.append(c)
+        # 2) 기존 rule-based score 와 섞어서 최종 점수 (벡터 연산)
+        rl_scores = np.asarray(rl_scores, dtype=np.float64)
+        final_scores = 0.6 * rl_scores + 0.4 * batch.rule_scores
 
-        # 5) RL 점수 기준 내림차순 정렬 후 top_k 
-        reranked.sort(key=lambda r: r.score, reverse=True)
+        # 3) 최종 점수 기준 내림차순 정렬 (동점이면 rule 순서 유지)
+        order = np.argsort(-final_scores, kind="stable")
 
         # 다양성이 너무 없는 관계로 수정!
-        final: List[RecommendationResult] = []
-        used_categories = set()
+        if diversify:
+            with metrics.span("diversity"):
+                selected = self._diversify(batch, order, top_k)
+        else:
+            selected = [int(i) for i in order[:top_k]]
+
+        # 4) 최종 top_k 만 RecommendationResult 로 변환
+        final = batch.to_results(selected[:top_k], scores=final_scores)
+        for i, r in zip(selected, final):
+            # 기존 rule-based score를 보존하고, score를 RL 점수로 덮어씌움
+            r.features["rule_score"] = float(batch.rule_scores[i])
+            r.features["rl_score"] = float(rl_scores[i])
+            if model_version is not None:
+                # 어떤 모델 버전이 점수를 냈는지 breakdown 에 남김 (노출 로그 attribution 용)
+                r.features["model_version"] = float(model_version)
+        return final
+
+    @staticmethod
+    def _diversify(batch: CandidateBatch, order: np.ndarray, top_k: int) -> List[int]:
+        return diversify_order(order, lambda i: getattr(batch.papers[i], "categories", []), top_k)
 
+    def rerank(
+        self,
+        user_id: int,
+        candidates: List[RecommendationResult],
+        top_k: int = 6,
+    ) -> List[RecommendationResult]:
         """
-        이미 선택된 것들과 카테고리가 겹치면 패널티 (또는 스킵)
-        너무 빡세게 스킵하면 추천이 비어버릴 수 있으니까 가능하면
-        다른 카테고리 우선으로 구성. 왜냐면 후보군에서 추천된걸 rerank하는거라
+        이미 RecommendationResult 로 만들어진 후보군용 (feature 를 다시 계산해야 함).
+        pipeline 은 rerank_batch 를 사용한다.
         """
-        for cand in reranked:
-            cats = set(getattr(cand.paper, "categories", []) or [])
-            if used_categories and cats & used_categories and len(final) >= 3:#앞쪽 3개는 그냥 두고 이후부터는 겹치는 건 한 번 건너뛰는 식
-                continue
-
-            final.append(cand)
-            used_categories.update(cats)
-            if len(final) >= top_k:
-                break
-
-        if len(final) < top_k:
-            for cand in reranked:
-                if cand in final:
-                    continue
-                final.append(cand)
-                if len(final) >= top_k:
-                    break  
+        if not candidates:
+            return []
 
-        return final[:top_k]
+        profile: UserProfile = self.loader.build_user_profile(user_id)
+        papers = [c.paper for c in candidates]
+        X, paper_ids, _feat_dicts = build_candidate_features(profile, papers)
+        sim = [c.features.get("similarity_bonus") for c in candidates]
+        batch = CandidateBatch(
+            paper_ids=paper_ids,
+            papers=papers,
+            X=X.astype(np.float32),
+            rule_scores=np.asarray([c.score for c in candidates], dtype=np.float64),
+            feature_names=FEATURE_NAMES,
+            similarity_bonus=np.asarray(sim, dtype=np.float64) if all(v is not None for v in sim) else None,
+        )
+        return self.rerank_batch(user_id, batch, top_k=top_k)
@@ -11,20 +11,35 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional
 
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.routing import Match
 from pydantic import BaseModel
 
 from recommendation.interface.api_interface import (
+    check_loader_indexes,
     get_user_recommendations,
     get_similar_paper_recommendations,
     get_user_recommendations_rl,
+    iter_user_recommendations_batch,
     log_recommendation_interaction,
+    start_unclicked_exposure_feeder,
 )
-
-# 로깅 설정
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+from recommendation import metrics, profiling, request_log
+from recommendation.data.vocabulary import get_vocabulary
+from recommendation.interface.serialization import (
+    dumps,
+    dumps_response,
+    iter_ndjson,
+    paper_payload,
+    parse_fields,
 )
+from recommendation.rl.hierarchical_bandit import get_hierarchical_bandit
+from recommendation.rl.online_bandit import get_online_bandit
+from recommendation.request_log import configure_logging
+
+# 로깅 설정 (RL_LOG_FORMAT=json|text, 출력은 QueueListener 스레드에서)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -32,7 +47,7 @@ logger = logging.getLogger(__name__)
 
 
 class PaperRecommendation(BaseModel):
-    """개별 추천 논문"""
+    """개별 추천 논문 (OpenAPI 문서용, 실제 응답은 serialization.paper_payload 로 직렬화)"""
     paper_id: str
     title: Optional[str] = None
     authors: Optional[str] = None
@@ -82,6 +97,16 @@ class InteractionRequest(BaseModel):
     meta: Optional[Dict[str, Any]] = None
 
 
+class BatchRecommendationRequest(BaseModel):
+    """여러 사용자 추천 요청 (알림 메일 등 사전 계산용)"""
+    user_ids: List[int]
+    limit: int = 6
+    candidate_k: int = 100
+    use_rl: bool = True
+    log_exposure: bool = True
+    fields: Optional[str] = None  # 쉼표 구분 논문 필드 (없으면 전체)
+
+
 class InteractionResponse(BaseModel):
     """상호작용 로그 응답"""
     ok: bool
@@ -92,26 +117,34 @@ class InteractionResponse(BaseModel):
 # --- Helper Functions ---
 
 
-def transform_paper(raw_paper: Dict[str, Any]) -> PaperRecommendation:
-    """기존 응답 형식을 백엔드 규격으로 변환"""
-    return PaperRecommendation(
-        paper_id=raw_paper.get("id", ""),
-        title=raw_paper.get("title"),
-        authors=raw_paper.get("authors"),
-        abstract=raw_paper.get("abstract"),
-        categories=raw_paper.get("categories", []),
-        summary=raw_paper.get("summary"),
-        external_url=raw_paper.get("externalUrl"),
-        total_score=raw_paper.get("score", 0.0),
-        breakdown=raw_paper.get("features", {}),
-    )
-
-
 def create_session_id() -> str:
     """새 세션 ID 생성"""
     return str(uuid.uuid4())
 
 
+MAX_JSON_LIMIT = 50  # stream=false 일 때 limit 상한 (그 이상은 NDJSON 스트리밍으로)
+
+FIELDS_DESCRIPTION = "응답에 포함할 논문 필드 (쉼표 구분, 예: paper_id,title,total_score). 없으면 전체"
+STREAM_DESCRIPTION = "true 면 NDJSON 으로 스트리밍 (첫 줄 메타, 이후 논문 한 줄씩)"
+
+
+def parse_fields_or_400(fields: Optional[str], limit: int, stream: bool):
+    """fields / limit 검증 (추천 계산 전에 호출)"""
+    if not stream and limit > MAX_JSON_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit 이 {MAX_JSON_LIMIT} 보다 크면 stream=true 로 요청하세요.")
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def render_recommendations(meta: Dict[str, Any], results: List[Dict[str, Any]], field_set, stream: bool) -> Response:
+    """pydantic 을 거치지 않고 결과 dict → orjson bytes 로 바로 응답"""
+    if stream:
+        return StreamingResponse(iter_ndjson(meta, results, field_set), media_type="application/x-ndjson")
+    return Response(content=dumps_response(meta, results, field_set), media_type="application/json")
+
+
 # --- Lifespan ---
 
 
@@ -128,10 +161,36 @@ async def lifespan(app: FastAPI):
         logger.info("[Startup] Recommendation system ready")
     except Exception as e:
         logger.warning(f"[Startup] Warmup failed (will retry on first request): {e}")
+
+    # loader 쿼리가 index 를 타는지 explain 으로 점검 (RL_INDEX_CHECK=off|warn|create)
+    try:
+        check_loader_indexes()
+    except Exception as e:
+        logger.warning(f"[Startup] Index check failed: {e}")
+
+    # 상호작용 없이 지나간 노출 → online bandit 에 reward 0 update (RL_ONLINE_ZERO_DELAY_SEC)
+    zero_feeder = start_unclicked_exposure_feeder()
     
     yield
     
     logger.info("[Shutdown] RL Recommendation Server shutting down...")
+    if zero_feeder is not None:
+        zero_feeder.stop()
+
+    # online bandit 상태는 종료 시점에도 한 번 저장
+    online = get_online_bandit()
+    if online is not None:
+        online.save()
+        hier = get_hierarchical_bandit()
+        if hier is not None:
+            hier.store.flush()
+        logger.info(f"[Shutdown] Online bandit state saved (n_updates={online.n_updates})")
+
+    # 런타임에 추가된 category / keyword ID 도 다음 실행에서 그대로 쓰도록 저장
+    vocab = get_vocabulary()
+    if vocab.changed:
+        vocab.save()
+        logger.info(f"[Shutdown] Vocabulary saved: {vocab}")
 
 
 app = FastAPI(
@@ -142,6 +201,80 @@ app = FastAPI(
 )
 
 
+# --- Metrics ---
+
+
+def route_template(scope: Dict[str, Any]) -> str:
+    """/recommendations/similar/2401.00001 → /recommendations/similar/{paper_id} (label cardinality 고정)"""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+LOGGED_ENDPOINT_PREFIX = "/recommendations"
+
+
+class ObserveRequestMiddleware:
+    """
+    요청 전체 시간 기록 + 안쪽 단계 span 에 endpoint label 부여 (RL_METRICS=0 이면 생략),
+    추천 API 는 요청당 구조화 로그 1줄 (request_log), 프로파일 대상이면 cProfile (profiling)
+
+    @app.middleware("http") (BaseHTTPMiddleware) 는 응답 header 가 나오는 순간 call_next 가 끝나서
+    StreamingResponse 의 body (/recommendations/batch, stream=true) 가 시간 / 레코드에서 빠진다.
+    pure ASGI 로 app 호출 전체 (마지막 http.response.body 까지) 를 감싸고, header 는 http.response.start 에서 추가.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = route_template(scope)
+        with metrics.request_scope(endpoint):
+            if not endpoint.startswith(LOGGED_ENDPOINT_PREFIX):
+                await self.app(scope, receive, send)
+                return
+
+            headers = Headers(scope=scope)
+            request_id = headers.get("x-request-id") or uuid.uuid4().hex
+            with request_log.request_record(endpoint, request_id) as record:
+                prof = profiling.maybe_profile(request_id, headers.get(profiling.PROFILE_HEADER))
+
+                async def send_with_headers(message):
+                    if message["type"] == "http.response.start":
+                        record.fields["status"] = message["status"]
+                        response_headers = MutableHeaders(scope=message)
+                        response_headers["X-Request-ID"] = request_id
+                        if prof.path is not None:
+                            response_headers["X-Profile-File"] = prof.path.name
+                    await send(message)
+
+                try:
+                    with prof:
+                        await self.app(scope, receive, send_with_headers)
+                except Exception:
+                    # 응답 시작 전에 터졌으면 바깥 ServerErrorMiddleware 가 500 을 보낸다
+                    record.fields.setdefault("status", 500)
+                    raise
+                finally:
+                    if prof.path is not None:
+                        record.fields["profile"] = str(prof.path)
+
+
+app.add_middleware(ObserveRequestMiddleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus scrape 용 단계별 / endpoint 별 latency histogram"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 # --- API Endpoints ---
 
 
@@ -155,8 +288,10 @@ def root():
             "/health",
             "/recommendations",
             "/recommendations/rl",
+            "/recommendations/batch",
             "/recommendations/similar/{paper_id}",
             "/recommendations/interactions",
+            "/metrics",
         ],
     }
 
@@ -174,35 +309,36 @@ async def health_check():
 @app.get("/recommendations", response_model=RecommendationResponse)
 async def get_recommendations(
     user_id: int = Query(..., description="사용자 ID"),
-    limit: int = Query(6, ge=1, le=50, description="추천 개수"),
+    limit: int = Query(6, ge=1, le=500, description="추천 개수 (50 초과는 stream=true 필요)"),
     session_id: Optional[str] = Query(None, description="세션 ID (없으면 자동 생성)"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    stream: bool = Query(False, description=STREAM_DESCRIPTION),
 ):
     """
     Rule-based 추천.
     
     사용자의 관심사, 북마크 기록, 검색 기록 기반으로 추천합니다.
     """
+    field_set = parse_fields_or_400(fields, limit, stream)
     try:
-        logger.info(f"[API] Rule-based recommendations: user_id={user_id}, limit={limit}")
+        logger.debug("[API] Rule-based recommendations: user_id=%s, limit=%s", user_id, limit)
+        request_log.bind(user_id=user_id, limit=limit)
         
         # 기존 api_interface 호출
         raw_result = get_user_recommendations(user_id=user_id, limit=limit)
+        results = raw_result.get("results", [])
         
-        # 응답 변환
-        session = session_id or create_session_id()
-        recommendations = [transform_paper(p) for p in raw_result.get("results", [])]
+        # 응답 변환 (dict → bytes)
+        meta = {
+            "user_id": user_id,
+            "session_id": session_id or create_session_id(),
+            "recommendation_type": raw_result.get("mode", "rule_based"),
+            "timestamp": datetime.utcnow().isoformat(),
+        }
         
-        response = RecommendationResponse(
-            user_id=user_id,
-            session_id=session,
-            recommendation_type="rule_based",
-            recommendations=recommendations,
-            total_count=len(recommendations),
-            timestamp=datetime.utcnow().isoformat(),
-        )
-        
-        logger.info(f"[API] Returned {len(recommendations)} recommendations")
-        return response
+        logger.debug("[API] Returned %d recommendations", len(results))
+        request_log.bind(count=len(results))
+        return render_recommendations(meta, results, field_set, stream)
         
     except Exception as e:
         logger.error(f"[API] Recommendation error: {e}")
@@ -212,10 +348,12 @@ async def get_recommendations(
 @app.get("/recommendations/rl", response_model=RecommendationResponse)
 async def get_recommendations_rl(
     user_id: int = Query(..., description="사용자 ID"),
-    limit: int = Query(6, ge=1, le=50, description="최종 추천 개수"),
+    limit: int = Query(6, ge=1, le=500, description="최종 추천 개수 (50 초과는 stream=true 필요)"),
     candidate_k: int = Query(100, ge=10, le=500, description="RL reranking 후보군 크기"),
     base_paper_id: Optional[str] = Query(None, description="현재 보고 있는 논문 ID (유사도 보너스 계산용)"),
     session_id: Optional[str] = Query(None, description="세션 ID (없으면 자동 생성)"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    stream: bool = Query(False, description=STREAM_DESCRIPTION),
 ):
     """
     RL (Contextual Bandit) 기반 추천.
@@ -225,8 +363,13 @@ async def get_recommendations_rl(
     3. RL 모델로 reranking
     4. 최종 limit개 반환
     """
+    field_set = parse_fields_or_400(fields, limit, stream)
     try:
-        logger.info(f"[API] RL recommendations: user_id={user_id}, limit={limit}, candidate_k={candidate_k}, base_paper_id={base_paper_id}")
+        logger.debug(
+            "[API] RL recommendations: user_id=%s, limit=%s, candidate_k=%s, base_paper_id=%s",
+            user_id, limit, candidate_k, base_paper_id,
+        )
+        request_log.bind(user_id=user_id, limit=limit, candidate_k=candidate_k, base_paper_id=base_paper_id)
         
         # 기존 api_interface 호출
         raw_result = get_user_recommendations_rl(
@@ -235,60 +378,115 @@ async def get_recommendations_rl(
             candidate_k=candidate_k,
             base_paper_id=base_paper_id,
         )
+        results = raw_result.get("results", [])
         
-        # 응답 변환
-        session = session_id or create_session_id()
-        recommendations = [transform_paper(p) for p in raw_result.get("results", [])]
+        # 응답 변환 (dict → bytes)
+        meta = {
+            "user_id": user_id,
+            "session_id": session_id or create_session_id(),
+            "recommendation_type": "rl_based",
+            "timestamp": datetime.utcnow().isoformat(),
+        }
         
-        response = RecommendationResponse(
-            user_id=user_id,
-            session_id=session,
-            recommendation_type="rl_based",
-            recommendations=recommendations,
-            total_count=len(recommendations),
-            timestamp=datetime.utcnow().isoformat(),
-        )
-        
-        logger.info(f"[API] Returned {len(recommendations)} RL recommendations")
-        return response
+        logger.debug("[API] Returned %d RL recommendations", len(results))
+        request_log.bind(count=len(results))
+        return render_recommendations(meta, results, field_set, stream)
         
     except Exception as e:
         logger.error(f"[API] RL Recommendation error: {e}")
         raise HTTPException(status_code=500, detail=f"RL 추천 생성 실패: {str(e)}")
 
 
+@app.post("/recommendations/batch")
+def get_recommendations_batch(request: BatchRecommendationRequest):
+    """
+    여러 사용자 추천을 한 번에 계산해서 NDJSON 으로 스트리밍.
+
+    - 한 줄에 사용자 한 명 (RecommendationResponse 와 같은 필드 + recommendation_id)
+    - 사용자 block 단위로 계산이 끝나는 대로 내려보냄
+    """
+    if not request.user_ids:
+        raise HTTPException(status_code=400, detail="user_ids 가 비어 있습니다.")
+    if len(request.user_ids) > 10_000:
+        raise HTTPException(status_code=400, detail="user_ids 는 최대 10000개까지 가능합니다.")
+
+    field_set = parse_fields_or_400(request.fields, request.limit, stream=True)
+
+    logger.info(
+        "[API] Batch recommendations: users=%d, limit=%s, use_rl=%s",
+        len(request.user_ids), request.limit, request.use_rl,
+    )
+    request_log.bind(users=len(request.user_ids), limit=request.limit, use_rl=request.use_rl)
+    recommendation_type = "rl_based" if request.use_rl else "rule_based"
+    session = create_session_id()
+
+    def stream():
+        count = 0
+        try:
+            for raw_result in iter_user_recommendations_batch(
+                user_ids=request.user_ids,
+                limit=request.limit,
+                candidate_k=request.candidate_k,
+                use_rl=request.use_rl,
+                log_exposure=request.log_exposure,
+                request_meta={"session_id": session, "batch": True},
+            ):
+                recommendations = [paper_payload(p, field_set) for p in raw_result.get("results", [])]
+                line = {
+                    "user_id": raw_result["user_id"],
+                    "session_id": session,
+                    "recommendation_type": recommendation_type,
+                    "recommendation_id": raw_result.get("recommendation_id"),
+                    "recommendations": recommendations,
+                    "total_count": len(recommendations),
+                    "timestamp": datetime.utcnow().isoformat(),
+                }
+                count += 1
+                yield dumps(line) + b"\n"
+        except Exception as e:
+            # 이미 응답이 시작된 뒤라 status code 를 바꿀 수 없으므로 마지막 줄에 에러를 남김
+            logger.error(f"[API] Batch recommendation error: {e}")
+            request_log.bind(error=repr(e))
+            yield dumps({"error": f"batch 추천 실패: {str(e)}"}) + b"\n"
+        # body 가 다 나간 뒤에 요청 레코드가 남으므로 여기서 bind 한 값도 실림
+        request_log.bind(count=count)
+        logger.info("[API] Batch returned %d users", count)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @app.get("/recommendations/similar/{paper_id}", response_model=SimilarPaperResponse)
 async def get_similar_papers(
     paper_id: str,
     limit: int = Query(6, ge=1, le=50, description="추천 개수"),
     session_id: Optional[str] = Query(None, description="세션 ID (없으면 자동 생성)"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
 ):
     """
     유사 논문 추천.
     
     특정 논문과 유사한 논문을 추천합니다.
     """
+    field_set = parse_fields_or_400(fields, limit, stream=False)
     try:
-        logger.info(f"[API] Similar papers: paper_id={paper_id}, limit={limit}")
+        logger.debug("[API] Similar papers: paper_id=%s, limit=%s", paper_id, limit)
+        request_log.bind(paper_id=paper_id, limit=limit)
         
         # 기존 api_interface 호출
         raw_result = get_similar_paper_recommendations(paper_id=paper_id, limit=limit)
+        results = raw_result.get("results", [])
         
-        # 응답 변환
-        session = session_id or create_session_id()
-        recommendations = [transform_paper(p) for p in raw_result.get("results", [])]
+        # 응답 변환 (dict → bytes)
+        meta = {
+            "paper_id": paper_id,
+            "session_id": session_id or create_session_id(),
+            "recommendation_type": "similar_papers",
+            "timestamp": datetime.utcnow().isoformat(),
+        }
         
-        response = SimilarPaperResponse(
-            paper_id=paper_id,
-            session_id=session,
-            recommendation_type="similar_papers",
-            recommendations=recommendations,
-            total_count=len(recommendations),
-            timestamp=datetime.utcnow().isoformat(),
-        )
-        
-        logger.info(f"[API] Returned {len(recommendations)} similar papers")
-        return response
+        logger.debug("[API] Returned %d similar papers", len(results))
+        request_log.bind(count=len(results))
+        return render_recommendations(meta, results, field_set, stream=False)
         
     except Exception as e:
         logger.error(f"[API] Similar papers error: {e}")
@@ -309,7 +507,10 @@ async def log_interaction(request: InteractionRequest):
     - dwell_time <= 1초: -0.2 (이탈 페널티)
     """
     try:
-        logger.info(f"[API] Interaction log: user_id={request.user_id}, paper_id={request.paper_id}, action={request.action_type}")
+        logger.debug(
+            "[API] Interaction log: user_id=%s, paper_id=%s, action=%s",
+            request.user_id, request.paper_id, request.action_type,
+        )
         
         result = log_recommendation_interaction(
             user_id=request.user_id,
@@ -321,7 +522,10 @@ async def log_interaction(request: InteractionRequest):
             meta=request.meta,
         )
         
-        logger.info(f"[API] Interaction logged: interaction_id={result.get('interaction_id')}, reward={result.get('reward')}")
+        logger.debug(
+            "[API] Interaction logged: interaction_id=%s, reward=%s",
+            result.get("interaction_id"), result.get("reward"),
+        )
         
         return InteractionResponse(
             ok=result.get("ok", True),
@@ -0,0 +1,153 @@
+"""
+PostgresUserInterestLoader 단위 테스트 (실제 Postgres 없이 가짜 pool 주입).
+
+    python -m pytest -q test_postgres_loader.py
+"""
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+from recommendation.data import postgres_loader
+from recommendation.data.postgres_loader import PostgresUserInterestLoader
+
+# user_interests JOIN categories 결과 (user_id, code)
+ROWS = [
+    {"user_id": 1, "code": "cs.LG"},
+    {"user_id": 1, "code": "cs.AI"},
+    {"user_id": 1, "code": "cs.LG"},
+    {"user_id": 2, "code": "stat.ML"},
+    {"user_id": 4, "code": "physics"},
+]
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        if self.conn.fail_execute:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        user_ids = params[0]
+        self.conn.pool.queries.append(list(user_ids))
+        self._rows = [dict(r) for r in ROWS if r["user_id"] in user_ids]
+
+    def fetchall(self):
+        return self._rows
+
+
+class FakeConn:
+    def __init__(self, pool, fail_execute=False, fail_rollback=False):
+        self.pool = pool
+        self.fail_execute = fail_execute
+        self.fail_rollback = fail_rollback
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        if self.fail_rollback:
+            raise psycopg2.InterfaceError("connection already closed")
+        self.rollbacks += 1
+
+
+class FakePool:
+    """
+    getconn 마다 새 FakeConn. broken 에 넣은 설정은 앞에서부터 한 번씩 사용.
+    """
+
+    def __init__(self, broken=()):
+        self.broken = list(broken)
+        self.queries = []
+        self.out = []
+        self.returned = []  # (conn, close)
+
+    def getconn(self):
+        conn = FakeConn(self, **(self.broken.pop(0) if self.broken else {}))
+        self.out.append(conn)
+        return conn
+
+    def putconn(self, conn, close=False):
+        self.out.remove(conn)
+        self.returned.append((conn, close))
+
+    def closeall(self):
+        pass
+
+
+def test_batches_missing_users_into_one_query():
+    pool = FakePool()
+    loader = PostgresUserInterestLoader(pool=pool)
+
+    result = loader.get_user_category_codes_many([1, 2, 3, 2])
+
+    assert pool.queries == [[1, 2, 3]]
+    assert result == {1: ["cs.AI", "cs.LG"], 2: ["stat.ML"], 3: []}
+    assert pool.out == []
+    assert [close for _, close in pool.returned] == [False]
+    assert pool.returned[0][0].rollbacks == 1
+
+
+def test_ttl_cache_skips_cached_users_until_expiry(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(postgres_loader.time, "monotonic", lambda: clock[0])
+    pool = FakePool()
+    loader = PostgresUserInterestLoader(pool=pool, cache_ttl_sec=60)
+
+    loader.get_user_category_codes_many([1, 3])
+    # 빈 결과 (user 3) 도 캐시 → 캐시에 없는 user 4 만 조회
+    assert loader.get_user_category_codes_many([1, 3, 4]) == {1: ["cs.AI", "cs.LG"], 3: [], 4: ["physics"]}
+    assert pool.queries == [[1, 3], [4]]
+
+    assert loader.get_user_category_codes(1) == ["cs.AI", "cs.LG"]
+    assert len(pool.queries) == 2
+
+    clock[0] += 61
+    loader.get_user_category_codes_many([1, 4])
+    assert pool.queries[-1] == [1, 4]
+
+    loader.invalidate(1)
+    loader.get_user_category_codes_many([1, 4])
+    assert pool.queries[-1] == [1]
+
+
+def test_broken_connection_is_discarded_and_retried():
+    pool = FakePool(broken=[{"fail_execute": True}])
+    loader = PostgresUserInterestLoader(pool=pool)
+
+    assert loader.get_user_category_codes_many([2]) == {2: ["stat.ML"]}
+
+    broken, fresh = (conn for conn, _ in pool.returned)
+    assert pool.returned == [(broken, True), (fresh, False)]
+    assert broken.rollbacks == 0
+    assert pool.out == []
+    assert loader.available
+
+
+def test_gives_up_after_second_failure_and_backs_off():
+    pool = FakePool(broken=[{"fail_execute": True}, {"fail_execute": True}])
+    loader = PostgresUserInterestLoader(pool=pool)
+
+    with pytest.raises(psycopg2.OperationalError):
+        loader.get_user_category_codes_many([1])
+
+    assert [close for _, close in pool.returned] == [True, True]
+    assert not loader.available
+    assert len(loader.cache) == 0
+
+
+def test_connection_returned_when_rollback_fails():
+    pool = FakePool(broken=[{"fail_rollback": True}])
+    loader = PostgresUserInterestLoader(pool=pool)
+
+    # 쿼리는 성공했으므로 결과는 그대로, rollback 이 안 되는 연결은 닫아서 반환
+    assert loader.get_user_category_codes_many([4]) == {4: ["physics"]}
+    assert pool.out == []
+    assert [close for _, close in pool.returned] == [True]